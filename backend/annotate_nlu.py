@@ -0,0 +1,315 @@
+"""
+Bulk offline annotation of archived messages with the /nlu pipeline.
+
+Streams a .jsonl / .csv / .parquet file in chunks through a process pool
+(the model is loaded once per worker, see nlu_pipeline.init_worker), runs
+exactly what /nlu runs (classifier, domain heuristics, slot extraction,
+follow-up) and writes one result per input row, in input order, to .jsonl
+or .parquet. At most --max-in-flight chunks are held in memory at a time,
+so memory stays flat however large the input is.
+
+    python annotate_nlu.py logs/messages.jsonl annotated.parquet --text-column message --keep id,ts
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import nlu_pipeline
+from intent_model import artifact_version
+from nlu_cache import normalize_message
+from nlu_utils import SLOT_NAMES
+
+Record = Dict[str, Any]
+
+# Result fields added to every output row. Rows with an empty or missing
+# message get None for all of them.
+RESULT_FIELDS = (
+    "intent",
+    "slots",
+    "slot_spans",
+    "missing_slots",
+    "followup_question",
+    "confidence",
+    "top_intents",
+    "model_version",
+)
+
+
+def iter_records(path: str, chunksize: int) -> Iterator[List[Record]]:
+    """
+    Stream input rows as lists of at most `chunksize` dicts.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pylist()
+        return
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows: Iterator[Record] = csv.DictReader(f)
+        elif path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f"Unsupported input format: {path}")
+        chunk: List[Record] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def annotate_texts(
+    texts: Sequence[Optional[str]], include_slots: Sequence[str], top_k: int
+) -> List[Optional[Record]]:
+    """
+    Run the /nlu pipeline over one chunk (in a pool worker), on messages
+    normalized like /nlu does. Empty or missing messages are not classified
+    and yield None.
+    """
+    normalized = [normalize_message(text) if isinstance(text, str) else "" for text in texts]
+    valid = [i for i, text in enumerate(normalized) if text]
+    results = nlu_pipeline.run_nlu_batch(
+        [normalized[i] for i in valid], [include_slots] * len(valid)
+    )
+    out: List[Optional[Record]] = [None] * len(texts)
+    for i, result in zip(valid, results):
+        result["top_intents"] = result["top_intents"][:top_k] if top_k else None
+        out[i] = {field: result[field] for field in RESULT_FIELDS}
+    return out
+
+
+class JsonlWriter:
+    def __init__(self, path: str):
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[Record]) -> None:
+        self._f.writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ParquetWriter:
+    """
+    Appends one row group per chunk. `slots`, `slot_spans` and
+    `top_intents` have per-row shapes, so they are stored as JSON strings.
+
+    The result columns have fixed types. Input columns take theirs from the
+    first chunk, except those that are all empty there: their type is still
+    unknown, so they are stored as strings (other values JSON-encoded)
+    rather than as null columns that would reject later chunks.
+    """
+
+    JSON_COLUMNS = ("slots", "slot_spans", "top_intents")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = None
+        self._string_columns: List[str] = []
+
+    @staticmethod
+    def result_schema() -> Any:
+        import pyarrow as pa
+
+        return pa.schema(
+            [
+                ("intent", pa.string()),
+                ("slots", pa.string()),
+                ("slot_spans", pa.string()),
+                ("missing_slots", pa.list_(pa.string())),
+                ("followup_question", pa.string()),
+                ("confidence", pa.float64()),
+                ("top_intents", pa.string()),
+                ("model_version", pa.string()),
+            ]
+        )
+
+    def _open(self, rows: List[Record]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        results = self.result_schema()
+        input_columns = [c for c in rows[0] if c not in RESULT_FIELDS]
+        inferred = pa.Table.from_pylist([{c: row.get(c) for c in input_columns} for row in rows]).schema
+        fields = []
+        for field in inferred:
+            if field.type == pa.null():
+                self._string_columns.append(field.name)
+                field = pa.field(field.name, pa.string())
+            fields.append(field)
+        self._writer = pq.ParquetWriter(self.path, pa.schema(fields + list(results)))
+
+    def write(self, rows: List[Record]) -> None:
+        import pyarrow as pa
+
+        if not rows:
+            return
+        for row in rows:
+            for column in self.JSON_COLUMNS:
+                if row.get(column) is not None:
+                    row[column] = json.dumps(row[column], ensure_ascii=False)
+        if self._writer is None:
+            self._open(rows)
+        for row in rows:
+            for column in self._string_columns:
+                value = row.get(column)
+                if value is not None and not isinstance(value, str):
+                    row[column] = json.dumps(value, ensure_ascii=False, default=str)
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def open_writer(path: str) -> Any:
+    if path.endswith(".jsonl"):
+        return JsonlWriter(path)
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    raise ValueError(f"Unsupported output format: {path} (expected .jsonl or .parquet)")
+
+
+class InlineExecutor:
+    """
+    --workers 0: run chunks in this process (debugging, profiling).
+    """
+
+    def submit(self, fn: Any, *args: Any) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        pass
+
+
+class Progress:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self.rows = 0
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed else 0.0
+        label = "Done" if final else "Progress"
+        print(
+            f"{label}: {self.rows} rows in {elapsed:.1f} s ({rate:.0f} rows/s)",
+            file=sys.stderr,
+        )
+
+
+def annotate(args: argparse.Namespace) -> int:
+    # Fail before starting workers, not at the first chunk.
+    for path in (args.input, args.output):
+        if path.endswith(".parquet") and importlib.util.find_spec("pyarrow") is None:
+            raise SystemExit(f"pyarrow is needed to read or write {path} (pip install pyarrow)")
+    version = artifact_version(args.model)
+    if args.include_slots == "all":
+        include_slots = tuple(SLOT_NAMES)
+    else:
+        include_slots = tuple(s for s in args.include_slots.split(",") if s)
+    keep = [c for c in args.keep.split(",") if c] if args.keep else None
+
+    if args.workers == 0:
+        nlu_pipeline.init_worker(args.model, version)
+        pool: Any = InlineExecutor()
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=nlu_pipeline.init_worker,
+            initargs=(args.model, version),
+        )
+    max_in_flight = args.max_in_flight or 2 * max(args.workers, 1)
+
+    writer = open_writer(args.output)
+    progress = Progress(args.progress_seconds)
+    # (input rows, pending result) per chunk, in input order.
+    pending: Deque[Tuple[List[Record], Future]] = deque()
+
+    def write_oldest() -> None:
+        rows, future = pending.popleft()
+        out = []
+        for row, result in zip(rows, future.result()):
+            record = {c: row.get(c) for c in keep} if keep is not None else dict(row)
+            record.update(result or dict.fromkeys(RESULT_FIELDS))
+            out.append(record)
+        writer.write(out)
+        progress.add(len(out))
+
+    try:
+        rows_read = 0
+        for rows in iter_records(args.input, args.chunksize):
+            if args.limit:
+                rows = rows[: args.limit - rows_read]
+            rows_read += len(rows)
+            texts = [row.get(args.text_column) for row in rows]
+            pending.append((rows, pool.submit(annotate_texts, texts, include_slots, args.top_k)))
+            if len(pending) >= max_in_flight:
+                write_oldest()
+            if args.limit and rows_read >= args.limit:
+                break
+        while pending:
+            write_oldest()
+    finally:
+        writer.close()
+        pool.shutdown(wait=True)
+    progress.report(final=True)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="Messages (.jsonl, .csv or .parquet)")
+    parser.add_argument("output", help="Annotated rows (.jsonl or .parquet)")
+    parser.add_argument("--model", default=os.getenv("NLU_MODEL_PATH", "models/intent_model.joblib"))
+    parser.add_argument("--text-column", default="message", help="Input column holding the message")
+    parser.add_argument(
+        "--keep",
+        help="Comma-separated input columns copied to the output (default: all of them)",
+    )
+    parser.add_argument(
+        "--include-slots",
+        default="",
+        help="Extra slots to extract for every message, comma-separated, or 'all'",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=0, help=f"Ranked intents per row (max {nlu_pipeline.MAX_TOP_K})"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="0 = run in this process")
+    parser.add_argument("--chunksize", type=int, default=1000, help="Rows per worker task")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=0,
+        help="Chunks submitted but not yet written (default: 2 per worker)",
+    )
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many rows")
+    parser.add_argument("--progress-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    return annotate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
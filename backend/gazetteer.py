@@ -0,0 +1,210 @@
+"""
+Locality gazetteer: finds place names anywhere in a message, tolerating
+small misspellings ("indranagar"), and maps them to canonical names.
+
+Built once from a locality file (one place per line, `Canonical|alias|...`),
+then every lookup is a few dict probes per message token:
+- a trie over name tokens matches multi-word names ("btm layout") by
+  walking the message's tokens, longest match first;
+- a deletion-neighbourhood index (SymSpell) over the distinct name tokens
+  finds the candidates for a misspelled token from its own deletions,
+  without comparing it against the whole vocabulary. Candidates are then
+  checked with a real edit distance.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class GazetteerMatch(NamedTuple):
+    # Character span of the match in the message.
+    start: int
+    end: int
+    # Canonical name of the place.
+    name: str
+    # Total edit distance between the message tokens and the name's tokens.
+    edits: int
+
+
+def _deletes(token: str, max_edits: int) -> Set[str]:
+    """
+    Every string obtained by deleting up to `max_edits` characters.
+    """
+    found = {token}
+    frontier = {token}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent
+    transpositions), or limit + 1 as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class Gazetteer:
+    """
+    Place-name index. add() names, build() once, then find().
+
+    A message token may differ from a name token by up to 1 edit when it has
+    at least `min_fuzzy_len` characters and up to `max_edits` from twice
+    that; shorter tokens ("btm", "hsr") must match exactly. A whole match
+    never has more than `max_edits` edits.
+    """
+
+    def __init__(self, max_edits: int = 2, min_fuzzy_len: int = 5, prefix_len: int = 8):
+        self.max_edits = max_edits
+        self.min_fuzzy_len = min_fuzzy_len
+        # Only the first `prefix_len` characters of a token are indexed, which
+        # bounds the index size for long names (as in SymSpell).
+        self.prefix_len = prefix_len
+        # Token trie: children by token, canonical name at the end of a name.
+        self._children: List[Dict[str, int]] = [{}]
+        self._names: List[Optional[str]] = [None]
+        self._vocab: Set[str] = set()
+        self._delete_index: Dict[str, List[str]] = {}
+        self._built = False
+        self.lookup = lru_cache(maxsize=65536)(self._lookup)
+
+    def __len__(self) -> int:
+        return sum(name is not None for name in self._names)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "Gazetteer":
+        """
+        Load a locality file: one place per line, `Canonical|alias|alias`;
+        blank lines and lines starting with # are ignored.
+        """
+        gazetteer = cls(**kwargs)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                names = [n.strip() for n in line.split("|") if n.strip()]
+                gazetteer.add(names[0], names[1:])
+        return gazetteer.build()
+
+    def add(self, name: str, aliases: Iterable[str] = ()) -> None:
+        if self._built:
+            raise RuntimeError("Cannot add names after build()")
+        for surface in (name, *aliases):
+            tokens = _TOKEN.findall(surface.lower())
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                nxt = self._children[node].get(token)
+                if nxt is None:
+                    nxt = len(self._children)
+                    self._children[node][token] = nxt
+                    self._children.append({})
+                    self._names.append(None)
+                node = nxt
+            # The first name added for a surface form wins.
+            if self._names[node] is None:
+                self._names[node] = name
+            self._vocab.update(tokens)
+
+    def build(self) -> "Gazetteer":
+        index: Dict[str, List[str]] = {}
+        for token in self._vocab:
+            budget = self._budget(token)
+            if budget == 0:
+                continue
+            for key in _deletes(token[: self.prefix_len], budget):
+                index.setdefault(key, []).append(token)
+        self._delete_index = index
+        self._built = True
+        self.lookup.cache_clear()
+        return self
+
+    def _budget(self, token: str) -> int:
+        if len(token) < self.min_fuzzy_len:
+            return 0
+        if len(token) < 2 * self.min_fuzzy_len:
+            return min(1, self.max_edits)
+        return self.max_edits
+
+    def _lookup(self, token: str) -> Tuple[Tuple[str, int], ...]:
+        """
+        Name tokens within this token's edit budget, as (name token, edits),
+        closest first. Cached: message tokens repeat a lot.
+        """
+        if token in self._vocab:
+            return ((token, 0),)
+        budget = self._budget(token)
+        if budget == 0:
+            return ()
+        candidates: Set[str] = set()
+        for key in _deletes(token[: self.prefix_len], budget):
+            candidates.update(self._delete_index.get(key, ()))
+        found = []
+        for candidate in candidates:
+            distance = _edit_distance(token, candidate, min(budget, self._budget(candidate)))
+            if distance <= budget:
+                found.append((candidate, distance))
+        return tuple(sorted(found, key=lambda c: (c[1], c[0])))
+
+    def find(self, text: str) -> List[GazetteerMatch]:
+        """
+        Non-overlapping place names in `text`, left to right. At each token
+        the longest name wins, then the one with the fewest edits.
+        """
+        return self.find_tokens(
+            [(m.group(), m.start(), m.end()) for m in _TOKEN.finditer(text.lower())]
+        )
+
+    def find_tokens(self, tokens: Sequence[Tuple[str, int, int]]) -> List[GazetteerMatch]:
+        """
+        find() for an already tokenized message: lowercased (token, start,
+        end) triples, e.g. an Utterance's tokens.
+        """
+        if not self._built:
+            raise RuntimeError("Gazetteer.build() has not been called")
+        candidates = [self.lookup(token) for token, _, _ in tokens]
+        children, names = self._children, self._names
+
+        matches: List[GazetteerMatch] = []
+        i = 0
+        while i < len(tokens):
+            best: Optional[Tuple[int, int, str]] = None  # (end token, edits, name)
+            stack = [(0, i, 0)]
+            while stack:
+                node, j, edits = stack.pop()
+                if j > i and names[node] is not None:
+                    if best is None or (j, -edits) > (best[0], -best[1]):
+                        best = (j, edits, names[node])
+                if j == len(tokens):
+                    continue
+                for token, distance in candidates[j]:
+                    child = children[node].get(token)
+                    if child is not None and edits + distance <= self.max_edits:
+                        stack.append((child, j + 1, edits + distance))
+            if best is None:
+                i += 1
+                continue
+            end, edits, name = best
+            matches.append(GazetteerMatch(tokens[i][1], tokens[end - 1][2], name, edits))
+            i = end
+        return matches
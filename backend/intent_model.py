@@ -1,8 +1,33 @@
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
-import joblib
-from sklearn.pipeline import Pipeline
+import numpy as np
+
+from utterance import Utterance, normalize_utterance, utterance_ngrams
+
+# joblib / sklearn are imported where needed: importing sklearn dominates the
+# server's startup time and the NumPy model doesn't need it at all.
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+# Front models with their exported fast path (see CascadeIntentModel) when
+# one exists next to them; NLU_CASCADE=0 always runs the full model.
+CASCADE_ENABLED = os.getenv("NLU_CASCADE", "1") != "0"
+
+# Models take messages as strings or as Utterances (see utterance.py), whose
+# tokens they reuse where they can.
+Message = Union[str, Utterance]
+
+
+def _texts(messages: Sequence[Message]) -> List[str]:
+    return [m.text if isinstance(m, Utterance) else m for m in messages]
 
 
 class IntentModel:
@@ -11,11 +36,14 @@ class IntentModel:
     The pipeline is expected to output a single intent label string.
     """
 
-    def __init__(self, pipeline: Pipeline):
+    def __init__(self, pipeline: "Pipeline"):
         self.pipeline = pipeline
 
     @classmethod
     def load(cls, model_path: str) -> "IntentModel":
+        import joblib
+        from sklearn.pipeline import Pipeline
+
         path = Path(model_path)
         if not path.exists():
             raise FileNotFoundError(f"Intent model not found at {model_path}")
@@ -24,19 +52,654 @@ class IntentModel:
             raise ValueError("Loaded object is not a scikit-learn Pipeline")
         return cls(pipeline)
 
-    def predict_intent(self, text: str) -> str:
-        preds = self.pipeline.predict([text])
-        return str(preds[0])
+    def predict_intent(self, text: Message) -> str:
+        return self.predict_intents([text])[0]
+
+    def predict_intents(self, texts: Sequence[Message]) -> List[str]:
+        """
+        Vectorized prediction: one TF-IDF transform and one MLP forward pass
+        for the whole batch instead of one per message.
+        """
+        if not texts:
+            return []
+        preds = self.pipeline.predict(_texts(texts))
+        return [str(p) for p in preds]
 
-    def predict_proba(self, text: str) -> Optional[Any]:
-        clf = self.pipeline.named_steps.get("mlp")
-        if clf is None or not hasattr(clf, "predict_proba"):
+    def predict_proba_batch(self, texts: Sequence[Message]) -> Optional[np.ndarray]:
+        """
+        Class probabilities for a batch (one transform and one forward pass
+        through the whole pipeline), or None if the classifier has none.
+        sklearn's vectorizer tokenizes the raw texts itself.
+        """
+        if not hasattr(self.pipeline, "predict_proba"):
             return None
-        proba = clf.predict_proba(
-            self.pipeline.named_steps["tfidf"].transform([text])
-        )
-        return proba[0]
+        return self.pipeline.predict_proba(_texts(texts))
+
+    def predict_proba(self, text: Message) -> Optional[Any]:
+        proba = self.predict_proba_batch([text])
+        return None if proba is None else proba[0]
+
+    def predict_top_k(self, text: Message, k: int = 3) -> List[Tuple[str, float]]:
+        return self.predict_top_ks([text], k)[0]
+
+    def predict_top_ks(self, texts: Sequence[Message], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        The `k` most likely intents per text with their probabilities, best
+        first, from a single pass through the pipeline. Classifiers without
+        probabilities report just their prediction, with confidence 1.0.
+        """
+        if not texts:
+            return []
+        proba = self.predict_proba_batch(texts)
+        if proba is None:
+            return [[(label, 1.0)] for label in self.predict_intents(texts)]
+        return _top_k(proba, self.pipeline.classes_, k)
 
     @property
     def classes(self):
         return list(self.pipeline.classes_)
+
+
+class NumpyIntentModel:
+    """
+    sklearn-free inference for a TF-IDF + MLP pipeline.
+
+    Holds the vocabulary, IDF vector, MLP weights and class labels exported
+    from the trained sklearn pipeline (see `from_pipeline` / `save`) and runs
+    tokenization and the forward pass directly in NumPy, skipping sklearn's
+    Pipeline and input validation overhead. Predictions match the sklearn
+    pipeline it was exported from; train_intent_model.py checks this on every
+    export.
+    """
+
+    def __init__(
+        self,
+        vocabulary: Union[Dict[str, int], "HashedVocabulary"],
+        idf: np.ndarray,
+        coefs: List[np.ndarray],
+        intercepts: List[np.ndarray],
+        classes: Sequence[str],
+        config: Dict[str, Any],
+    ):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self._classes = [str(c) for c in classes]
+        self.config = config
+
+        self.lowercase = bool(config["lowercase"])
+        self.ngram_range: Tuple[int, int] = tuple(config["ngram_range"])
+        self.token_re = re.compile(config["token_pattern"])
+        # With sklearn's default lowercase \w\w+ tokens, an Utterance's
+        # tokens can be reused as they are.
+        self._utterance_tokens = self.lowercase and config["token_pattern"] == r"(?u)\b\w\w+\b"
+        self.activation = config["activation"]
+        self.out_activation = config["out_activation"]
+
+    @classmethod
+    def from_pipeline(cls, pipeline: "Pipeline") -> "NumpyIntentModel":
+        tfidf = pipeline.named_steps["tfidf"]
+        mlp = pipeline.named_steps["mlp"]
+        params = tfidf.get_params()
+        required = {
+            "analyzer": "word",
+            "binary": False,
+            "norm": "l2",
+            "preprocessor": None,
+            "stop_words": None,
+            "strip_accents": None,
+            "sublinear_tf": False,
+            "tokenizer": None,
+            "use_idf": True,
+        }
+        for name, expected in required.items():
+            if params[name] != expected:
+                raise ValueError(
+                    f"Cannot export TfidfVectorizer with {name}={params[name]!r} "
+                    f"(only {expected!r} is supported)"
+                )
+        if mlp.activation not in _ACTIVATIONS:
+            raise ValueError(f"Unsupported MLP activation {mlp.activation!r}")
+
+        config = {
+            "lowercase": params["lowercase"],
+            "ngram_range": list(params["ngram_range"]),
+            "token_pattern": params["token_pattern"],
+            "activation": mlp.activation,
+            "out_activation": mlp.out_activation_,
+        }
+        return cls(
+            vocabulary={str(t): int(i) for t, i in tfidf.vocabulary_.items()},
+            idf=np.asarray(tfidf.idf_, dtype=np.float64),
+            coefs=[np.asarray(w, dtype=np.float64) for w in mlp.coefs_],
+            intercepts=[np.asarray(b, dtype=np.float64) for b in mlp.intercepts_],
+            classes=list(mlp.classes_),
+            config=config,
+        )
+
+    def save(self, model_path: Union[str, Path]) -> None:
+        """
+        Write the compact .npz inference artifact.
+        """
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        arrays = {
+            "vocabulary": np.array(terms, dtype=str),
+            "idf": self.idf,
+            "classes": np.array(self._classes, dtype=str),
+            "config": np.array(json.dumps(self.config)),
+        }
+        for i, (w, b) in enumerate(zip(self.coefs, self.intercepts)):
+            arrays[f"coef_{i}"] = w
+            arrays[f"intercept_{i}"] = b
+        with open(model_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, model_path: str) -> "NumpyIntentModel":
+        path = Path(model_path)
+        if not path.exists():
+            raise FileNotFoundError(f"Intent model not found at {model_path}")
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = sum(1 for name in data.files if name.startswith("coef_"))
+            terms = data["vocabulary"].tolist()
+            return cls(
+                vocabulary={t: i for i, t in enumerate(terms)},
+                idf=data["idf"],
+                coefs=[data[f"coef_{i}"] for i in range(n_layers)],
+                intercepts=[data[f"intercept_{i}"] for i in range(n_layers)],
+                classes=data["classes"].tolist(),
+                config=json.loads(str(data["config"])),
+            )
+
+    def save_mmap(self, model_dir: Union[str, Path]) -> None:
+        """
+        Write the memory-mappable artifact: a directory of plain .npy arrays
+        (IDF, weights, vocabulary hash table) plus meta.json. See load_mmap.
+        """
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        arrays = HashedVocabulary.build(terms)
+        arrays["idf"] = self.idf
+        for i, (w, b) in enumerate(zip(self.coefs, self.intercepts)):
+            arrays[f"coef_{i}"] = w
+            arrays[f"intercept_{i}"] = b
+        for name, array in arrays.items():
+            np.save(model_dir / f"{name}.npy", np.ascontiguousarray(array))
+        meta = {
+            "format": "intent-model-mmap/1",
+            "n_layers": len(self.coefs),
+            "classes": self._classes,
+            "config": self.config,
+        }
+        (model_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    @classmethod
+    def load_mmap(cls, model_dir: str) -> "NumpyIntentModel":
+        """
+        Open a save_mmap() directory. The arrays are memory-mapped read-only,
+        so loading is near-instant and every process on the machine that
+        opens the same files shares one copy of them in the page cache.
+        """
+        path = Path(model_dir)
+        meta_path = path / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Intent model not found at {model_dir}")
+        meta = json.loads(meta_path.read_text())
+
+        def array(name: str) -> np.ndarray:
+            # Plain ndarray view of the mapping: same pages, cheaper indexing.
+            return np.load(path / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+
+        return cls(
+            vocabulary=HashedVocabulary(
+                array("vocab_table"),
+                array("vocab_hashes"),
+                array("vocab_blob"),
+                array("vocab_offsets"),
+            ),
+            idf=array("idf"),
+            coefs=[array(f"coef_{i}") for i in range(meta["n_layers"])],
+            intercepts=[array(f"intercept_{i}") for i in range(meta["n_layers"])],
+            classes=meta["classes"],
+            config=meta["config"],
+        )
+
+    def _analyze(self, text: Message) -> List[str]:
+        """
+        Same tokens and n-grams as TfidfVectorizer's "word" analyzer.
+        """
+        if isinstance(text, Utterance):
+            if self._utterance_tokens:
+                tokens = [w for w in text.words if len(w) > 1]
+            else:
+                tokens = self.token_re.findall(text.lower if self.lowercase else text.text)
+        else:
+            tokens = self.token_re.findall(text.lower() if self.lowercase else text)
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            grams.extend(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _tfidf(self, texts: Sequence[Message]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse L2-normalized TF-IDF rows as (row, column, value) arrays.
+        """
+        rows: List[int] = []
+        cols: List[int] = []
+        counts: List[int] = []
+        vocab = self.vocabulary
+        for r, text in enumerate(texts):
+            features = Counter(
+                idx for idx in map(vocab.get, self._analyze(text)) if idx is not None
+            )
+            rows.extend([r] * len(features))
+            cols.extend(features.keys())
+            counts.extend(features.values())
+
+        row_idx = np.asarray(rows, dtype=np.intp)
+        col_idx = np.asarray(cols, dtype=np.intp)
+        values = np.asarray(counts, dtype=np.float64) * self.idf[col_idx]
+        norms = np.sqrt(np.bincount(row_idx, weights=values * values, minlength=len(texts)))
+        norms[norms == 0.0] = 1.0
+        values /= norms[row_idx]
+        return row_idx, col_idx, values
+
+    def _forward(self, texts: Sequence[Message]) -> np.ndarray:
+        row_idx, col_idx, values = self._tfidf(texts)
+
+        # First layer: sparse rows times the dense weight matrix.
+        hidden = np.zeros((len(texts), self.coefs[0].shape[1]))
+        np.add.at(hidden, row_idx, self.coefs[0][col_idx] * values[:, None])
+        hidden += self.intercepts[0]
+
+        activation = _ACTIVATIONS[self.activation]
+        for w, b in zip(self.coefs[1:], self.intercepts[1:]):
+            hidden = activation(hidden)
+            hidden = hidden @ w + b
+        return _ACTIVATIONS[self.out_activation](hidden)
+
+    def predict_proba_batch(self, texts: Sequence[Message]) -> np.ndarray:
+        out = self._forward(texts)
+        if self.out_activation == "logistic":
+            out = np.hstack([1.0 - out, out])
+        return out
+
+    def predict_intent(self, text: Message) -> str:
+        return self.predict_intents([text])[0]
+
+    def predict_intents(self, texts: Sequence[Message]) -> List[str]:
+        if not texts:
+            return []
+        proba = self.predict_proba_batch(texts)
+        return [self._classes[i] for i in proba.argmax(axis=1)]
+
+    def predict_proba(self, text: Message) -> Optional[Any]:
+        return self.predict_proba_batch([text])[0]
+
+    def predict_top_k(self, text: Message, k: int = 3) -> List[Tuple[str, float]]:
+        return self.predict_top_ks([text], k)[0]
+
+    def predict_top_ks(self, texts: Sequence[Message], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """
+        The `k` most likely intents per text with their probabilities, best
+        first, from one forward pass.
+        """
+        if not texts:
+            return []
+        return _top_k(self.predict_proba_batch(texts), self._classes, k)
+
+    @property
+    def classes(self):
+        return list(self._classes)
+
+
+class HashedVocabulary:
+    """
+    Read-only term -> feature index map stored in flat arrays, so it can be
+    memory-mapped instead of unpickled into a dict.
+
+    - vocab_blob / vocab_offsets: UTF-8 bytes of every term, concatenated;
+      term i is blob[offsets[i]:offsets[i + 1]].
+    - vocab_table: open-addressing hash table (power-of-two size, linear
+      probing) of feature indices, -1 for empty slots.
+    - vocab_hashes: CRC32 of the term in each slot, checked before comparing
+      bytes.
+    """
+
+    def __init__(
+        self,
+        table: np.ndarray,
+        hashes: np.ndarray,
+        blob: np.ndarray,
+        offsets: np.ndarray,
+    ):
+        self.table = table
+        self.hashes = hashes
+        self.blob = blob
+        self.offsets = offsets
+        self.mask = len(table) - 1
+
+    @staticmethod
+    def build(terms: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Arrays for a vocabulary where terms[i] has feature index i.
+        """
+        encoded = [t.encode("utf-8") for t in terms]
+        size = 1
+        while size < 2 * max(len(encoded), 1):
+            size *= 2
+        table = np.full(size, -1, dtype=np.int32)
+        hashes = np.zeros(size, dtype=np.uint32)
+        for idx, term in enumerate(encoded):
+            h = zlib.crc32(term)
+            slot = h & (size - 1)
+            while table[slot] != -1:
+                slot = (slot + 1) & (size - 1)
+            table[slot] = idx
+            hashes[slot] = h
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(t) for t in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return {
+            "vocab_table": table,
+            "vocab_hashes": hashes,
+            "vocab_blob": blob,
+            "vocab_offsets": offsets,
+        }
+
+    def get(self, term: str) -> Optional[int]:
+        key = term.encode("utf-8")
+        h = zlib.crc32(key)
+        slot = h & self.mask
+        while True:
+            idx = int(self.table[slot])
+            if idx == -1:
+                return None
+            if int(self.hashes[slot]) == h:
+                start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+                if self.blob[start:end].tobytes() == key:
+                    return idx
+            slot = (slot + 1) & self.mask
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self.term(idx)
+
+    def term(self, idx: int) -> str:
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _logistic(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _top_k(proba: np.ndarray, classes: Sequence[Any], k: int) -> List[List[Tuple[str, float]]]:
+    """
+    Rows of (label, probability) for the `k` highest probabilities per row.
+    Ties keep class order, so the first entry matches argmax / predict().
+    """
+    order = np.argsort(-proba, axis=1, kind="stable")[:, :k]
+    return [
+        [(str(classes[j]), float(row[j])) for j in idx]
+        for row, idx in zip(proba, order)
+    ]
+
+
+_ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": _relu,
+    "tanh": np.tanh,
+    "logistic": _logistic,
+    "softmax": _softmax,
+}
+
+
+class FastPathModel:
+    """
+    First stage of the classifier cascade (see CascadeIntentModel), written
+    by train_intent_model.py next to the model it fronts:
+
+    - exact: the full model's probabilities for frequent utterances, looked
+      up by normalize_utterance() (Utterance.normalized);
+    - linear: a logistic regression over binary unigrams and bigrams
+      (L2-normalized), trained to reproduce the full model's predictions.
+      Its answer is used when its top probability reaches `threshold`,
+      calibrated on held-out messages for a target agreement with the full
+      model.
+
+    `meta` holds the training-time calibration report.
+    """
+
+    def __init__(
+        self,
+        utterances: Sequence[str],
+        exact_proba: np.ndarray,
+        terms: Sequence[str],
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: Sequence[str],
+        threshold: float,
+        meta: Dict[str, Any],
+    ):
+        self.exact = {u: i for i, u in enumerate(utterances)}
+        self.exact_proba = exact_proba
+        self.vocabulary = {t: i for i, t in enumerate(terms)}
+        # (n_terms, n_classes), so a message's logits are a sum of rows.
+        self.coef = coef
+        self.intercept = intercept.astype(np.float64)
+        self.classes = [str(c) for c in classes]
+        self.threshold = threshold
+        self.meta = meta
+
+    def linear_proba(self, grams: Set[str]) -> np.ndarray:
+        vocabulary = self.vocabulary
+        idx = [vocabulary[g] for g in grams if g in vocabulary]
+        logits = self.intercept
+        if idx:
+            # Unknown n-grams still count towards the L2 norm.
+            logits = logits + self.coef[idx].sum(axis=0) * (1.0 / math.sqrt(len(grams)))
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def predict_proba_batch(self, texts: Sequence[Message]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Probabilities and the stage that decided each text: "exact",
+        "linear", or "full" for texts the full model must classify (their
+        rows are left as the linear model's guess).
+        """
+        proba = np.empty((len(texts), len(self.classes)))
+        stages = []
+        for i, text in enumerate(texts):
+            if isinstance(text, Utterance):
+                normalized = text.normalized
+            else:
+                normalized = normalize_utterance(text)
+            row = self.exact.get(normalized)
+            if row is not None:
+                proba[i] = self.exact_proba[row]
+                stages.append("exact")
+                continue
+            grams = text.ngrams if isinstance(text, Utterance) else utterance_ngrams(normalized.split())
+            proba[i] = self.linear_proba(grams)
+            stages.append("linear" if proba[i].max() >= self.threshold else "full")
+        return proba, stages
+
+    def save(self, path: Union[str, Path]) -> None:
+        utterances = sorted(self.exact, key=self.exact.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                utterances=np.array(utterances, dtype=str),
+                exact_proba=self.exact_proba,
+                terms=np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=str),
+                coef=self.coef,
+                intercept=self.intercept,
+                classes=np.array(self.classes, dtype=str),
+                threshold=np.array(self.threshold),
+                meta=np.array(json.dumps(self.meta)),
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FastPathModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                utterances=data["utterances"].tolist(),
+                exact_proba=data["exact_proba"],
+                terms=data["terms"].tolist(),
+                coef=data["coef"],
+                intercept=data["intercept"],
+                classes=data["classes"].tolist(),
+                threshold=float(data["threshold"]),
+                meta=json.loads(str(data["meta"])),
+            )
+
+
+class CascadeIntentModel:
+    """
+    Confidence-gated cascade: the FastPathModel answers the messages it is
+    sure about and only the rest go to the full model (TF-IDF + MLP), in one
+    batched call. Same interface as the other intent models.
+
+    predict_top_ks_staged() also returns which stage decided each message
+    (the NLU pipeline records it as a stage timing).
+    """
+
+    def __init__(self, fast: FastPathModel, full: Union[IntentModel, NumpyIntentModel]):
+        if fast.classes != [str(c) for c in full.classes]:
+            raise ValueError("Fast path classes do not match the model's classes")
+        self.fast = fast
+        self.full = full
+        self._classes = fast.classes
+
+    def predict_proba_staged(
+        self, texts: Sequence[Message], escalate: bool = True
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        With `escalate=False` (degraded serving) nothing goes to the full
+        model: the linear model's guess is kept even below the threshold.
+        """
+        proba, stages = self.fast.predict_proba_batch(texts)
+        rest = [i for i, stage in enumerate(stages) if stage == "full"]
+        if rest and not escalate:
+            for i in rest:
+                stages[i] = "linear"
+        elif rest:
+            proba[rest] = self.full.predict_proba_batch([texts[i] for i in rest])
+        return proba, stages
+
+    def predict_proba_batch(self, texts: Sequence[Message]) -> np.ndarray:
+        return self.predict_proba_staged(texts)[0]
+
+    def predict_intent(self, text: Message) -> str:
+        return self.predict_intents([text])[0]
+
+    def predict_intents(self, texts: Sequence[Message]) -> List[str]:
+        if not texts:
+            return []
+        proba = self.predict_proba_batch(texts)
+        return [self._classes[i] for i in proba.argmax(axis=1)]
+
+    def predict_proba(self, text: Message) -> Optional[Any]:
+        return self.predict_proba_batch([text])[0]
+
+    def predict_top_k(self, text: Message, k: int = 3) -> List[Tuple[str, float]]:
+        return self.predict_top_ks([text], k)[0]
+
+    def predict_top_ks(self, texts: Sequence[Message], k: int = 3) -> List[List[Tuple[str, float]]]:
+        return self.predict_top_ks_staged(texts, k)[0]
+
+    def predict_top_ks_staged(
+        self, texts: Sequence[Message], k: int = 3, escalate: bool = True
+    ) -> Tuple[List[List[Tuple[str, float]]], List[str]]:
+        if not texts:
+            return [], []
+        proba, stages = self.predict_proba_staged(texts, escalate)
+        return _top_k(proba, self._classes, k), stages
+
+    @property
+    def classes(self):
+        return list(self._classes)
+
+
+AnyIntentModel = Union[IntentModel, NumpyIntentModel, CascadeIntentModel]
+
+
+def cascade_path(model_path: str) -> Path:
+    """
+    Where the fast path for a model artifact lives: cascade.npz inside an
+    mmap model directory, else intent_model.cascade.npz next to
+    intent_model.joblib / .npz (both exports of one model share it).
+    """
+    path = Path(model_path)
+    if path.is_dir():
+        return path / "cascade.npz"
+    return path.with_suffix(".cascade.npz")
+
+
+def read_cascade_meta(model_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Training-time report of a model's fast path, or None if it has none.
+    """
+    path = cascade_path(model_path)
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        meta["threshold"] = float(data["threshold"])
+    return meta
+
+
+def artifact_version(model_path: str) -> str:
+    """
+    Content fingerprint of a model artifact (file or mmap directory, plus its
+    fast path), used as the model version: it changes whenever the artifact
+    is replaced.
+    """
+    path = Path(model_path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    if not path.is_dir() and cascade_path(model_path).exists():
+        files.append(cascade_path(model_path))
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.name.encode("utf-8"))
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def load_intent_model(model_path: str) -> AnyIntentModel:
+    """
+    Load an intent model artifact: a pickled sklearn pipeline (.joblib), an
+    exported NumPy model (.npz) or a memory-mappable model directory.
+    """
+    if Path(model_path).is_dir():
+        model: AnyIntentModel = NumpyIntentModel.load_mmap(model_path)
+    elif str(model_path).endswith(".npz"):
+        model = NumpyIntentModel.load(model_path)
+    else:
+        model = IntentModel.load(model_path)
+        if not hasattr(model.pipeline, "predict_proba"):
+            return model
+    fast_path = cascade_path(model_path)
+    if CASCADE_ENABLED and fast_path.exists():
+        return CascadeIntentModel(FastPathModel.load(fast_path), model)
+    return model
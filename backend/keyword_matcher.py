@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterator, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick multi-pattern matcher.
+
+    Keywords are added with a tag; after `build()`, `find(text)` returns the
+    tags of every keyword occurring anywhere in the text (plain substring
+    semantics, same as `kw in text`) in a single left-to-right pass, however
+    many keywords there are.
+
+    Matching is case-sensitive; callers pass lowercased text and keywords.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[Hashable]] = [frozenset()]
+        self._keywords_at: List[Tuple[str, ...]] = [()]
+        self._pending: List[Set[Hashable]] = [set()]
+        self._pending_kw: List[Set[str]] = [set()]
+        # Memoized full transitions (goto + fail links), filled lazily for
+        # characters of the keyword alphabet only; any other character leads
+        # back to the root, so arbitrary input can't grow the memo.
+        self._delta: List[Dict[str, int]] = []
+        self._alphabet: FrozenSet[str] = frozenset()
+        self._built = False
+
+    def add(self, keyword: str, tag: Hashable) -> None:
+        if self._built:
+            raise RuntimeError("Cannot add keywords after build()")
+        if not keyword:
+            raise ValueError("Empty keyword")
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._pending.append(set())
+                self._pending_kw.append(set())
+            state = nxt
+        self._pending[state].add(tag)
+        self._pending_kw[state].add(keyword)
+
+    def build(self) -> "KeywordMatcher":
+        """
+        Compute failure links and merge outputs along them, so that reaching a
+        state reports every keyword that ends there.
+        """
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._pending[nxt] |= self._pending[self._fail[nxt]]
+                self._pending_kw[nxt] |= self._pending_kw[self._fail[nxt]]
+
+        self._out = [frozenset(tags) for tags in self._pending]
+        self._keywords_at = [tuple(sorted(kws, key=len)) for kws in self._pending_kw]
+        self._pending = []
+        self._pending_kw = []
+        self._delta = [dict(edges) for edges in self._goto]
+        self._alphabet = frozenset(ch for edges in self._goto for ch in edges)
+        self._built = True
+        return self
+
+    def _step(self, state: int, ch: str) -> int:
+        nxt = self._delta[state].get(ch)
+        if nxt is not None:
+            return nxt
+        if ch not in self._alphabet:
+            return 0
+        f = state
+        while f and ch not in self._goto[f]:
+            f = self._fail[f]
+        nxt = self._goto[f].get(ch, 0)
+        self._delta[state][ch] = nxt
+        return nxt
+
+    def find(self, text: str) -> FrozenSet[Hashable]:
+        """
+        Tags of all keywords occurring in `text`.
+        """
+        if not self._built:
+            raise RuntimeError("KeywordMatcher.build() has not been called")
+        delta = self._delta
+        out = self._out
+        found: Set[Hashable] = set()
+        state = 0
+        for ch in text:
+            nxt = delta[state].get(ch)
+            state = nxt if nxt is not None else self._step(state, ch)
+            if out[state]:
+                found |= out[state]
+        return frozenset(found)
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yield (start, end, keyword) for every keyword occurrence in `text`.
+        """
+        if not self._built:
+            raise RuntimeError("KeywordMatcher.build() has not been called")
+        state = 0
+        for i, ch in enumerate(text):
+            state = self._step(state, ch)
+            for kw in self._keywords_at[state]:
+                yield i + 1 - len(kw), i + 1, kw
@@ -0,0 +1,158 @@
+"""
+Deadline-aware admission control for the NLU pipeline.
+
+Every request that needs the pipeline is admitted by the server with a
+Deadline: when it was admitted and how long it may wait for a worker. The
+pipeline checks it when it actually starts on the request (possibly in a
+worker process, after queueing in the executor or micro-batcher):
+
+- waited longer than `degrade_after`: run the degraded pipeline (cheapest
+  classifier path, no dateparser fallback) and flag the result `degraded`;
+- waited longer than `shed_after`: don't run it at all (the client has
+  most likely given up); the server answers 503 with Retry-After.
+
+The server also sheds at the door: when the backlog ahead of a new request
+would keep it waiting past `shed_after`, it is rejected right away instead
+of joining a queue it would time out in.
+
+Until the server is ready, requests get no deadline: they queue behind the
+warm-up jobs, which take seconds, and would all be shed otherwise.
+"""
+import math
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class Deadline(NamedTuple):
+    # time.monotonic() at admission (the clock is shared by worker processes).
+    admitted_at: float
+    # Seconds of queueing after which the request is degraded / shed
+    # (0 disables either).
+    degrade_after: float
+    shed_after: float
+
+    def waited(self) -> float:
+        return time.monotonic() - self.admitted_at
+
+
+class OverloadedError(Exception):
+    """Raised at admission while the pipeline's queue is too slow to join."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised by the pipeline for a request that waited past its shed deadline."""
+
+    def __init__(self, queue_seconds: float):
+        super().__init__(queue_seconds)
+        self.queue_seconds = queue_seconds
+
+    def __str__(self) -> str:
+        return f"Request waited {self.queue_seconds * 1000:.0f} ms for the NLU pipeline"
+
+
+def check_deadline(deadline: Optional[Deadline]) -> Optional[float]:
+    """
+    Called when the pipeline starts on a request: the seconds it queued for
+    (None without a deadline). Raises DeadlineExceededError past its shed
+    deadline.
+    """
+    if deadline is None:
+        return None
+    waited = deadline.waited()
+    if deadline.shed_after and waited >= deadline.shed_after:
+        raise DeadlineExceededError(waited)
+    return waited
+
+
+def is_degraded(deadline: Optional[Deadline], waited: Optional[float]) -> bool:
+    return bool(deadline and deadline.degrade_after and waited >= deadline.degrade_after)
+
+
+class AdmissionController:
+    """
+    Hands out Deadlines and decides whether to shed new requests.
+
+    It keeps a moving average of how long a pipeline job takes once a worker
+    starts on it (`observe_job`), starting from `initial_job_ms` until the
+    first job is observed. A new request's expected wait is the
+    backlog (jobs waiting for one of `concurrency` workers) times that;
+    past `shed_after_ms`, `admit` raises OverloadedError and the client is
+    told to retry after about that long (`retry_after`). As the backlog
+    drains, the estimate drops and requests are admitted again.
+
+    Only meant to be used from the event loop thread (no locking).
+    """
+
+    def __init__(
+        self,
+        degrade_after_ms: float = 0.0,
+        shed_after_ms: float = 0.0,
+        concurrency: int = 1,
+        smoothing: float = 0.2,
+        initial_job_ms: float = 10.0,
+    ):
+        self.degrade_after = degrade_after_ms / 1000.0
+        self.shed_after = shed_after_ms / 1000.0
+        self.concurrency = max(1, concurrency)
+        self.smoothing = smoothing
+        self.job_seconds = initial_job_ms / 1000.0
+        self.jobs_observed = 0
+
+        self.admitted_total = 0
+        self.degraded_total = 0
+        self.shed_total: Dict[str, int] = {}
+
+    def estimated_wait(self, backlog: int) -> float:
+        return backlog * self.job_seconds / self.concurrency
+
+    def admit(self, backlog: int, enforce: bool = True) -> Deadline:
+        """
+        A Deadline for a new request, or OverloadedError. With `enforce`
+        False (the server is still warming up) the request is neither shed
+        nor degraded, however long it waits.
+        """
+        if not enforce:
+            self.admitted_total += 1
+            return Deadline(time.monotonic(), 0.0, 0.0)
+        wait = self.estimated_wait(backlog)
+        if self.shed_after and wait >= self.shed_after:
+            raise OverloadedError(
+                f"NLU pipeline is overloaded ({backlog} jobs queued, about "
+                f"{wait * 1000:.0f} ms wait, limit {self.shed_after * 1000:.0f} ms)"
+            )
+        self.admitted_total += 1
+        return Deadline(time.monotonic(), self.degrade_after, self.shed_after)
+
+    def observe_job(self, seconds: float, degraded: int = 0) -> None:
+        """
+        A pipeline job finished `seconds` after a worker started on it;
+        `degraded` of its results were degraded.
+        """
+        if self.jobs_observed:
+            self.job_seconds += self.smoothing * (seconds - self.job_seconds)
+        else:
+            self.job_seconds = seconds
+        self.jobs_observed += 1
+        self.degraded_total += degraded
+
+    def shed(self, reason: str) -> None:
+        """
+        Count a request rejected for `reason` ("overload", "deadline", ...).
+        """
+        self.shed_total[reason] = self.shed_total.get(reason, 0) + 1
+
+    def retry_after(self, backlog: int) -> int:
+        """
+        Seconds a rejected client should wait (Retry-After header).
+        """
+        return max(1, math.ceil(self.estimated_wait(backlog)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "degrade_after_ms": self.degrade_after * 1000.0,
+            "shed_after_ms": self.shed_after * 1000.0,
+            "avg_job_ms": self.job_seconds * 1000.0,
+            "admitted_total": self.admitted_total,
+            "degraded_total": self.degraded_total,
+            "shed_total": dict(self.shed_total),
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a request cannot be queued because the batcher is at capacity."""
+
+
+@dataclass
+class _PendingItem:
+    payload: Any
+    future: "asyncio.Future[Any]"
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls.
+
+    The first item to arrive opens a batch; the batch is dispatched once
+    `window_ms` has elapsed since then or `max_batch_size` items have been
+    collected, whichever comes first. `batch_fn` receives the list of payloads
+    and must return one result per payload, in order.
+
+    At most `max_queue_size` items may be waiting at any time; beyond that
+    `submit` raises QueueFullError so the caller can shed load.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        window_ms: float = 2.0,
+        max_batch_size: int = 32,
+        max_queue_size: int = 1024,
+        max_concurrent_batches: int = 1,
+    ):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue_size = max_queue_size
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: Optional["asyncio.Queue[_PendingItem]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+
+        # Stats
+        self.batches_total = 0
+        self.items_total = 0
+        self.rejected_total = 0
+        self.max_batch_seen = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_batch_size = 0
+        self.last_batch_wait_seconds = 0.0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        # Fail whatever is still queued instead of leaving callers hanging.
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            self._fail([queue.get_nowait()])
+
+    @staticmethod
+    def _fail(batch: List[_PendingItem]) -> None:
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(RuntimeError("Batcher stopped"))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, payload: Any) -> Any:
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher.start() has not been called")
+        loop = asyncio.get_running_loop()
+        item = _PendingItem(payload=payload, future=loop.create_future())
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            raise QueueFullError(
+                f"NLU batch queue is full ({self.max_queue_size} pending requests)"
+            )
+        return await item.future
+
+    async def _collect(self, batch: List[_PendingItem]) -> None:
+        """
+        Fill `batch` with the next batch of items. Items are added as they
+        are taken off the queue, so a cancelled collect leaves them in
+        `batch` to be failed.
+        """
+        assert self._queue is not None
+        batch.append(await self._queue.get())
+        deadline = batch[0].enqueued_at + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Anything that is already queued rides along for free.
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self) -> None:
+        assert self._slots is not None
+        while True:
+            batch: List[_PendingItem] = []
+            try:
+                await self._collect(batch)
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                # Stopped with a batch taken off the queue but not dispatched.
+                self._fail(batch)
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[_PendingItem]) -> None:
+        assert self._slots is not None
+        try:
+            # Callers that went away (client disconnect) don't need a result.
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                return
+
+            started = time.perf_counter()
+            waits = [started - item.enqueued_at for item in batch]
+            self._record(len(batch), max(waits), sum(waits))
+
+            try:
+                results = await self.batch_fn([item.payload for item in batch])
+            except Exception as exc:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+                return
+
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _record(self, size: int, max_wait: float, total_wait: float) -> None:
+        self.batches_total += 1
+        self.items_total += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.wait_seconds_total += total_wait
+        self.max_wait_seconds = max(self.max_wait_seconds, max_wait)
+        self.last_batch_size = size
+        self.last_batch_wait_seconds = max_wait
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.batches_total or 1
+        items = self.items_total or 1
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self.queue_depth,
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "rejected_total": self.rejected_total,
+            "avg_batch_size": self.items_total / batches,
+            "max_batch_size_seen": self.max_batch_seen,
+            "last_batch_size": self.last_batch_size,
+            "avg_wait_ms": self.wait_seconds_total / items * 1000.0,
+            "max_wait_ms": self.max_wait_seconds * 1000.0,
+            "last_batch_wait_ms": self.last_batch_wait_seconds * 1000.0,
+        }
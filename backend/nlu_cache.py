@@ -0,0 +1,123 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def normalize_message(text: str) -> str:
+    """
+    Cache key form of a message: surrounding and repeated whitespace removed.
+    """
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache for NLU responses, with in-flight request coalescing.
+
+    Every entry expires after `ttl_seconds`, or earlier if the value carries
+    its own expiry (responses with relative datetimes are only valid until
+    the reference time they were computed against changes meaning).
+
+    `get_or_compute` makes identical concurrent requests share a single
+    computation: the first caller starts it, the others await the same task.
+
+    Only meant to be used from the event loop thread (no locking).
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, valid_until: Optional[float] = None) -> None:
+        """
+        Store a value; `valid_until` (epoch seconds) shortens the TTL.
+        """
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if valid_until is not None:
+            expires_at = min(expires_at, valid_until)
+        if expires_at <= time.time():
+            return
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Tuple[Any, Optional[float]]]],
+    ) -> Any:
+        """
+        Return the cached value for `key`, or run `compute()` once for all
+        concurrent callers asking for it. `compute` returns (value, valid_until).
+
+        The computation runs as its own task, so a caller that goes away
+        (client disconnect) doesn't cancel it for the others.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        value, _ = await asyncio.shield(task)
+        return value
+
+    def _finish(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            value, valid_until = task.result()
+            self.put(key, value, valid_until)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
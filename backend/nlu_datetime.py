@@ -0,0 +1,434 @@
+"""
+Datetime slot extraction.
+
+A small compiled parser handles the phrasings we see most often
+("tomorrow 5 pm", "today evening", "in 2 hours", "monday", "25/12").
+Full dateparser only runs when the fast path can't decide, i.e. the message
+has something date-like in it that the fast path does not understand.
+
+Results are cached per (normalized text, reference date). Each entry also
+carries the instant until which it stays correct ("5 pm" means today until
+17:00 and tomorrow afterwards; "in 2 hours" is never reused), so relative
+expressions stay right across midnight and during the day.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+DATETIME_CACHE_SIZE = 4096
+
+_DATEPARSER_SETTINGS = {"PREFER_DATES_FROM": "future"}
+
+# Comma-separated dateparser language codes, e.g. "en". Unset means language
+# auto-detection, which loads every locale and makes the first dateparser
+# calls in a process take seconds.
+_DATEPARSER_LANGUAGES = [
+    code.strip()
+    for code in os.getenv("NLU_DATEPARSER_LANGUAGES", "").split(",")
+    if code.strip()
+] or None
+
+
+class DatetimeResult(NamedTuple):
+    iso: Optional[str]
+    # Text the value was read from; None means the whole message.
+    text: Optional[str]
+    # The result may be reused for the same text until this instant.
+    valid_until: datetime
+
+
+_WEEKDAYS = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+_MONTHS = {
+    "jan": 1,
+    "january": 1,
+    "feb": 2,
+    "february": 2,
+    "mar": 3,
+    "march": 3,
+    "apr": 4,
+    "april": 4,
+    "may": 5,
+    "jun": 6,
+    "june": 6,
+    "jul": 7,
+    "july": 7,
+    "aug": 8,
+    "august": 8,
+    "sep": 9,
+    "sept": 9,
+    "september": 9,
+    "oct": 10,
+    "october": 10,
+    "nov": 11,
+    "november": 11,
+    "dec": 12,
+    "december": 12,
+}
+_DAY_OFFSETS = {
+    "today": 0,
+    "tonight": 0,
+    "tomorrow": 1,
+    "tmrw": 1,
+    "tomorow": 1,
+    "day after tomorrow": 2,
+}
+_PARTS_OF_DAY = {
+    "morning": time(9, 0),
+    "noon": time(12, 0),
+    "afternoon": time(14, 0),
+    "evening": time(18, 0),
+    "night": time(21, 0),
+    "tonight": time(21, 0),
+    "midnight": time(0, 0),
+}
+_NUMBER_WORDS = {
+    "a": 1,
+    "an": 1,
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+}
+
+_MONTH_ALT = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_NUMBER_ALT = r"\d+|" + "|".join(_NUMBER_WORDS)
+
+_RELATIVE_RE = re.compile(
+    r"\b(?:in|after)\s+(?P<n>" + _NUMBER_ALT + r")\s*"
+    r"(?P<unit>minutes?|mins?|hours?|hrs?|days?|weeks?)\b"
+)
+_DAY_RE = re.compile(r"\b(?:day after tomorrow|tomorrow|tmrw|tomorow|today|tonight)\b")
+_WEEKDAY_RE = re.compile(
+    r"\b(?:(?P<modifier>next|this|coming)\s+)?(?P<weekday>" + "|".join(_WEEKDAYS) + r")\b"
+)
+# Dates are day-first (25/12). Dashes need a year so that "1-2 days" stays a range.
+_SLASH_DATE_RE = re.compile(r"\b(?P<day>\d{1,2})/(?P<month>\d{1,2})(?:/(?P<year>\d{2}|\d{4}))?\b")
+_DASH_DATE_RE = re.compile(r"\b(?P<day>\d{1,2})-(?P<month>\d{1,2})-(?P<year>\d{4})\b")
+_DAY_MONTH_RE = re.compile(
+    r"\b(?P<day>\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>" + _MONTH_ALT + r")\b"
+)
+_MONTH_DAY_RE = re.compile(
+    r"\b(?P<month>" + _MONTH_ALT + r")\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?\b"
+)
+_DATE_PATTERNS = (_SLASH_DATE_RE, _DASH_DATE_RE, _DAY_MONTH_RE, _MONTH_DAY_RE)
+_NOT_DATES = {"24/7"}
+_TIME_12H_RE = re.compile(
+    r"\b(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>a\.?m\.?|p\.?m\.?)(?=\W|$)"
+)
+_TIME_24H_RE = re.compile(r"\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)\b")
+_PART_OF_DAY_RE = re.compile(r"\b(?:morning|noon|afternoon|evening|night|tonight|midnight)\b")
+# A part of day is only a time with a date, a clock time or one of these
+# right before it ("at night", "in the evening"); "good morning" is not.
+_PART_OF_DAY_ANCHOR_RE = re.compile(
+    r"\b(?:at|by|in\s+the|this|before|after|till|until|from)\s+$"
+)
+
+# Anything that could be part of a date/time expression. Messages without any
+# of these have no datetime and never reach dateparser.
+_DATE_CUE_RE = re.compile(
+    r"\d|\b(?:"
+    + "|".join(
+        [
+            "today",
+            "tonight",
+            "tomorrow",
+            "tmrw",
+            "tomorow",
+            "yesterday",
+            "now",
+            "ago",
+            "noon",
+            "midnight",
+            "morning",
+            "afternoon",
+            "evening",
+            "night",
+            r"hours?",
+            r"hrs?",
+            r"minutes?",
+            r"mins?",
+            r"days?",
+            r"weeks?",
+            r"months?",
+            r"years?",
+            r"weekend",
+            r"fortnight",
+        ]
+        + list(_WEEKDAYS)
+        + list(_MONTHS)
+    )
+    + r")\b"
+)
+
+
+class _CannotDecide(Exception):
+    pass
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split()).strip(" .!?,")
+
+
+def _next_midnight(now: datetime) -> datetime:
+    return datetime.combine(now.date() + timedelta(days=1), time(0, 0))
+
+
+def _parse_number(token: str) -> int:
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def _first(matches, allow_several: bool = False):
+    """
+    Earliest match of one kind. Several different values of a kind
+    ("today or tomorrow") are ambiguous and left to dateparser, except for
+    dates and times where the first one is the start ("from 5 pm to 7 pm").
+    """
+    if not matches:
+        return None
+    matches.sort(key=lambda m: m.start())
+    first = matches[0]
+    if not allow_several and any(m.group(0) != first.group(0) for m in matches[1:]):
+        raise _CannotDecide()
+    return first
+
+
+def _fast_parse(norm: str, now: datetime) -> DatetimeResult:
+    """
+    Returns a result when the fast path recognises the expression or is sure
+    there is no datetime at all, and raises _CannotDecide otherwise.
+    """
+    if not _DATE_CUE_RE.search(norm):
+        return DatetimeResult(None, None, _next_midnight(now))
+
+    spans = []
+    valid_until = _next_midnight(now)
+
+    relative = _first(list(_RELATIVE_RE.finditer(norm)))
+    day_word = _first(list(_DAY_RE.finditer(norm)))
+    weekday = _first(list(_WEEKDAY_RE.finditer(norm)))
+    date_match = _first(
+        [
+            m
+            for pattern in _DATE_PATTERNS
+            for m in pattern.finditer(norm)
+            if m.group(0) not in _NOT_DATES
+        ],
+        allow_several=True,
+    )
+    time_match = _first(
+        list(_TIME_12H_RE.finditer(norm)) + list(_TIME_24H_RE.finditer(norm)),
+        allow_several=True,
+    )
+    part_of_day = _first(list(_PART_OF_DAY_RE.finditer(norm)))
+    if (
+        part_of_day is not None
+        and all(m is None for m in (relative, day_word, weekday, date_match, time_match))
+        and not _PART_OF_DAY_ANCHOR_RE.search(norm, 0, part_of_day.start())
+    ):
+        rest = norm[: part_of_day.start()] + " " + norm[part_of_day.end() :]
+        if not _DATE_CUE_RE.search(rest):
+            return DatetimeResult(None, None, _next_midnight(now))
+        raise _CannotDecide()
+
+    # "in 2 hours" is an instant relative to now; it can't be combined with
+    # anything else and is never cached.
+    if relative is not None and relative.group("unit")[0] in ("m", "h"):
+        if any(m is not None for m in (day_word, weekday, date_match, time_match, part_of_day)):
+            raise _CannotDecide()
+        n = _parse_number(relative.group("n"))
+        delta = timedelta(minutes=n) if relative.group("unit")[0] == "m" else timedelta(hours=n)
+        return DatetimeResult((now + delta).isoformat(), relative.group(0), now)
+
+    date_parts = [m for m in (relative, day_word, weekday, date_match) if m is not None]
+    if len(date_parts) > 1:
+        raise _CannotDecide()
+
+    # Time of day
+    tod: Optional[time] = None
+    if time_match is not None:
+        hour = int(time_match.group("hour"))
+        minute = int(time_match.group("minute") or 0)
+        ampm = time_match.groupdict().get("ampm")
+        if ampm is not None:
+            if not 1 <= hour <= 12:
+                raise _CannotDecide()
+            hour = hour % 12 + (12 if ampm.startswith("p") else 0)
+        tod = time(hour, minute)
+        spans.append(time_match)
+    elif part_of_day is not None:
+        tod = _PARTS_OF_DAY[part_of_day.group(0)]
+        spans.append(part_of_day)
+
+    if not date_parts and tod is None:
+        # Date-ish words we don't handle ("yesterday", "next week", "3 kg" ...).
+        raise _CannotDecide()
+
+    today = now.date()
+    day: Optional[date] = None
+    if date_parts:
+        part = date_parts[0]
+        spans.append(part)
+        if part is relative:
+            n = _parse_number(relative.group("n"))
+            unit_days = 7 if relative.group("unit").startswith("week") else 1
+            day = today + timedelta(days=n * unit_days)
+            if tod is None:
+                # Like dateparser, "in 2 days" keeps the current time of day.
+                return DatetimeResult(
+                    datetime.combine(day, now.time()).isoformat(), _span(norm, spans), now
+                )
+        elif part is day_word:
+            word = day_word.group(0)
+            day = today + timedelta(days=_DAY_OFFSETS[word])
+            if word == "tonight" and tod is None:
+                tod = _PARTS_OF_DAY["tonight"]
+            if tod is None:
+                # Like dateparser, "tomorrow" keeps the current time of day.
+                return DatetimeResult(
+                    datetime.combine(day, now.time()).isoformat(), _span(norm, spans), now
+                )
+        elif part is weekday:
+            ahead = (_WEEKDAYS[weekday.group("weekday")] - today.weekday()) % 7
+            day = today + timedelta(days=ahead)
+            if ahead == 0:
+                candidate = datetime.combine(day, tod or time(0, 0))
+                if candidate <= now or weekday.group("modifier") == "next":
+                    day += timedelta(days=7)
+                else:
+                    valid_until = min(valid_until, candidate)
+        else:
+            day = _resolve_calendar_date(date_match, today)
+    else:
+        # Only a time of day: today if it is still ahead, otherwise tomorrow.
+        candidate = datetime.combine(today, tod)
+        if candidate > now:
+            day = today
+            valid_until = min(valid_until, candidate)
+        else:
+            day = today + timedelta(days=1)
+
+    value = datetime.combine(day, tod or time(0, 0))
+    return DatetimeResult(value.isoformat(), _span(norm, spans), valid_until)
+
+
+def _resolve_calendar_date(m, today: date) -> date:
+    day = int(m.group("day"))
+    month_token = m.group("month")
+    month = int(month_token) if month_token.isdigit() else _MONTHS[month_token]
+    year_token = m.groupdict().get("year")
+    try:
+        if year_token:
+            year = int(year_token)
+            if year < 100:
+                year += 2000
+            return date(year, month, day)
+        value = date(today.year, month, day)
+        if value < today:
+            value = date(today.year + 1, month, day)
+        return value
+    except ValueError:
+        raise _CannotDecide()
+
+
+def _span(norm: str, matches) -> str:
+    start = min(m.start() for m in matches)
+    end = max(m.end() for m in matches)
+    return norm[start:end]
+
+
+def _dateparser_parse(text: str, now: datetime) -> DatetimeResult:
+    import dateparser  # Deferred: its language data is slow to load.
+
+    dt = dateparser.parse(
+        text,
+        languages=_DATEPARSER_LANGUAGES,
+        settings={**_DATEPARSER_SETTINGS, "RELATIVE_BASE": now},
+    )
+    if dt is None:
+        return DatetimeResult(None, None, _next_midnight(now))
+    # Values derived from the current clock (e.g. "2 days") can't be reused.
+    stable = dt.time() != now.time() and dt.second == 0 and dt.microsecond == 0
+    return DatetimeResult(dt.isoformat(), None, _next_midnight(now) if stable else now)
+
+
+class _DatetimeCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[str, date], DatetimeResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, date], now: datetime) -> Optional[DatetimeResult]:
+        with self._lock:
+            result = self._data.get(key)
+            if result is None:
+                return None
+            if now >= result.valid_until:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return result
+
+    def put(self, key: Tuple[str, date], result: DatetimeResult, now: datetime) -> None:
+        if now >= result.valid_until:
+            return
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _DatetimeCache(DATETIME_CACHE_SIZE)
+
+
+def clear_datetime_cache() -> None:
+    _cache.clear()
+
+
+def parse_datetime(
+    text: str, now: Optional[datetime] = None, fast_only: bool = False
+) -> DatetimeResult:
+    """
+    Extract a datetime from a message, relative to `now` (defaults to the
+    current local time). With `fast_only`, messages the fast path can't
+    decide get no datetime instead of going to dateparser (not cached).
+    """
+    if now is None:
+        now = datetime.now()
+    norm = _normalize(text)
+    key = (norm, now.date())
+
+    cached = _cache.get(key, now)
+    if cached is not None:
+        return cached
+
+    try:
+        result = _fast_parse(norm, now)
+    except _CannotDecide:
+        if fast_only:
+            return DatetimeResult(None, None, now)
+        result = _dateparser_parse(text, now)
+
+    _cache.put(key, result, now)
+    return result
@@ -0,0 +1,152 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import nlu_pipeline
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the executor already has `max_pending` jobs queued or running."""
+
+
+class NLUExecutor:
+    """
+    Runs the synchronous NLU pipeline off the event loop.
+
+    Modes:
+    - "inline": call the function directly on the event loop (no isolation,
+      lowest overhead; useful for debugging and single-request workloads).
+    - "thread": a ThreadPoolExecutor. Keeps the event loop responsive while
+      dateparser / sklearn run, sharing the model loaded in this process.
+    - "process": a ProcessPoolExecutor whose workers each load the model once
+      (nlu_pipeline.init_worker), so one server process can use several cores.
+
+    At most `max_pending` jobs may be queued or running; further submissions
+    fail fast with ExecutorBusyError instead of growing an unbounded backlog.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_pending: int = 256,
+        model_path: Optional[str] = None,
+        model_version: Optional[str] = None,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        if mode == "process" and model_path is None:
+            raise ValueError("model_path is required for the process executor")
+
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.model_path = model_path
+        self.model_version = model_version
+        self._pool: Optional[Executor] = None
+
+        self.pending = 0
+        self.completed_total = 0
+        self.rejected_total = 0
+        self.failed_total = 0
+        self.restarts_total = 0
+
+    def start(self) -> None:
+        if self._pool is not None or self.mode == "inline":
+            return
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="nlu"
+            )
+        else:
+            self._pool = self._process_pool(self.model_path, self.model_version)
+
+    def _process_pool(
+        self, model_path: str, model_version: Optional[str], warm: bool = False
+    ) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=nlu_pipeline.init_worker,
+            initargs=(model_path, model_version, warm),
+        )
+
+    async def restart(self, model_path: str, model_version: Optional[str]) -> None:
+        """
+        Process mode: start a new pool loading `model_path`, warm every
+        worker, then swap it in. Jobs already running on the old pool finish
+        there; new jobs go to the new one. Other modes share the server's
+        model and have nothing to restart.
+        """
+        if self.mode != "process":
+            return
+        # Every worker warms up in its initializer, before it takes a job,
+        # so no worker of the new pool ever serves a cold request. The probe
+        # jobs only start the workers and surface a model that fails to load.
+        new_pool = self._process_pool(model_path, model_version, warm=True)
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(
+                *[loop.run_in_executor(new_pool, os.getpid) for _ in range(self.max_workers)]
+            )
+        except BaseException:
+            new_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        old_pool, self._pool = self._pool, new_pool
+        self.model_path, self.model_version = model_path, model_version
+        self.restarts_total += 1
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def concurrency(self) -> int:
+        return 1 if self.mode == "inline" else self.max_workers
+
+    @property
+    def backlog(self) -> int:
+        """
+        Jobs waiting for a worker (pending beyond those running).
+        """
+        return max(0, self.pending - self.concurrency)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            self.rejected_total += 1
+            raise ExecutorBusyError(
+                f"NLU executor is busy ({self.pending} jobs pending, max {self.max_pending})"
+            )
+
+        self.pending += 1
+        try:
+            if self._pool is None:
+                result = fn(*args)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._pool, partial(fn, *args))
+        except Exception:
+            self.failed_total += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed_total += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.concurrency,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed_total": self.completed_total,
+            "rejected_total": self.rejected_total,
+            "failed_total": self.failed_total,
+            "restarts_total": self.restarts_total,
+        }
@@ -0,0 +1,295 @@
+"""
+Online learning from user corrections.
+
+/nlu/feedback (admin token, rate limited) records corrected (message,
+intent) pairs in a bounded FeedbackBuffer. The OnlineLearner periodically takes a batch of them,
+fine-tunes a copy of the active sklearn pipeline with partial_fit (keeping
+its vocabulary, or its hashing vectorizer), checks the copy against a
+holdout set and, if it is at least as good, publishes it as a new versioned
+artifact through the ModelManager, the same swap as a manual reload.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from nlu_model_manager import ModelManager, ModelReloadError
+
+logger = logging.getLogger(__name__)
+
+Example = Tuple[str, str]
+
+
+class FeedbackBuffer:
+    """
+    Most recent corrections, oldest dropped first once `maxsize` is reached.
+
+    `allow()` rate limits incoming corrections with a token bucket:
+    `rate_per_second` on average, bursts of up to `burst` (rate 0: no
+    limit), so a single client can't flush the buffer with its own labels.
+
+    Only meant to be used from the event loop thread (no locking).
+    """
+
+    def __init__(self, maxsize: int = 10000, rate_per_second: float = 0.0, burst: int = 1):
+        self.maxsize = maxsize
+        self._items: Deque[Example] = deque(maxlen=maxsize)
+        self.received_total = 0
+        self.dropped_total = 0
+
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._tokens_at = time.monotonic()
+        self.rate_limited_total = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, text: str, intent: str) -> None:
+        if len(self._items) == self.maxsize:
+            self.dropped_total += 1
+        self._items.append((text, intent))
+        self.received_total += 1
+
+    def allow(self) -> bool:
+        """
+        Whether one more correction may be added now.
+        """
+        if not self.rate_per_second:
+            return True
+        now = time.monotonic()
+        elapsed, self._tokens_at = now - self._tokens_at, now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.rate_limited_total += 1
+        return False
+
+    def retry_after(self) -> int:
+        """
+        Seconds until allow() succeeds again (Retry-After header).
+        """
+        return max(1, math.ceil((1 - self._tokens) / self.rate_per_second))
+
+    def drain(self, max_items: Optional[int] = None) -> List[Example]:
+        count = len(self._items) if max_items is None else min(max_items, len(self._items))
+        return [self._items.popleft() for _ in range(count)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "received_total": self.received_total,
+            "dropped_total": self.dropped_total,
+            "rate_limited_total": self.rate_limited_total,
+        }
+
+
+class OnlineLearner:
+    """
+    Background fine-tuning on buffered corrections.
+
+    Each update:
+    1. loads a fresh copy of the active .joblib pipeline (serving keeps
+       using the loaded model; NumPy / mmap artifacts can't be fine-tuned);
+    2. runs `epochs` passes of the classifier's partial_fit over the
+       corrections mixed with up to `replay_ratio` times as many replay
+       examples, so the model doesn't forget everything else;
+    3. compares the copy with the active model on the holdout set and
+       publishes it only if accuracy drops by at most `max_accuracy_drop`.
+
+    Replay and holdout examples come from `data_path` (.csv / .jsonl /
+    .parquet with text and intent columns, default: the built-in training
+    examples), split by a stable hash of the text. Training runs in a
+    thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        buffer: FeedbackBuffer,
+        model_manager: ModelManager,
+        output_dir: str,
+        min_batch: int = 20,
+        max_batch: int = 1000,
+        epochs: int = 5,
+        replay_ratio: float = 4.0,
+        max_accuracy_drop: float = 0.01,
+        holdout_percent: int = 20,
+        data_path: Optional[str] = None,
+        keep_artifacts: int = 5,
+    ):
+        self.buffer = buffer
+        self.model_manager = model_manager
+        self.output_dir = output_dir
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.epochs = epochs
+        self.replay_ratio = replay_ratio
+        self.max_accuracy_drop = max_accuracy_drop
+        self.holdout_percent = holdout_percent
+        self.data_path = data_path
+        self.keep_artifacts = keep_artifacts
+
+        self._lock = asyncio.Lock()
+        self._replay: Optional[List[Example]] = None
+        self._holdout: Optional[List[Example]] = None
+
+        self.updates_total = 0
+        self.published_total = 0
+        self.rejected_total = 0
+        self.last_update: Optional[Dict[str, Any]] = None
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if len(self.buffer) >= self.min_batch:
+                try:
+                    await self.update()
+                except Exception:
+                    logger.exception("Online model update failed")
+
+    async def update(self) -> Dict[str, Any]:
+        """
+        One fine-tune / validate / publish cycle on the buffered corrections.
+        Returns a report of what happened (also kept as `last_update`).
+        """
+        async with self._lock:
+            base_path = self.model_manager.active.path
+            if not base_path.endswith(".joblib"):
+                report = {"outcome": "unsupported", "reason": f"{base_path} is not a .joblib pipeline"}
+            elif not self.buffer:
+                report = {"outcome": "empty"}
+            else:
+                examples = self.buffer.drain(self.max_batch)
+                report = await asyncio.to_thread(self._fine_tune, base_path, examples)
+                self.updates_total += 1
+                if report["outcome"] == "accepted":
+                    try:
+                        info = await self.model_manager.reload(report.pop("artifact"))
+                        report["outcome"] = "published"
+                        report["model_version"] = info.version
+                        self.published_total += 1
+                    except ModelReloadError as exc:
+                        report["outcome"] = "publish_failed"
+                        report["reason"] = str(exc)
+                else:
+                    self.rejected_total += 1
+            report["finished_at"] = time.time()
+            self.last_update = report
+            logger.info("Online model update: %s", report)
+            return report
+
+    def _load_examples(self) -> None:
+        from train_intent_model import build_training_data, is_validation, load_training_data
+
+        df = load_training_data(self.data_path) if self.data_path else build_training_data()
+        texts = df["text"].tolist()
+        labels = df["intent"].tolist()
+        holdout = is_validation(texts, self.holdout_percent)
+        self._replay = [(t, y) for t, y, h in zip(texts, labels, holdout) if not h]
+        self._holdout = [(t, y) for t, y, h in zip(texts, labels, holdout) if h]
+
+    def _fine_tune(self, base_path: str, examples: List[Example]) -> Dict[str, Any]:
+        import joblib
+        import numpy as np
+
+        if self._replay is None:
+            self._load_examples()
+
+        started = time.perf_counter()
+        pipeline = joblib.load(base_path)
+        classifier = pipeline.steps[-1][1]
+        features = pipeline[:-1]
+        known = set(classifier.classes_)
+
+        corrections = [(t, y) for t, y in examples if y in known]
+        report: Dict[str, Any] = {
+            "base_model": base_path,
+            "corrections": len(corrections),
+            "unknown_intents": len(examples) - len(corrections),
+        }
+        if not corrections:
+            report["outcome"] = "rejected"
+            report["reason"] = "no corrections with a known intent"
+            return report
+
+        def accuracy(model: Any, data: List[Example]) -> float:
+            if not data:
+                return 1.0
+            predicted = model.predict([t for t, _ in data])
+            return float(np.mean([p == y for p, (_, y) in zip(predicted, data)]))
+
+        holdout_before = accuracy(pipeline, self._holdout)
+        corrections_before = accuracy(pipeline, corrections)
+
+        rng = np.random.default_rng(len(examples))
+        n_replay = min(len(self._replay), int(len(corrections) * self.replay_ratio))
+        for _ in range(self.epochs):
+            replay_idx = rng.choice(len(self._replay), size=n_replay, replace=False)
+            batch = corrections + [self._replay[i] for i in replay_idx]
+            order = rng.permutation(len(batch))
+            classifier.partial_fit(
+                features.transform([batch[i][0] for i in order]),
+                [batch[i][1] for i in order],
+            )
+
+        holdout_after = accuracy(pipeline, self._holdout)
+        corrections_after = accuracy(pipeline, corrections)
+        report.update(
+            {
+                "holdout_size": len(self._holdout),
+                "holdout_accuracy_before": holdout_before,
+                "holdout_accuracy_after": holdout_after,
+                "corrections_accuracy_before": corrections_before,
+                "corrections_accuracy_after": corrections_after,
+                "train_seconds": time.perf_counter() - started,
+            }
+        )
+
+        if holdout_after < holdout_before - self.max_accuracy_drop:
+            report["outcome"] = "rejected"
+            report["reason"] = "holdout accuracy dropped"
+            return report
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"intent_model-{time.time_ns()}.joblib")
+        tmp_path = f"{path}.tmp"
+        joblib.dump(pipeline, tmp_path)
+        os.replace(tmp_path, path)
+        self._prune_artifacts()
+        report["outcome"] = "accepted"
+        report["artifact"] = path
+        return report
+
+    def _prune_artifacts(self) -> None:
+        """
+        Keep the newest `keep_artifacts` published models (and whatever the
+        ModelManager may still roll back to).
+        """
+        in_use = {
+            os.path.realpath(info.path)
+            for info in (self.model_manager.active, self.model_manager.previous)
+            if info is not None
+        }
+        artifacts = sorted(
+            entry.path
+            for entry in os.scandir(self.output_dir)
+            if entry.name.startswith("intent_model-") and entry.name.endswith(".joblib")
+        )
+        for path in artifacts[: -self.keep_artifacts]:
+            if os.path.realpath(path) not in in_use:
+                os.remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffer": self.buffer.stats(),
+            "updates_total": self.updates_total,
+            "published_total": self.published_total,
+            "rejected_total": self.rejected_total,
+            "last_update": self.last_update,
+        }
@@ -0,0 +1,199 @@
+import bisect
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Histogram bucket upper bounds in seconds, from 10 µs (keyword scan, regex
+# extractors) up to several seconds (cold dateparser calls).
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_LE_INF = 'le="+Inf"'
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram per label set (Prometheus semantics:
+    `le` buckets are cumulative in the output, plus _sum and _count).
+
+    observe() is a bisect and two additions, cheap enough to leave on for
+    every request.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket]
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = defaultdict(float)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def totals(self) -> Dict[Labels, Tuple[int, float]]:
+        """
+        (count, sum) of the observations per label set.
+        """
+        return {labels: (sum(counts), self._sums[labels]) for labels, counts in self._counts.items()}
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._counts[labels]):
+                cumulative += count
+                le = _format_labels(labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            cumulative += self._counts[labels][-1]
+            yield f"{self.name}_bucket{_format_labels(labels, _LE_INF)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(self._sums[labels])}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Counter:
+    """
+    Monotonic counter per label set.
+    """
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._values[labels] += amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for labels in sorted(self._values):
+            yield f"{self.name}{_format_labels(labels)} {_format_value(self._values[labels])}"
+
+
+class NLUMetrics:
+    """
+    Request and per-stage metrics for the NLU server, rendered in the
+    Prometheus text exposition format by /metrics.
+
+    Stage timings are measured where the pipeline runs (possibly in a worker
+    process, see nlu_pipeline) and come back with each result as a
+    {stage: seconds} dict; the server records them here. Only meant to be
+    used from the event loop thread (no locking).
+    """
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "nlu_request_duration_seconds",
+            "End-to-end handler latency per endpoint, including cache hits.",
+        )
+        self.stage_duration = Histogram(
+            "nlu_stage_duration_seconds",
+            "Time spent in each pipeline stage (queue, utterance, classifier, keywords, "
+            "heuristics, extract_<name>, followup) for requests that ran the pipeline; "
+            "queue is the wait for a worker. With a "
+            "classifier cascade, classifier_<exact|linear|full> records which stage "
+            "answered.",
+        )
+        self.requests = Counter(
+            "nlu_requests_total",
+            "Handled messages per endpoint and resulting intent.",
+        )
+        self.shed = Counter(
+            "nlu_requests_shed_total",
+            "Requests answered 503 per endpoint and reason: overload (rejected at "
+            "admission), deadline (queued past NLU_SHED_AFTER_MS) or queue_full.",
+        )
+        self.degraded = Counter(
+            "nlu_requests_degraded_total",
+            "Messages run through the degraded pipeline per endpoint (queued past "
+            "NLU_DEGRADE_AFTER_MS).",
+        )
+        self._model_labels: Labels = ()
+
+    def set_model(self, version: str, path: str) -> None:
+        """
+        Active model, exported as nlu_model_info{version, path} 1.
+        """
+        self._model_labels = (("path", path), ("version", version))
+
+    def observe_request(self, endpoint: str, seconds: float, intents: Iterable[str]) -> None:
+        """
+        One handled request and the intents of its results (several for
+        /nlu/batch).
+        """
+        self.request_duration.observe(seconds, (("endpoint", endpoint),))
+        for intent in intents:
+            self.requests.inc((("endpoint", endpoint), ("intent", intent)))
+
+    def observe_stages(self, endpoint: str, timings: Dict[str, float]) -> None:
+        for stage, seconds in timings.items():
+            self.stage_duration.observe(seconds, (("endpoint", endpoint), ("stage", stage)))
+
+    def observe_shed(self, endpoint: str, reason: str) -> None:
+        self.shed.inc((("endpoint", endpoint), ("reason", reason)))
+
+    def observe_degraded(self, endpoint: str) -> None:
+        self.degraded.inc((("endpoint", endpoint),))
+
+    def cascade_stats(self) -> Dict[str, Any]:
+        """
+        Messages answered per classifier cascade stage since startup, and
+        their mean classifier latency.
+        """
+        stages: Dict[str, Dict[str, float]] = {}
+        for labels, (count, total) in self.stage_duration.totals().items():
+            stage = dict(labels)["stage"]
+            if stage.startswith("classifier_"):
+                entry = stages.setdefault(stage[len("classifier_"):], {"count": 0, "seconds": 0.0})
+                entry["count"] += count
+                entry["seconds"] += total
+        answered = sum(entry["count"] for entry in stages.values())
+        return {
+            name: {
+                "count": entry["count"],
+                "share": entry["count"] / answered,
+                "mean_latency_us": entry["seconds"] / entry["count"] * 1e6,
+            }
+            for name, entry in sorted(stages.items())
+        }
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (
+            self.request_duration,
+            self.stage_duration,
+            self.requests,
+            self.shed,
+            self.degraded,
+        ):
+            lines.extend(metric.render())
+        if self._model_labels:
+            lines.append("# HELP nlu_model_info Active intent model.")
+            lines.append("# TYPE nlu_model_info gauge")
+            lines.append(f"nlu_model_info{_format_labels(self._model_labels)} 1")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,210 @@
+"""
+Hot reload of the intent model.
+
+The ModelManager owns the active model artifact and swaps in new ones
+without a restart: the new model is loaded and warmed off the event loop
+and only then made active, so requests never wait for a load and never see
+a half-initialized model. The previously active model is kept for rollback.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import nlu_pipeline
+from intent_model import AnyIntentModel, artifact_version, load_intent_model
+from nlu_executor import NLUExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ModelReloadError(Exception):
+    """Loading, warming or swapping in a model failed; the active model is unchanged."""
+
+
+class ModelInfo(NamedTuple):
+    path: str
+    version: str
+    loaded_at: float
+
+
+def _stat(path: str) -> Optional[Tuple[Any, ...]]:
+    """
+    Cheap change detection for the watcher: (name, mtime, size) of the
+    artifact file, or of every file in an mmap model directory.
+    """
+    try:
+        if os.path.isdir(path):
+            return tuple(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in sorted(os.scandir(path), key=lambda e: e.name)
+                if entry.is_file()
+            )
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+class ModelManager:
+    """
+    Loads, swaps and rolls back the intent model used by the NLU pipeline.
+
+    - thread / inline executors: the new model is loaded and warmed in a
+      thread, then installed with nlu_pipeline.set_model() (one reference
+      assignment). Requests already running finish on the model they
+      started with.
+    - process executor: the executor starts a new pool whose workers load
+      and warm the new artifact, then replaces the old pool.
+
+    Versions are content fingerprints (intent_model.artifact_version), so
+    reloading an unchanged artifact is a no-op. `on_swap(info)` runs after
+    every swap (the server clears its response cache there).
+    """
+
+    def __init__(
+        self,
+        executor: NLUExecutor,
+        model_path: str,
+        on_swap: Optional[Callable[[ModelInfo], None]] = None,
+    ):
+        self.executor = executor
+        self.model_path = model_path
+        self.on_swap = on_swap
+        self.active: Optional[ModelInfo] = None
+        self.previous: Optional[ModelInfo] = None
+        # Loaded models by version (active and previous), in this process.
+        self._models: Dict[str, AnyIntentModel] = {}
+        self._lock = asyncio.Lock()
+        self._watched_stat: Optional[Tuple[Any, ...]] = None
+        self._changed_stat: Optional[Tuple[Any, ...]] = None
+
+        self.reloads_total = 0
+        self.reload_failures_total = 0
+        self.rollbacks_total = 0
+
+    def load_initial(self) -> ModelInfo:
+        """
+        Startup load, before executor.start(): process workers load the
+        model themselves, otherwise it is loaded into this process.
+        """
+        path = self.model_path
+        self._watched_stat = _stat(path)
+        version = artifact_version(path)
+        if self.executor.mode == "process":
+            self.executor.model_path, self.executor.model_version = path, version
+        else:
+            model = load_intent_model(path)
+            self._models = {version: model}
+            nlu_pipeline.set_model(model, version)
+        self.active = ModelInfo(path, version, time.time())
+        return self.active
+
+    async def reload(self, path: Optional[str] = None) -> ModelInfo:
+        """
+        Load the artifact at `path` (default: the active model's path, e.g.
+        after retraining in place), warm it and make it active.
+        """
+        async with self._lock:
+            path = path or self.active.path
+            try:
+                return await self._swap_in(path)
+            except Exception as exc:
+                self.reload_failures_total += 1
+                logger.exception("Model reload from %s failed", path)
+                raise ModelReloadError(f"Could not load model from {path}: {exc}") from exc
+
+    async def rollback(self) -> ModelInfo:
+        """
+        Make the previously active model active again (rolling back twice
+        returns to the newer one).
+        """
+        async with self._lock:
+            target = self.previous
+            if target is None:
+                raise ModelReloadError("No previous model to roll back to")
+            model = self._models.get(target.version)
+            if model is None:
+                # Process workers load from disk: the artifact must not have
+                # been overwritten since (use versioned file names).
+                version = await asyncio.to_thread(artifact_version, target.path)
+                if version != target.version:
+                    raise ModelReloadError(
+                        f"{target.path} changed on disk since version {target.version} "
+                        f"(now {version}); cannot roll back"
+                    )
+                await self.executor.restart(target.path, target.version)
+            info = self._activate(target.path, target.version, model, _stat(target.path))
+            self.rollbacks_total += 1
+            return info
+
+    async def _swap_in(self, path: str) -> ModelInfo:
+        stat = _stat(path)
+        version = await asyncio.to_thread(artifact_version, path)
+        if version == self.active.version and path == self.active.path:
+            self._watched_stat = stat
+            return self.active
+
+        model = None
+        if self.executor.mode == "process":
+            await self.executor.restart(path, version)
+        else:
+            model = await asyncio.to_thread(load_intent_model, path)
+            await asyncio.to_thread(nlu_pipeline.warm_model, model)
+        info = self._activate(path, version, model, stat)
+        self.reloads_total += 1
+        return info
+
+    def _activate(
+        self,
+        path: str,
+        version: str,
+        model: Optional[AnyIntentModel],
+        stat: Optional[Tuple[Any, ...]],
+    ) -> ModelInfo:
+        # Only process workers load the model themselves.
+        assert model is not None or self.executor.mode == "process"
+        if model is not None:
+            nlu_pipeline.set_model(model, version)
+            self._models[version] = model
+        self.previous, self.active = self.active, ModelInfo(path, version, time.time())
+        keep = {self.active.version, self.previous.version}
+        self._models = {v: m for v, m in self._models.items() if v in keep}
+        self._watched_stat = stat
+        self._changed_stat = None
+
+        logger.info("Intent model %s (%s) is active", version, path)
+        if self.on_swap is not None:
+            self.on_swap(self.active)
+        return self.active
+
+    async def watch(self, interval: float) -> None:
+        """
+        Poll the active artifact every `interval` seconds and reload it once
+        it has changed and then stayed unchanged for one more interval (so a
+        file still being written isn't loaded). A broken artifact is not
+        retried until it changes again.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            stat = _stat(self.active.path)
+            if stat is None or stat == self._watched_stat:
+                self._changed_stat = None
+                continue
+            if stat != self._changed_stat:
+                self._changed_stat = stat
+                continue
+            try:
+                await self.reload()
+            except ModelReloadError:
+                self._watched_stat = stat
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active._asdict() if self.active else None,
+            "previous": self.previous._asdict() if self.previous else None,
+            "reloads_total": self.reloads_total,
+            "reload_failures_total": self.reload_failures_total,
+            "rollbacks_total": self.rollbacks_total,
+        }
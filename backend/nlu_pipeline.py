@@ -0,0 +1,364 @@
+"""
+CPU-bound part of the NLU API: classification, domain heuristics, slot
+extraction and follow-up decisions.
+
+Everything here is plain synchronous code operating on picklable inputs and
+outputs, so it can run inline, in a thread pool or in a process pool (see
+nlu_executor.py). Each process holds its own intent model, set either by the
+server at startup or by `init_worker` in pool workers.
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from intent_model import AnyIntentModel, load_intent_model
+from nlu_admission import Deadline, DeadlineExceededError, check_deadline, is_degraded
+from nlu_utils import SLOT_NAMES, decide_followup, extract_slots, keyword_hits, slot_spans
+from utterance import Utterance, as_utterance
+
+# (model, version), replaced as a whole so a request always sees a matching
+# pair even while the server swaps in a new model.
+_active: Optional[Tuple[AnyIntentModel, Optional[str]]] = None
+
+# Ranked classifier alternatives kept with every result; requests can ask
+# for up to this many (see the `top_k` request field).
+MAX_TOP_K = 5
+
+
+def set_model(model: AnyIntentModel, version: Optional[str] = None) -> None:
+    global _active
+    _active = (model, version)
+
+
+def get_active() -> Tuple[AnyIntentModel, Optional[str]]:
+    if _active is None:
+        raise RuntimeError("Intent model has not been loaded in this process")
+    return _active
+
+
+def get_model() -> AnyIntentModel:
+    return get_active()[0]
+
+
+def model_classes() -> List[str]:
+    """
+    The intents the active model can predict.
+    """
+    return [str(c) for c in get_model().classes]
+
+
+def init_worker(model_path: str, version: Optional[str] = None, warm: bool = False) -> None:
+    """
+    Process pool initializer: load the model once per worker process and,
+    with `warm`, run warm_up() before the worker takes its first job.
+    """
+    set_model(load_intent_model(model_path), version)
+    if warm:
+        warm_up()
+
+
+# Representative traffic used to prime a fresh process: every intent, every
+# extractor, the datetime fast path and the dateparser fallback.
+WARMUP_MESSAGES = [
+    "hi",
+    "order me 2 packets of oreo biscuit",
+    "order fanta for me",
+    "book me a cab from btm to indiranagar tomorrow 5 pm",
+    "my tap is leaking",
+    "fan not working, send someone today evening",
+    "find me a room in sehore for 2 days",
+    "book that sehore house for a month from 25/12",
+    "i have high fever since yesterday",
+    "book a doctor for next week",
+]
+
+
+def warm_up() -> float:
+    """
+    Run WARMUP_MESSAGES through the whole pipeline so that lazy
+    initialization (dateparser language data, regex compilation, first model
+    call) happens before real traffic. Returns the elapsed seconds.
+    """
+    started = time.perf_counter()
+    run_nlu_batch(WARMUP_MESSAGES)
+    for text in WARMUP_MESSAGES:
+        run_nlu(text)
+        # Unknown intent: every extractor runs.
+        extract_slots(text, "", include_slots=SLOT_NAMES)
+    return time.perf_counter() - started
+
+
+def warm_model(model: AnyIntentModel) -> None:
+    """
+    First calls on a freshly loaded model (before it replaces the active one).
+    """
+    model.predict_top_ks(WARMUP_MESSAGES, MAX_TOP_K)
+    for text in WARMUP_MESSAGES:
+        model.predict_top_k(text, MAX_TOP_K)
+
+
+def apply_domain_heuristics(message: Union[str, Utterance], intent: str) -> str:
+    """
+    Apply lightweight domain rules on top of the ML model to fix obvious cases.
+    For example, 'tap is leaking' and 'fan not working' => home_service.
+    Keyword lists live in nlu_utils (HOME_SERVICE_KEYWORDS, GROCERY_KEYWORDS).
+    """
+    hits = keyword_hits(as_utterance(message))
+
+    looks_like_home = ("heuristic", "home_service") in hits
+    mentions_grocery = ("heuristic", "grocery") in hits
+
+    if looks_like_home and not mentions_grocery:
+        if intent in ("health_symptom", "order_grocery", "smalltalk_or_other"):
+            return "home_service"
+
+    return intent
+
+
+def analyze(
+    message: Union[str, Utterance],
+    intent_raw: str,
+    include_slots: Sequence[str] = (),
+    timings: Optional[Dict[str, float]] = None,
+    top_intents: Optional[List[Tuple[str, float]]] = None,
+    model_version: Optional[str] = None,
+    degraded: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run heuristics, slot extraction and follow-up logic for an already
+    classified message. Returns the fields of an NLUResponse, plus
+    `valid_until` for response caching (see slots_valid_until) and `timings`,
+    the seconds spent per stage (added to the given `timings` dict, if any).
+
+    `top_intents` are the classifier's ranked (intent, probability) pairs;
+    `confidence` is the probability of its best guess. The returned intent
+    can differ from that guess when a domain heuristic overrides it.
+    `model_version` identifies the model that classified the message.
+    `slot_spans` locates the extracted values in the message. `degraded`
+    results were produced without the expensive stages (see _admitted).
+
+    Pass the Utterance the classifier already saw to reuse its analysis.
+    """
+    if timings is None:
+        timings = {}
+    perf = time.perf_counter
+    utterance = as_utterance(message)
+
+    started = perf()
+    keyword_hits(utterance)
+    timings["keywords"] = perf() - started
+
+    started = perf()
+    intent = apply_domain_heuristics(utterance, intent_raw)
+    timings["heuristics"] = perf() - started
+
+    slots = extract_slots(utterance, intent, include_slots, timings, degraded)
+
+    started = perf()
+    missing_slots, followup_question = decide_followup(intent, slots)
+    timings["followup"] = perf() - started
+
+    return {
+        "intent": intent,
+        "slots": slots,
+        "slot_spans": slot_spans(utterance, slots),
+        "missing_slots": missing_slots,
+        "followup_question": followup_question,
+        "confidence": top_intents[0][1] if top_intents else None,
+        "top_intents": (
+            [{"intent": name, "confidence": p} for name, p in top_intents]
+            if top_intents
+            else None
+        ),
+        "model_version": model_version,
+        "degraded": degraded,
+        "valid_until": slots_valid_until(utterance, slots),
+        "timings": timings,
+    }
+
+
+def slots_valid_until(utterance: Utterance, slots: Dict[str, Any]) -> Optional[float]:
+    """
+    Epoch time until which these slots stay correct for the same message, or
+    None if they don't depend on the current time. Only a relative datetime
+    ("tomorrow 5 pm", "in 2 hours") can go stale; the datetime extractor
+    recorded when on the utterance.
+    """
+    if slots.get("datetime_iso") is None:
+        return None
+    return utterance.cache.get("datetime_valid_until")
+
+
+def classify(
+    model: AnyIntentModel, texts: Sequence[Union[str, Utterance]], escalate: bool = True
+) -> Tuple[List[List[Tuple[str, float]]], List[Optional[str]]]:
+    """
+    Ranked intents per text, plus the cascade stage that decided each one
+    ("exact", "linear" or "full"; None when the model is not a cascade).
+    `escalate=False` keeps a cascade on its fast path.
+    """
+    staged = getattr(model, "predict_top_ks_staged", None)
+    if staged is None:
+        return model.predict_top_ks(texts, MAX_TOP_K), [None] * len(texts)
+    return staged(texts, MAX_TOP_K, escalate)
+
+
+def _classifier_timings(seconds: float, stage: Optional[str]) -> Dict[str, float]:
+    # The cascade stage is recorded as its own timing ("classifier_linear"),
+    # which gives per-stage counts and latencies in the stage metrics.
+    timings = {"classifier": seconds}
+    if stage is not None:
+        timings[f"classifier_{stage}"] = seconds
+    return timings
+
+
+def _admitted(deadline: Optional[Deadline]) -> Tuple[Dict[str, float], bool]:
+    """
+    Check a request's deadline as the pipeline starts on it: returns the
+    initial timings (its queueing delay as "queue") and whether to run
+    degraded, i.e. without escalating past a classifier cascade's fast path
+    and without the dateparser fallback. Raises DeadlineExceededError if it
+    waited past its shed deadline (see nlu_admission).
+    """
+    waited = check_deadline(deadline)
+    timings = {} if waited is None else {"queue": waited}
+    return timings, is_degraded(deadline, waited)
+
+
+def run_nlu(
+    text: str, include_slots: Sequence[str] = (), deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    timings, degraded = _admitted(deadline)
+    model, version = get_active()
+    started = time.perf_counter()
+    utterance = Utterance(text)
+    analyzed = time.perf_counter()
+    ranked, stages = classify(model, [utterance], escalate=not degraded)
+    timings.update(_classifier_timings(time.perf_counter() - analyzed, stages[0]))
+    timings["utterance"] = analyzed - started
+    return analyze(
+        utterance, ranked[0][0][0], include_slots, timings, ranked[0], version, degraded
+    )
+
+
+def run_nlu_batch(
+    texts: List[str],
+    include_slots: Optional[List[Sequence[str]]] = None,
+    deadlines: Optional[List[Optional[Deadline]]] = None,
+) -> List[Union[Dict[str, Any], DeadlineExceededError]]:
+    """
+    Classify all texts with vectorized model calls, then analyze each.
+    `include_slots`, if given, holds the extra slots requested for each text.
+    Each result's "classifier" timing is its share of the batched call.
+
+    `deadlines`, if given, holds each text's Deadline: texts are degraded
+    or shed individually (a shed text gets its DeadlineExceededError in
+    place of a result), and the degraded ones are classified in a separate
+    call that stays on a cascade's fast path.
+    """
+    model, version = get_active()
+    perf = time.perf_counter
+    if include_slots is None:
+        include_slots = [()] * len(texts)
+    if deadlines is None:
+        deadlines = [None] * len(texts)
+    results: List[Any] = [None] * len(texts)
+    # degraded -> [(index, timings)]
+    groups: Dict[bool, List[Tuple[int, Dict[str, float]]]] = {False: [], True: []}
+    for i, deadline in enumerate(deadlines):
+        try:
+            timings, degraded = _admitted(deadline)
+        except DeadlineExceededError as exc:
+            results[i] = exc
+            continue
+        groups[degraded].append((i, timings))
+
+    for degraded, items in groups.items():
+        if not items:
+            continue
+        utterances = []
+        for i, timings in items:
+            started = perf()
+            utterances.append(Utterance(texts[i]))
+            timings["utterance"] = perf() - started
+        started = perf()
+        ranked, stages = classify(model, utterances, escalate=not degraded)
+        classifier_share = (perf() - started) / len(items)
+        for (i, timings), utterance, top, stage in zip(items, utterances, ranked, stages):
+            timings.update(_classifier_timings(classifier_share, stage))
+            results[i] = analyze(
+                utterance, top[0][0], include_slots[i], timings, top, version, degraded
+            )
+    return results
+
+
+def run_timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """
+    Call one of the run_* functions and also return how long it took,
+    measured where it ran: the job time admission control plans with,
+    excluding any wait for a worker or in the micro-batcher.
+    """
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def merge_slots(prev_slots: Dict[str, Any], new_slots: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge slots extracted from a follow-up message into the previous ones.
+
+    IMPORTANT:
+    - We do NOT overwrite symptom_text.
+    - We do NOT overwrite service_category.
+    This keeps the original symptom ("my head is paining") and original
+    service category (e.g. Electrician for "fan not working").
+    """
+    combined_slots = {**prev_slots}
+    for k, v in new_slots.items():
+        if v is None:
+            continue
+
+        # Don't overwrite previously captured symptom_text
+        if k == "symptom_text" and "symptom_text" in prev_slots:
+            continue
+
+        # Don't overwrite previously captured service_category
+        if k == "service_category" and "service_category" in prev_slots:
+            continue
+
+        combined_slots[k] = v
+    return combined_slots
+
+
+def run_continue(
+    text: str,
+    intent: str,
+    prev_slots: Dict[str, Any],
+    include_slots: Sequence[str] = (),
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """
+    Follow-up turn for a known intent: extract new slots, merge them with the
+    previous ones and recompute missing slots. Stage timings are returned
+    under `timings`, and the `degraded` flag, as in analyze().
+    """
+    timings, degraded = _admitted(deadline)
+    started = time.perf_counter()
+    utterance = Utterance(text)
+    timings["utterance"] = time.perf_counter() - started
+    new_slots = extract_slots(utterance, intent, include_slots, timings, degraded)
+    combined_slots = merge_slots(prev_slots, new_slots)
+
+    started = time.perf_counter()
+    missing_slots, followup_question = decide_followup(intent, combined_slots)
+    timings["followup"] = time.perf_counter() - started
+
+    return {
+        "intent": intent,
+        "slots": combined_slots,
+        # Spans of the slots read from this message.
+        "slot_spans": slot_spans(utterance, new_slots),
+        "missing_slots": missing_slots,
+        "followup_question": followup_question,
+        "degraded": degraded,
+        "timings": timings,
+    }
@@ -0,0 +1,264 @@
+"""
+Server-side dialogue sessions for /nlu/continue.
+
+A session holds the conversation state a client would otherwise send back on
+every turn: {"intent": ..., "slots": {...}}. Stores are looked up by an
+opaque id handed out by /nlu (see new_session_id).
+
+Backends implement SessionStore:
+- MemorySessionStore: per-process, LRU + TTL with an entry and memory cap.
+- SqliteSessionStore: a local SQLite file, so several server processes on
+  the same host (e.g. `uvicorn --workers 4`) see the same sessions. Its
+  calls block on file I/O (`blocking`), so the server runs them in a thread.
+
+create_session_store() picks one from a URL ("memory", "sqlite:///path").
+"""
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SessionState = Dict[str, Any]
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class SessionTooLargeError(ValueError):
+    """Raised by put() for a state larger than the store's whole size cap."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Session state too large ({size} bytes)")
+        self.size = size
+
+
+class SessionStore:
+    """
+    Backend interface. Sessions expire `ttl_seconds` after their last write;
+    get() of an unknown or expired id returns None.
+    """
+
+    ttl_seconds: float
+    # Calls do blocking I/O and should be kept off the event loop.
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        raise NotImplementedError
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store: LRU + TTL, bounded both by number of sessions and by
+    their approximate size (JSON-encoded length). States are stored encoded,
+    so callers can't mutate a stored session by accident.
+
+    Only meant to be used from the event loop thread (no locking).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl_seconds: float = 1800.0,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        entry = self._data.get(session_id)
+        if entry is None:
+            return None
+        expires_at, encoded = entry
+        if time.time() >= expires_at:
+            self._remove(session_id)
+            self.expirations += 1
+            return None
+        self._data.move_to_end(session_id)
+        return json.loads(encoded)
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        encoded = json.dumps(state, separators=(",", ":"))
+        if len(encoded) > self.max_bytes:
+            raise SessionTooLargeError(len(encoded))
+        self._remove(session_id)
+        self._data[session_id] = (time.time() + self.ttl_seconds, encoded)
+        self._bytes += len(encoded)
+        while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def delete(self, session_id: str) -> None:
+        self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._data.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in a local SQLite database (WAL mode), shared by every process
+    that opens the same file. Expired sessions, and least recently used ones
+    beyond `maxsize` sessions or `max_bytes` of encoded state, are purged
+    every `purge_every` writes, so the database may briefly exceed them.
+
+    Calls block on the database file; they are thread-safe, so async callers
+    run them with asyncio.to_thread.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int = 100000,
+        ttl_seconds: float = 1800.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        purge_every: int = 1000,
+    ):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " touched_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched_at)"
+        )
+        self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE id = ? AND expires_at > ?",
+                (session_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET touched_at = ? WHERE id = ?", (now, session_id)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, session_id: str, state: SessionState) -> None:
+        now = time.time()
+        encoded = json.dumps(state, separators=(",", ":"))
+        if len(encoded) > self.max_bytes:
+            raise SessionTooLargeError(len(encoded))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, expires_at, touched_at)"
+                " VALUES (?, ?, ?, ?)",
+                (session_id, encoded, now + self.ttl_seconds, now),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._purge(now)
+            self._conn.commit()
+
+    def _purge(self, now: float) -> None:
+        self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            " SELECT id FROM sessions ORDER BY touched_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+        self._conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            " SELECT id FROM ("
+            "  SELECT id, SUM(LENGTH(state)) OVER (ORDER BY touched_at DESC, id) AS total"
+            "  FROM sessions)"
+            " WHERE total > ?)",
+            (self.max_bytes,),
+        )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": size,
+            "maxsize": self.maxsize,
+            "bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(
+    url: str, maxsize: int, ttl_seconds: float, max_bytes: int
+) -> SessionStore:
+    """
+    Build a store from a URL: "memory" or "sqlite:///path/to/sessions.db".
+    """
+    if url == "memory":
+        return MemorySessionStore(maxsize=maxsize, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+    if url.startswith("sqlite:///"):
+        return SqliteSessionStore(
+            url[len("sqlite:///"):], maxsize=maxsize, ttl_seconds=ttl_seconds, max_bytes=max_bytes
+        )
+    raise ValueError(f"Unknown session store {url!r}, expected 'memory' or 'sqlite:///<path>'")
@@ -1,55 +1,270 @@
+import os
 import re
-from typing import Dict, Tuple, List, Optional
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Tuple, List, Optional, Sequence, Union
 
-import dateparser
+from gazetteer import Gazetteer, GazetteerMatch
+from keyword_matcher import KeywordMatcher
+from product_catalog import ProductIndex
+from nlu_datetime import parse_datetime
+from utterance import Utterance, as_utterance
 
+# Keyword tables. All of them are compiled into one KeywordMatcher at import,
+# so a message is scanned once no matter how many keywords there are.
+# Order matters: the first matching entry wins.
 
-def _extract_quantity(text: str) -> Tuple[Optional[float], Optional[str]]:
+# apply_domain_heuristics: messages that look like home repairs ...
+HOME_SERVICE_KEYWORDS = [
+    "tap",
+    "pipe",
+    "leak",
+    "fan",
+    "light",
+    "lights",
+    "bulb",
+    "switch",
+    "socket",
+    "electrician",
+    "water is leaking",
+]
+# ... unless they mention groceries.
+GROCERY_KEYWORDS = [
+    "biscuit",
+    "biscuits",
+    "milk",
+    "bread",
+    "egg",
+    "eggs",
+    "rice",
+    "atta",
+    "oil",
+    "chocolate",
+    "fanta",
+    "cold drink",
+    "juice",
+]
+
+PRODUCT_CATEGORIES = [
+    "biscuit",
+    "biscuits",
+    "milk",
+    "bread",
+    "egg",
+    "eggs",
+    "rice",
+    "atta",
+    "oil",
+    "chocolate",
+    "drink",
+    "cold drink",
+    "juice",
+]
+
+BOOKING_MODE_PHRASES = {
+    "DAILY": [
+        "per day",
+        "per night",
+        "daily",
+        "for 2 days",
+        "for two days",
+        "for 3 days",
+        "for three days",
+    ],
+    "MONTHLY": [
+        "per month",
+        "monthly",
+        "for a month",
+        "for one month",
+        "for 1 month",
+    ],
+}
+
+SERVICE_CATEGORY_KEYWORDS = {
+    "Plumber": [
+        "tap",
+        "pipe",
+        "leak",
+        "plumb",
+        "toilet",
+        "sink",
+        "water is leaking",
+    ],
+    "Electrician": [
+        "electric",
+        "light",
+        "lights",
+        "fan",
+        "switch",
+        "socket",
+        "power",
+        "wiring",
+        "short circuit",
+    ],
+    "Carpenter": [
+        "carpenter",
+        "wood",
+        "door",
+        "furniture",
+        "bed frame",
+        "almirah",
+        "table",
+    ],
+    "Cleaner": [
+        "clean",
+        "cleaning",
+        "deep cleaning",
+        "maid",
+        "sweep",
+        "mop",
+        "dusting",
+    ],
+    "AC Repair": [
+        "ac",
+        "air conditioner",
+        "aircon",
+        "cooling",
+        "ac not cooling",
+        "ac repair",
+    ],
+    "Painter": [
+        "paint",
+        "painting",
+        "wall color",
+        "repaint",
+    ],
+    "Gardener": [
+        "garden",
+        "gardener",
+        "lawn",
+        "grass",
+        "plants",
+        "tree",
+    ],
+    "Appliance Repair": [
+        "fridge",
+        "refrigerator",
+        "washing machine",
+        "tv",
+        "microwave",
+        "oven",
+        "geyser",
+        "appliance",
+    ],
+}
+
+
+def _build_keyword_matcher() -> KeywordMatcher:
+    matcher = KeywordMatcher()
+    for kw in HOME_SERVICE_KEYWORDS:
+        matcher.add(kw, ("heuristic", "home_service"))
+    for kw in GROCERY_KEYWORDS:
+        matcher.add(kw, ("heuristic", "grocery"))
+    for cat in PRODUCT_CATEGORIES:
+        matcher.add(cat, ("product", cat))
+    for mode, phrases in BOOKING_MODE_PHRASES.items():
+        for phrase in phrases:
+            matcher.add(phrase, ("booking_mode", mode))
+    for category, keywords in SERVICE_CATEGORY_KEYWORDS.items():
+        for kw in keywords:
+            matcher.add(kw, ("service_category", category))
+    return matcher.build()
+
+
+_KEYWORD_MATCHER = _build_keyword_matcher()
+
+
+def scan_keywords(lower: str) -> FrozenSet[Tuple[str, str]]:
+    """
+    One pass over the lowercased text; returns the (table, label) tags of
+    every keyword table entry found in it.
+    """
+    return _KEYWORD_MATCHER.find(lower)
+
+
+def keyword_hits(utterance: Utterance) -> FrozenSet[Tuple[str, str]]:
+    """
+    scan_keywords() for a message, run at most once per Utterance.
+    """
+    hits = utterance.cache.get("keyword_hits")
+    if hits is None:
+        hits = utterance.cache["keyword_hits"] = scan_keywords(utterance.lower)
+    return hits
+
+
+# Extractors take the message's Utterance and record the character span
+# each slot value was read from in `utterance.spans` (for values that are a
+# piece of the message).
+
+
+def _stripped_span(m: "re.Match[str]", group: Union[int, str]) -> Tuple[int, int]:
+    start, end = m.span(group)
+    value = m.group(group)
+    return start + len(value) - len(value.lstrip()), end - len(value) + len(value.rstrip())
+
+
+_QUANTITY = re.compile(
+    r"(?P<value>\d+(\.\d+)?)\s*(?P<unit>litre|liter|ltr|kg|kilo|kilogram|gm|g|packet|pack|bottle|box|dozen)"
+)
+
+
+def _extract_quantity(utterance: Utterance) -> Tuple[Optional[float], Optional[str]]:
     """
     Very simple quantity + unit extraction, e.g. "1 litre milk", "2 packets", "3 kg rice".
     """
-    pattern = re.compile(
-        r"(?P<value>\d+(\.\d+)?)\s*(?P<unit>litre|liter|ltr|kg|kilo|kilogram|gm|g|packet|pack|bottle|box|dozen)",
-        re.IGNORECASE,
-    )
-    match = pattern.search(text)
+    match = _QUANTITY.search(utterance.lower)
     if not match:
         return None, None
-    value = float(match.group("value"))
-    unit = match.group("unit").lower()
-    return value, unit
+    utterance.spans["quantity_value"] = match.span("value")
+    utterance.spans["quantity_unit"] = match.span("unit")
+    return float(match.group("value")), match.group("unit")
+
+
+# Product index directory built by `product_catalog.py build`. When set,
+# products are matched against the catalog first and the keyword rules
+# below are the fallback; unset keeps the keyword rules only.
+CATALOG_INDEX_PATH = os.getenv("NLU_CATALOG_INDEX")
+
+_catalog: Optional[ProductIndex] = None
+_catalog_lock = threading.Lock()
+
 
+def get_catalog() -> Optional[ProductIndex]:
+    global _catalog
+    if _catalog is None and CATALOG_INDEX_PATH:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ProductIndex(CATALOG_INDEX_PATH)
+    return _catalog
 
-def _extract_product(text: str) -> Tuple[Optional[str], Optional[str]]:
+
+_LETTERS = re.compile(r"[a-zA-Z]+")
+
+
+def _extract_product(utterance: Utterance) -> Tuple[Optional[str], Optional[str]]:
     """
-    Extract a rough product name and category for groceries.
-    Examples:
+    Extract a product name and category for groceries: the best catalog
+    match (its catalog name and category) if a catalog index is configured,
+    otherwise a rough name and category from the keyword rules.
+    Examples without a catalog:
       "order me a biscuit" -> (None, "biscuit")
       "order oreo biscuit" -> ("oreo biscuit", "biscuit")
       "1 litre milk" -> (None, "milk")
       "order me fanta" -> ("fanta", None)
       "order fanta for me" -> ("fanta", None)
     """
-    lower = text.lower()
-    categories = [
-        "biscuit",
-        "biscuits",
-        "milk",
-        "bread",
-        "egg",
-        "eggs",
-        "rice",
-        "atta",
-        "oil",
-        "chocolate",
-        "drink",
-        "cold drink",
-        "juice",
-    ]
+    catalog = get_catalog()
+    if catalog is not None:
+        match = catalog.match(utterance.lower)
+        if match is not None:
+            return match.name, match.category
+
+    lower = utterance.lower
+    hits = keyword_hits(utterance)
 
     found_category = None
-    for cat in categories:
-        if cat in lower:
+    for cat in PRODUCT_CATEGORIES:
+        if ("product", cat) in hits:
             if cat.endswith("s"):
                 found_category = cat[:-1]
             else:
@@ -61,6 +276,7 @@ def _extract_product(text: str) -> Tuple[Optional[str], Optional[str]]:
         pattern = re.compile(r"([\w\s]{0,30})\b" + re.escape(found_category) + r"s?\b")
         m = pattern.search(lower)
         if m:
+            utterance.spans["product_category"] = (m.end(1), m.end())
             phrase = m.group(1).strip()
             phrase = re.sub(
                 r"\b(order|buy|get|me|some|please|reorder|my|usual|a|an|the)\b",
@@ -73,7 +289,12 @@ def _extract_product(text: str) -> Tuple[Optional[str], Optional[str]]:
 
     # Fallback: treat remaining content as product name (fixes "order fanta for me")
     if not found_category and not product_name:
-        words = re.findall(r"[a-zA-Z]+", lower)
+        # Letter runs, also inside mixed tokens ("1bhk" -> "bhk").
+        words = [
+            w
+            for token in utterance.words
+            for w in ((token,) if token.isascii() and token.isalpha() else _LETTERS.findall(token))
+        ]
         stopwords = {
             "order",
             "buy",
@@ -101,195 +322,320 @@ def _extract_product(text: str) -> Tuple[Optional[str], Optional[str]]:
     return product_name, found_category
 
 
-def _extract_from_to(text: str) -> Tuple[Optional[str], Optional[str]]:
+# Locality names for origin / destination / location, one place per line
+# (`Canonical|alias|...`, see gazetteer.py). Loaded on first use.
+GAZETTEER_PATH = os.getenv(
+    "NLU_GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "localities.txt")
+)
+
+# Word right before a place name that gives it a role. Misspelled (fuzzy)
+# matches are only trusted after one of these.
+ORIGIN_CUES = frozenset({"from"})
+DESTINATION_CUES = frozenset({"to", "till", "until"})
+LOCATION_CUES = frozenset({"in", "near", "around", "at"})
+_ROUTE_CUES = ORIGIN_CUES | DESTINATION_CUES
+
+# Shortest message token that may match a place name with a typo (1 edit
+# from this length, 2 from twice it). Shorter ones are too often other
+# words one letter off a place ("to the begum" is not Begur).
+GAZETTEER_MIN_FUZZY_LEN = 6
+
+# Words that narrow a place down to a spot in it ("sehore bus stand"). A
+# known place followed by them is returned as written, not as the place.
+PLACE_SUFFIXES = frozenset(
+    {
+        "bus", "stand", "stop", "depot", "station", "railway", "metro",
+        "airport", "terminal", "road", "main", "cross", "circle", "chowk",
+        "square", "junction", "signal", "gate", "market", "mall", "colony",
+        "hospital",
+    }
+)
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+_CUE_BEFORE = re.compile(r"([a-z]+)\s+(?:the\s+)?$")
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_file(
+                    GAZETTEER_PATH, min_fuzzy_len=GAZETTEER_MIN_FUZZY_LEN
+                )
+    return _gazetteer
+
+
+def _place_cues(utterance: Utterance) -> List[Tuple[Optional[str], GazetteerMatch]]:
     """
-    Extract origin/destination for cab, using patterns like 'from X to Y'.
+    Gazetteer matches in the message with the cue word before each (None if
+    there is none). Fuzzy matches without a cue are dropped. Computed at most
+    once per Utterance (shared by the from_to and location extractors).
     """
-    pattern = re.compile(r"from\s+(?P<origin>.+?)\s+to\s+(?P<dest>.+)", re.IGNORECASE)
-    m = pattern.search(text)
-    if m:
-        origin = m.group("origin").strip()
-        dest = m.group("dest").strip()
+    found = utterance.cache.get("place_cues")
+    if found is not None:
+        return found
+    lower = utterance.lower
+    found = []
+    for match in get_gazetteer().find_tokens(utterance.tokens):
+        m = _CUE_BEFORE.search(lower, 0, match.start)
+        cue = m.group(1) if m else None
+        if match.edits and cue not in _ROUTE_CUES and cue not in LOCATION_CUES:
+            continue
+        found.append((cue, match))
+    utterance.cache["place_cues"] = found
+    return found
+
+
+def _place_value(utterance: Utterance, match: GazetteerMatch) -> Tuple[str, Tuple[int, int]]:
+    """
+    The canonical name of a gazetteer match and its span, or the words as
+    written when the place is followed by PLACE_SUFFIXES.
+    """
+    end = match.end
+    for token, start, token_end in utterance.tokens:
+        if start < match.end:
+            continue
+        if token not in PLACE_SUFFIXES:
+            break
+        end = token_end
+    if end == match.end:
+        return match.name, (match.start, match.end)
+    return utterance.text[match.start : end], (match.start, end)
+
+
+_FROM_TO = re.compile(r"from\s+(?P<origin>.+?)\s+to\s+(?P<dest>.+)", re.IGNORECASE)
+
+
+def _extract_from_to(utterance: Utterance) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract origin/destination for cab: known places after 'from' / 'to'
+    (in either order, canonical names), otherwise patterns like 'from X to Y'.
+    """
+    origin = dest = None
+    for cue, match in _place_cues(utterance):
+        if cue in ORIGIN_CUES and origin is None:
+            origin, utterance.spans["origin"] = _place_value(utterance, match)
+        elif cue in DESTINATION_CUES and dest is None:
+            dest, utterance.spans["destination"] = _place_value(utterance, match)
+    if origin is not None and dest is not None:
         return origin, dest
-    return None, None
 
+    m = _FROM_TO.search(utterance.text)
+    if m:
+        if origin is None:
+            origin = m.group("origin").strip()
+            utterance.spans["origin"] = _stripped_span(m, "origin")
+        if dest is None:
+            dest = m.group("dest").strip()
+            utterance.spans["destination"] = _stripped_span(m, "dest")
+    return origin, dest
+
+
+_TRAILING_LOCATION = re.compile(r"(in|near|around|at)\s+([a-zA-Z\s]+)$")
 
-def _extract_location(text: str) -> Optional[str]:
+
+def _extract_location(utterance: Utterance) -> Optional[str]:
     """
-    Extract a rough location for housing / general.
+    Extract a location for housing / general: a known place, preferably
+    after 'in' / 'near' / ..., as its canonical name; otherwise the words
+    after a trailing 'in X'.
     """
-    lower = text.lower()
-    pattern = re.compile(r"(in|near|around|at)\s+([a-zA-Z\s]+)$")
-    m = pattern.search(lower)
+    places = _place_cues(utterance)
+    found = next((match for cue, match in places if cue in LOCATION_CUES), None)
+    if found is None:
+        found = next((match for cue, match in places if cue not in _ROUTE_CUES), None)
+    if found is not None:
+        location, utterance.spans["location"] = _place_value(utterance, found)
+        return location
+
+    m = _TRAILING_LOCATION.search(utterance.lower)
     if m:
-        loc = m.group(2).strip()
-        return loc
+        utterance.spans["location"] = _stripped_span(m, 2)
+        return m.group(2).strip()
     return None
 
 
-def _extract_booking_mode(text: str) -> Optional[str]:
+def _extract_booking_mode(utterance: Utterance) -> Optional[str]:
     """
     For housing: detect 'daily' vs 'monthly'.
     Returns 'DAILY', 'MONTHLY' or None.
     """
-    lower = text.lower()
-    if any(
-        x in lower
-        for x in [
-            "per day",
-            "per night",
-            "daily",
-            "for 2 days",
-            "for two days",
-            "for 3 days",
-            "for three days",
-        ]
-    ):
-        return "DAILY"
-    if any(
-        x in lower
-        for x in [
-            "per month",
-            "monthly",
-            "for a month",
-            "for one month",
-            "for 1 month",
-        ]
-    ):
-        return "MONTHLY"
+    hits = keyword_hits(utterance)
+    for mode in BOOKING_MODE_PHRASES:
+        if ("booking_mode", mode) in hits:
+            return mode
     return None
 
 
-def _extract_datetime(text: str) -> Tuple[Optional[str], Optional[str]]:
+def _extract_datetime(
+    utterance: Utterance, fast_only: bool = False
+) -> Tuple[Optional[str], Optional[str]]:
     """
-    Use dateparser to extract a datetime. Returns (datetime_iso, datetime_text_used).
+    Extract a datetime (fast path for common phrasings, dateparser otherwise,
+    unless `fast_only`). Returns (datetime_iso, datetime_text_used); how long
+    the value stays correct is left in utterance.cache["datetime_valid_until"].
     """
-    settings = {"PREFER_DATES_FROM": "future"}
-    dt = dateparser.parse(text, settings=settings)
-    if dt is None:
+    text = utterance.text
+    result = parse_datetime(text, fast_only=fast_only)
+    if result.iso is None:
         return None, None
-    return dt.isoformat(), text
+    utterance.cache["datetime_valid_until"] = result.valid_until.timestamp()
+    if result.text is None:
+        utterance.spans["datetime_text"] = (0, len(text))
+    else:
+        start = utterance.lower.find(result.text.lower())
+        if start >= 0:
+            utterance.spans["datetime_text"] = (start, start + len(result.text))
+    return result.iso, result.text or text
 
 
-def _extract_service_category(text: str) -> str:
+def _extract_service_category(utterance: Utterance) -> str:
     """
     Classify home_service into one of:
     'Plumber', 'Electrician', 'Carpenter', 'Cleaner',
     'AC Repair', 'Painter', 'Gardener', 'Appliance Repair', 'Other'
     """
-    lower = text.lower()
-
-    mapping = {
-        "Plumber": [
-            "tap",
-            "pipe",
-            "leak",
-            "plumb",
-            "toilet",
-            "sink",
-            "water is leaking",
-        ],
-        "Electrician": [
-            "electric",
-            "light",
-            "lights",
-            "fan",
-            "switch",
-            "socket",
-            "power",
-            "wiring",
-            "short circuit",
-        ],
-        "Carpenter": [
-            "carpenter",
-            "wood",
-            "door",
-            "furniture",
-            "bed frame",
-            "almirah",
-            "table",
-        ],
-        "Cleaner": [
-            "clean",
-            "cleaning",
-            "deep cleaning",
-            "maid",
-            "sweep",
-            "mop",
-            "dusting",
-        ],
-        "AC Repair": [
-            "ac",
-            "air conditioner",
-            "aircon",
-            "cooling",
-            "ac not cooling",
-            "ac repair",
-        ],
-        "Painter": [
-            "paint",
-            "painting",
-            "wall color",
-            "repaint",
-        ],
-        "Gardener": [
-            "garden",
-            "gardener",
-            "lawn",
-            "grass",
-            "plants",
-            "tree",
-        ],
-        "Appliance Repair": [
-            "fridge",
-            "refrigerator",
-            "washing machine",
-            "tv",
-            "microwave",
-            "oven",
-            "geyser",
-            "appliance",
-        ],
-    }
-
-    for category, keywords in mapping.items():
-        for kw in keywords:
-            if kw in lower:
-                return category
+    hits = keyword_hits(utterance)
+    for category in SERVICE_CATEGORY_KEYWORDS:
+        if ("service_category", category) in hits:
+            return category
 
     return "Other"
 
 
-def extract_slots(text: str, intent: str) -> Dict[str, object]:
+# Extractor name -> slots it fills, in response order.
+EXTRACTOR_SLOTS: Dict[str, Tuple[str, ...]] = {
+    "quantity": ("quantity_value", "quantity_unit"),
+    "product": ("product_name", "product_category"),
+    "from_to": ("origin", "destination"),
+    "location": ("location",),
+    "booking_mode": ("booking_mode",),
+    "datetime": ("datetime_iso", "datetime_text"),
+    "service_category": ("service_category",),
+}
+
+SLOT_NAMES: Tuple[str, ...] = (
+    "quantity_value",
+    "quantity_unit",
+    "product_name",
+    "product_category",
+    "origin",
+    "destination",
+    "location",
+    "booking_mode",
+    "datetime_iso",
+    "datetime_text",
+    "symptom_text",
+    "service_category",
+)
+
+_SLOT_EXTRACTOR = {slot: name for name, slots in EXTRACTOR_SLOTS.items() for slot in slots}
+
+# Which extractors each intent needs: what decide_followup checks plus what
+# the frontend handlers read. Intents not listed run every extractor.
+EXTRACTION_PLAN: Dict[str, Tuple[str, ...]] = {
+    "order_grocery": ("quantity", "product"),
+    "book_cab": ("from_to", "datetime"),
+    "book_housing": ("location", "booking_mode", "datetime"),
+    "housing_search": ("location", "booking_mode", "datetime"),
+    "home_service": ("service_category", "datetime"),
+    "health_symptom": ("datetime",),
+    "doctor_consult": ("datetime",),
+    "smalltalk_or_other": (),
+}
+
+_EXTRACTORS: Dict[str, Callable[[Utterance], Tuple]] = {
+    "quantity": _extract_quantity,
+    "product": _extract_product,
+    "from_to": _extract_from_to,
+    "location": lambda utterance: (_extract_location(utterance),),
+    "booking_mode": lambda utterance: (_extract_booking_mode(utterance),),
+    "datetime": _extract_datetime,
+    "service_category": lambda utterance: (_extract_service_category(utterance),),
+}
+
+# Used when the server is behind on requests (see nlu_admission): the same
+# extractors, minus the dateparser fallback, which costs milliseconds.
+_DEGRADED_EXTRACTORS = {
+    **_EXTRACTORS,
+    "datetime": lambda utterance: _extract_datetime(utterance, fast_only=True),
+}
+
+
+def extraction_plan(intent: str, include_slots: Sequence[str] = ()) -> List[str]:
+    """
+    Extractors to run for an intent, plus whatever is needed for the
+    explicitly requested `include_slots` (unknown slot names are ignored).
+    """
+    plan = list(EXTRACTION_PLAN.get(intent, EXTRACTOR_SLOTS))
+    for slot in include_slots:
+        name = _SLOT_EXTRACTOR.get(slot)
+        if name is not None and name not in plan:
+            plan.append(name)
+    return plan
+
+
+def extract_slots(
+    message: Union[str, Utterance],
+    intent: str,
+    include_slots: Sequence[str] = (),
+    timings: Optional[Dict[str, float]] = None,
+    degraded: bool = False,
+) -> Dict[str, object]:
     """
     Main slot extraction entrypoint.
+
+    Only the extractors in the intent's EXTRACTION_PLAN run (plus the ones
+    behind `include_slots`); every other slot is returned as None, so the
+    response always has the same keys. Pass the message's Utterance to reuse
+    its analysis (and keyword scan) from earlier stages; the spans of the
+    extracted values are then in its `spans` (see slot_spans).
+
+    If a `timings` dict is given, the seconds spent in each extractor are
+    recorded in it as "extract_<name>" (and the keyword scan as "keywords").
+
+    `degraded` skips the dateparser fallback: only the datetime phrasings the
+    fast parser understands are extracted.
     """
-    quantity_value, quantity_unit = _extract_quantity(text)
-    product_name, product_category = _extract_product(text)
-    origin, destination = _extract_from_to(text)
-    location = _extract_location(text)
-    booking_mode = _extract_booking_mode(text)
-    datetime_iso, datetime_text = _extract_datetime(text)
-    service_category = _extract_service_category(text)
-
-    slots: Dict[str, object] = {
-        "quantity_value": quantity_value,
-        "quantity_unit": quantity_unit,
-        "product_name": product_name,
-        "product_category": product_category,
-        "origin": origin,
-        "destination": destination,
-        "location": location,
-        "booking_mode": booking_mode,
-        "datetime_iso": datetime_iso,
-        "datetime_text": datetime_text,
-        "symptom_text": text if intent == "health_symptom" else None,
-        "service_category": service_category,
-    }
+    utterance = as_utterance(message)
+    plan = extraction_plan(intent, include_slots)
+    extractors = _DEGRADED_EXTRACTORS if degraded else _EXTRACTORS
+
+    slots: Dict[str, object] = dict.fromkeys(SLOT_NAMES)
+    if timings is None:
+        for name in plan:
+            slots.update(zip(EXTRACTOR_SLOTS[name], extractors[name](utterance)))
+    else:
+        perf = time.perf_counter
+        if plan and "keyword_hits" not in utterance.cache:
+            started = perf()
+            keyword_hits(utterance)
+            timings["keywords"] = perf() - started
+        for name in plan:
+            started = perf()
+            slots.update(zip(EXTRACTOR_SLOTS[name], extractors[name](utterance)))
+            timings["extract_" + name] = perf() - started
+
+    slots["symptom_text"] = utterance.text if intent == "health_symptom" else None
 
     return slots
 
 
+def slot_spans(utterance: Utterance, slots: Dict[str, object]) -> Dict[str, List[int]]:
+    """
+    [start, end) character offsets in the message of the slot values that
+    were read from it (extracted slots only; canonical names, keyword-based
+    categories and catalog matches may not have one).
+    """
+    return {
+        slot: [start, end]
+        for slot, (start, end) in utterance.spans.items()
+        if slots.get(slot) is not None
+    }
+
+
 def decide_followup(intent: str, slots: Dict[str, object]) -> Tuple[List[str], Optional[str]]:
     """
     Decide which slots are missing and what follow-up question (if any) to ask.
@@ -0,0 +1,615 @@
+"""
+Product catalog index for grocery slot extraction.
+
+Built offline from a catalog file (.csv or .jsonl with `id`, `name`,
+`category` and optional `brand` and `aliases` ("|"-separated) columns) into
+a directory of flat .npy arrays plus meta.json, like the mmap intent model.
+Every build writes a new version directory and points the `current` link
+of the index directory at it:
+
+- an inverted index: for every token, the sorted indices of the products
+  whose name, brand, aliases or category contain it;
+- per-posting flags telling where the token comes from: the product's
+  brand / aliases, its name, or only its category;
+- per-product weight (summed token IDF), its most distinctive (rarest)
+  name / brand token, and the product ids, names, categories and aliases as
+  UTF-8 blobs.
+
+Opening the index memory-maps the arrays, so startup is near-instant and
+every worker process shares one copy. Catalog changes are appended to
+updates.jsonl in the index directory (see append_updates) and applied on
+top of the mapped arrays by every process that has the index open, without
+a rebuild; `compact` folds them into a fresh index.
+
+    python product_catalog.py build catalog.csv models/product_index
+    python product_catalog.py update models/product_index changes.jsonl
+    python product_catalog.py compact models/product_index
+    python product_catalog.py match models/product_index "order 2 aashirvaad atta"
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from intent_model import HashedVocabulary
+
+FORMAT = "product-index/3"
+UPDATES_FILE = "updates.jsonl"
+CURRENT_LINK = "current"
+# Built versions kept besides the current one: a reader that resolved the
+# link just before a rebuild may still be opening the previous one.
+KEEP_VERSIONS = 1
+
+_VERSION_DIR = re.compile(r"v\d+-\d+")
+
+_TOKEN = re.compile(r"[a-z]+")
+
+# Words in grocery requests that never identify a product.
+QUERY_STOPWORDS = frozenset(
+    {
+        "order", "reorder", "buy", "get", "add", "send", "want", "need",
+        "me", "my", "usual", "some", "please", "pls", "a", "an", "the",
+        "to", "for", "of", "and", "with", "i", "can", "you",
+    }
+)
+
+Product = Dict[str, Any]
+
+# Where a product's token comes from (posting flags). Name and brand tokens
+# are "specific"; a token that is also in the category counts as category.
+CATEGORY_TOKEN = 0
+NAME_TOKEN = 1
+BRAND_TOKEN = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase letter tokens with a crude plural fold ("biscuits" ->
+    "biscuit"), applied the same way to catalog entries and messages.
+    """
+    return [
+        t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+        for t in _TOKEN.findall(text.lower())
+    ]
+
+
+def _aliases(product: Product) -> List[str]:
+    aliases = product.get("aliases") or []
+    if isinstance(aliases, str):
+        aliases = aliases.split("|")
+    return [a for a in (product.get("brand") or "", *aliases) if a]
+
+
+def product_tokens(product: Product) -> Dict[str, int]:
+    """
+    token -> CATEGORY_TOKEN, NAME_TOKEN or BRAND_TOKEN (brand or aliases).
+    """
+    tokens = {t: CATEGORY_TOKEN for t in tokenize(product.get("category") or "")}
+    for t in tokenize(product.get("name") or ""):
+        tokens.setdefault(t, NAME_TOKEN)
+    for alias in _aliases(product):
+        for t in tokenize(alias):
+            if tokens.get(t) != CATEGORY_TOKEN:
+                tokens[t] = BRAND_TOKEN
+    return tokens
+
+
+def _idf(df: np.ndarray, n_products: int) -> np.ndarray:
+    # Smoothed IDF, as in sklearn's TfidfVectorizer.
+    return np.log((1.0 + n_products) / (1.0 + df)) + 1.0
+
+
+def _pack_strings(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_string(blob: np.ndarray, offsets: np.ndarray, idx: int) -> str:
+    return blob[int(offsets[idx]) : int(offsets[idx + 1])].tobytes().decode("utf-8")
+
+
+def read_catalog(path: str) -> Iterator[Product]:
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported catalog format: {path}")
+
+
+def build_index(products: Iterable[Product], index_dir: str, drop_updates: bool = True) -> int:
+    """
+    Write the index for `products` (later entries with the same id win) to
+    `index_dir`, replacing any previous index and, unless `drop_updates` is
+    False, its updates. The arrays go to a new version directory and the
+    `current` link is swapped to it in one rename, so a reader opens either
+    the old index or the new one, never a mix, and processes that still
+    have the old index mapped are unaffected. Returns the number of products.
+    """
+    by_id: Dict[str, Product] = {}
+    for product in products:
+        if product.get("id") is None or not product.get("name"):
+            continue
+        by_id[str(product["id"])] = product
+    ids = list(by_id)
+
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for idx, product_id in enumerate(ids):
+        for token, kind in product_tokens(by_id[product_id]).items():
+            postings.setdefault(token, []).append((idx, kind))
+
+    terms = list(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+    flat = [p for t in terms for p in postings[t]]
+    posting_ids = np.array([p[0] for p in flat], dtype=np.int32)
+    posting_flags = np.array([p[1] for p in flat], dtype=np.uint8)
+
+    idf = _idf(np.diff(offsets).astype(np.float64), len(ids))
+    term_of_posting = np.repeat(np.arange(len(terms)), np.diff(offsets))
+    weights = np.bincount(posting_ids, weights=idf[term_of_posting], minlength=len(ids))
+
+    # Each product's highest-IDF name / brand token (-1 if it has none).
+    top_terms = np.full(len(ids), -1, dtype=np.int32)
+    specific = posting_flags != CATEGORY_TOKEN
+    spec_ids, spec_terms = posting_ids[specific], term_of_posting[specific]
+    order = np.lexsort((-idf[spec_terms], spec_ids))
+    spec_ids, spec_terms = spec_ids[order], spec_terms[order]
+    first = np.ones(len(spec_ids), dtype=bool)
+    first[1:] = spec_ids[1:] != spec_ids[:-1]
+    top_terms[spec_ids[first]] = spec_terms[first]
+
+    arrays = HashedVocabulary.build(terms)
+    arrays.update(
+        {
+            f"id_{name[len('vocab_'):]}": array
+            for name, array in HashedVocabulary.build(ids).items()
+        }
+    )
+    arrays["posting_offsets"] = offsets
+    arrays["posting_ids"] = posting_ids
+    arrays["posting_flags"] = posting_flags
+    arrays["weights"] = weights
+    arrays["top_terms"] = top_terms
+    arrays["name_blob"], arrays["name_offsets"] = _pack_strings(
+        [by_id[i]["name"] for i in ids]
+    )
+    arrays["category_blob"], arrays["category_offsets"] = _pack_strings(
+        [by_id[i].get("category") or "" for i in ids]
+    )
+    # Brand and aliases, kept so that `compact` can rebuild from the index.
+    arrays["alias_blob"], arrays["alias_offsets"] = _pack_strings(
+        ["|".join(_aliases(by_id[i])) for i in ids]
+    )
+
+    path = Path(index_dir)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    (path / version).mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(path / version / f"{name}.npy", np.ascontiguousarray(array))
+    meta = {"format": FORMAT, "products": len(ids), "terms": len(terms), "built_at": time.time()}
+    (path / version / "meta.json").write_text(json.dumps(meta, indent=2))
+    link = path / f".{version}.link"
+    os.symlink(version, link)
+    os.replace(link, path / CURRENT_LINK)
+    if drop_updates:
+        (path / UPDATES_FILE).unlink(missing_ok=True)
+    _prune_versions(path, version)
+    return len(ids)
+
+
+def _prune_versions(path: Path, current: str) -> None:
+    """
+    Delete all but the KEEP_VERSIONS newest built versions before `current`
+    (and unfinished builds older than those).
+    """
+    older = sorted(
+        (d.name for d in path.iterdir() if _VERSION_DIR.fullmatch(d.name) and d.name < current),
+        reverse=True,
+    )
+    for name in older[KEEP_VERSIONS:]:
+        shutil.rmtree(path / name, ignore_errors=True)
+
+
+def compact_index(index_dir: str) -> int:
+    """
+    Rebuild an index with its updates folded in. The updates file is first
+    moved aside, so changes appended while the rebuild runs go to a fresh
+    one and are applied on top of the new index instead of being lost.
+    Returns the number of products.
+    """
+    path = Path(index_dir)
+    updates, rotated = path / UPDATES_FILE, path / (UPDATES_FILE + ".compacting")
+    # A file left by an interrupted compaction is still to be folded in, and
+    # updates.jsonl, if any, is newer.
+    if not rotated.exists() and updates.exists():
+        os.replace(updates, rotated)
+    index = ProductIndex(index_dir, updates_file=rotated.name)
+    while True:
+        count = build_index(list(index.products()), index_dir, drop_updates=False)
+        # A writer that opened the file just before the rotation may have
+        # appended to it after it was read. Those updates are older than
+        # anything in the new updates.jsonl, so they go into the base index
+        # too rather than after the newer ones.
+        if not index._apply_updates():
+            break
+    rotated.unlink(missing_ok=True)
+    return count
+
+
+def append_updates(
+    index_dir: str, upserts: Sequence[Product] = (), deletes: Sequence[str] = ()
+) -> None:
+    """
+    Record catalog changes (new or changed products, deleted ids) for an
+    index. Every open ProductIndex picks them up on its next refresh.
+    """
+    line = json.dumps({"upsert": list(upserts), "delete": [str(d) for d in deletes]})
+    # One write of a whole line, so readers never see half an update.
+    with open(Path(index_dir) / UPDATES_FILE, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+class ProductMatch(NamedTuple):
+    product_id: str
+    name: str
+    category: Optional[str]
+    # Summed IDF of the message tokens found in the product.
+    score: float
+    # score / the product's total token weight.
+    coverage: float
+
+
+class ProductIndex:
+    """
+    Read side of a built index plus the updates applied since.
+
+    match() scores products by the IDF of the message tokens they contain.
+    Only products matching at least one name or brand token are candidates,
+    so "1 litre milk" does not pick an arbitrary milk brand; the best one is
+    the highest score, then the highest coverage. It must either cover at
+    least `min_coverage` of its own weight or be named by its brand / an
+    alias or its most distinctive name token: "order fanta" matches "Fanta
+    Orange 750ml" on "fanta" alone, "order orange" does not.
+
+    Candidates are the products containing any of the rarest message tokens
+    or, when even the rarest token is common, all of the rarest few, at most
+    `max_candidates` of them (more means the message names no single
+    product). Every token is then scored against them by binary search in
+    its sorted posting list, so a message costs about the same whether its
+    tokens occur in ten products or fifty thousand.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        min_coverage: float = 0.3,
+        max_candidates: int = 2000,
+        refresh_seconds: float = 1.0,
+        updates_file: str = UPDATES_FILE,
+    ):
+        self.index_dir = Path(index_dir)
+        self.updates_file = updates_file
+        self.min_coverage = min_coverage
+        self.max_candidates = max_candidates
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._open()
+        self.refresh()
+
+    def _open(self) -> None:
+        """
+        Map the built arrays and drop any applied updates (they are
+        replayed by the following refresh).
+        """
+        try:
+            self._version = os.readlink(self.index_dir / CURRENT_LINK)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Product index not found at {self.index_dir}") from None
+        root = self.index_dir / self._version
+        meta = json.loads((root / "meta.json").read_text())
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"Unsupported product index format: {meta.get('format')}")
+
+        def array(name: str) -> np.ndarray:
+            return np.load(root / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+
+        self.vocabulary = HashedVocabulary(
+            array("vocab_table"), array("vocab_hashes"), array("vocab_blob"), array("vocab_offsets")
+        )
+        self.ids = HashedVocabulary(
+            array("id_table"), array("id_hashes"), array("id_blob"), array("id_offsets")
+        )
+        self.posting_offsets = array("posting_offsets")
+        self.posting_ids = array("posting_ids")
+        self.posting_flags = array("posting_flags")
+        self.weights = array("weights")
+        self.top_terms = array("top_terms")
+        self._name_blob, self._name_offsets = array("name_blob"), array("name_offsets")
+        self._category_blob = array("category_blob")
+        self._category_offsets = array("category_offsets")
+        self._alias_blob, self._alias_offsets = array("alias_blob"), array("alias_offsets")
+        self.n_base = len(self.ids)
+
+        # Updates since the build: base products replaced or deleted, and the
+        # products added, with their own small inverted index.
+        self._dead = np.zeros(self.n_base, dtype=bool)
+        self._n_dead = 0
+        self._added: Dict[str, Product] = {}
+        self._added_tokens: Dict[str, Dict[str, bool]] = {}
+        self._added_postings: Dict[str, set] = {}
+        self._updates_offset = 0
+        self._updates_inode: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self.n_base - self._n_dead + len(self._added)
+
+    def refresh(self) -> int:
+        """
+        Apply updates appended since the last refresh, after reopening the
+        index if it has been rebuilt (e.g. by `compact`). Returns how many
+        update lines were applied.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if os.readlink(self.index_dir / CURRENT_LINK) != self._version:
+                self._open()
+            return self._apply_updates()
+
+    def _apply_updates(self) -> int:
+        path = self.index_dir / self.updates_file
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return 0
+        if stat.st_ino != self._updates_inode:
+            # Moved aside by a compaction that is still running: the new
+            # file only has updates newer than the ones applied.
+            self._updates_inode = stat.st_ino
+            self._updates_offset = 0
+        if stat.st_size <= self._updates_offset:
+            return 0
+        applied = 0
+        with open(path, "rb") as f:
+            f.seek(self._updates_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being written
+                self._updates_offset += len(line)
+                update = json.loads(line)
+                for product_id in update.get("delete", ()):
+                    self._remove(str(product_id))
+                for product in update.get("upsert", ()):
+                    if product.get("id") is not None and product.get("name"):
+                        self._remove(str(product["id"]))
+                        self._add(product)
+                applied += 1
+        return applied
+
+    def _remove(self, product_id: str) -> None:
+        base = self.ids.get(product_id)
+        if base is not None and not self._dead[base]:
+            self._dead[base] = True
+            self._n_dead += 1
+        if self._added.pop(product_id, None) is not None:
+            for token in self._added_tokens.pop(product_id):
+                self._added_postings[token].discard(product_id)
+
+    def _add(self, product: Product) -> None:
+        product_id = str(product["id"])
+        tokens = product_tokens(product)
+        self._added[product_id] = product
+        self._added_tokens[product_id] = tokens
+        for token in tokens:
+            self._added_postings.setdefault(token, set()).add(product_id)
+
+    def _postings(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        term = self.vocabulary.get(token)
+        if term is None:
+            return self.posting_ids[:0], self.posting_flags[:0]
+        start, end = int(self.posting_offsets[term]), int(self.posting_offsets[term + 1])
+        return self.posting_ids[start:end], self.posting_flags[start:end]
+
+    def match(self, text: str) -> Optional[ProductMatch]:
+        """
+        Best matching product for a message, or None.
+        """
+        if time.monotonic() - self._checked_at >= self.refresh_seconds:
+            self.refresh()
+        tokens = [t for t in dict.fromkeys(tokenize(text)) if t not in QUERY_STOPWORDS]
+        if not tokens:
+            return None
+        # refresh() from another thread may reopen the arrays or apply
+        # updates; match against one consistent state.
+        with self._lock:
+            return self._match(tokens)
+
+    def _match(self, tokens: List[str]) -> Optional[ProductMatch]:
+        n_products = len(self)
+        postings = {t: self._postings(t) for t in tokens}
+        df = {t: len(postings[t][0]) + len(self._added_postings.get(t, ())) for t in tokens}
+        idf = {t: float(_idf(np.float64(df[t]), n_products)) for t in tokens}
+
+        best = self._match_base(tokens, postings, idf)
+        added = self._match_added(tokens, idf)
+        if added is not None and (best is None or added[:2] > best[:2]):
+            best = added
+        if best is None:
+            return None
+        score, coverage, product_id, name, category = best
+        return ProductMatch(product_id, name, category or None, score, coverage)
+
+    def _match_base(
+        self,
+        tokens: List[str],
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        idf: Dict[str, float],
+    ) -> Optional[Tuple[float, float, str, str, str]]:
+        by_rarity = sorted((t for t in tokens if len(postings[t][0])), key=lambda t: len(postings[t][0]))
+        if not by_rarity:
+            return None
+        candidates = postings[by_rarity[0]][0]
+        if len(candidates) > self.max_candidates:
+            # Common tokens ("amul"): only products containing the next
+            # rarest tokens as well.
+            for token in by_rarity[1:]:
+                ids = postings[token][0]
+                pos = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+                candidates = candidates[ids[pos] == candidates]
+                if len(candidates) <= self.max_candidates:
+                    break
+            # Still too many to name one product ("milk", "biscuits"): leave
+            # it to the category keywords.
+            if len(candidates) > self.max_candidates:
+                return None
+        else:
+            # Rare tokens: products containing any of them.
+            seeds = [candidates]
+            total = len(candidates)
+            for token in by_rarity[1:]:
+                total += len(postings[token][0])
+                if total > self.max_candidates:
+                    break
+                seeds.append(postings[token][0])
+            if len(seeds) > 1:
+                candidates = np.unique(np.concatenate(seeds))
+        candidates = candidates[~self._dead[candidates]]
+        if not len(candidates):
+            return None
+
+        scores = np.zeros(len(candidates))
+        specific = np.zeros(len(candidates), dtype=bool)
+        named = np.zeros(len(candidates), dtype=bool)
+        top_terms = self.top_terms[candidates]
+        for token in by_rarity:
+            ids, flags = postings[token]
+            pos = np.minimum(np.searchsorted(ids, candidates), len(ids) - 1)
+            hit = ids[pos] == candidates
+            scores[hit] += idf[token]
+            kinds = flags[pos[hit]]
+            specific[hit] |= kinds != CATEGORY_TOKEN
+            named[hit] |= (kinds == BRAND_TOKEN) | (top_terms[hit] == self.vocabulary.get(token))
+
+        coverage = scores / self.weights[candidates]
+        ok = specific & (named | (coverage >= self.min_coverage))
+        if not ok.any():
+            return None
+        candidates, scores, coverage = candidates[ok], scores[ok], coverage[ok]
+        i = int(np.lexsort((-coverage, -scores))[0])
+        idx = int(candidates[i])
+        return (
+            float(scores[i]),
+            float(coverage[i]),
+            self.ids.term(idx),
+            _unpack_string(self._name_blob, self._name_offsets, idx),
+            _unpack_string(self._category_blob, self._category_offsets, idx),
+        )
+
+    def _match_added(
+        self, tokens: List[str], idf: Dict[str, float]
+    ) -> Optional[Tuple[float, float, str, str, str]]:
+        best = None
+        candidates = set().union(*(self._added_postings.get(t, ()) for t in tokens))
+        for product_id in candidates:
+            product_tokens_ = self._added_tokens[product_id]
+            found = [t for t in tokens if t in product_tokens_]
+            if all(product_tokens_[t] == CATEGORY_TOKEN for t in found):
+                continue
+            score = sum(idf[t] for t in found)
+            df = {t: self._df(t) for t in product_tokens_}
+            weight = sum(float(_idf(np.float64(n), len(self))) for n in df.values())
+            coverage = score / weight
+            top = min(
+                (t for t, kind in product_tokens_.items() if kind != CATEGORY_TOKEN),
+                key=df.get,
+            )
+            named = top in found or any(product_tokens_[t] == BRAND_TOKEN for t in found)
+            if not named and coverage < self.min_coverage:
+                continue
+            if best is None or (score, coverage) > best[:2]:
+                product = self._added[product_id]
+                best = (score, coverage, product_id, product["name"], product.get("category") or "")
+        return best
+
+    def _df(self, token: str) -> int:
+        term = self.vocabulary.get(token)
+        base = 0 if term is None else int(self.posting_offsets[term + 1] - self.posting_offsets[term])
+        return base + len(self._added_postings.get(token, ()))
+
+    def products(self) -> Iterator[Product]:
+        """
+        Every live product (base minus deleted, plus added), for compaction.
+        Don't refresh the index while iterating.
+        """
+        for idx in range(self.n_base):
+            if not self._dead[idx]:
+                yield {
+                    "id": self.ids.term(idx),
+                    "name": _unpack_string(self._name_blob, self._name_offsets, idx),
+                    "category": _unpack_string(self._category_blob, self._category_offsets, idx),
+                    "aliases": _unpack_string(self._alias_blob, self._alias_offsets, idx),
+                }
+        yield from self._added.values()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index from a catalog file")
+    build.add_argument("catalog", help=".csv or .jsonl with id, name, category[, brand, aliases]")
+    build.add_argument("index_dir")
+    update = sub.add_parser("update", help="Append catalog changes to an index")
+    update.add_argument("index_dir")
+    update.add_argument(
+        "changes",
+        help=".csv / .jsonl of products to add or replace; rows with \"deleted\": true are removed",
+    )
+    compact = sub.add_parser("compact", help="Rebuild an index with its updates folded in")
+    compact.add_argument("index_dir")
+    match = sub.add_parser("match", help="Show the best match for messages")
+    match.add_argument("index_dir")
+    match.add_argument("messages", nargs="+")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "build":
+        count = build_index(read_catalog(args.catalog), args.index_dir)
+        print(f"Indexed {count} products in {time.perf_counter() - started:.1f} s")
+    elif args.command == "update":
+        upserts, deletes = [], []
+        for product in read_catalog(args.changes):
+            deleted = str(product.get("deleted", "")).lower() in ("1", "true")
+            (deletes if deleted else upserts).append(str(product["id"]) if deleted else product)
+        append_updates(args.index_dir, upserts, deletes)
+        print(f"Queued {len(upserts)} upserts and {len(deletes)} deletes")
+    elif args.command == "compact":
+        count = compact_index(args.index_dir)
+        print(f"Compacted {count} products in {time.perf_counter() - started:.1f} s")
+    else:
+        index = ProductIndex(args.index_dir)
+        for message in args.messages:
+            t = time.perf_counter()
+            result = index.match(message)
+            elapsed = (time.perf_counter() - t) * 1e6
+            print(f"{message!r}: {result} ({elapsed:.0f} µs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
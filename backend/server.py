@@ -1,15 +1,273 @@
-from typing import Any, Dict, List, Optional
+import time
 
-from fastapi import FastAPI
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
-from intent_model import IntentModel
-from nlu_utils import extract_slots, decide_followup
+import nlu_pipeline
+from intent_model import CASCADE_ENABLED, read_cascade_meta
+from nlu_admission import AdmissionController, Deadline, DeadlineExceededError, OverloadedError
+from nlu_batching import MicroBatcher, QueueFullError
+from nlu_cache import ResponseCache, normalize_message
+from nlu_executor import ExecutorBusyError, NLUExecutor
+from nlu_feedback import FeedbackBuffer, OnlineLearner
+from nlu_metrics import NLUMetrics
+from nlu_model_manager import ModelInfo, ModelManager, ModelReloadError
+from nlu_sessions import SessionTooLargeError, create_session_store, new_session_id
+from nlu_utils import EXTRACTION_PLAN
+from nlu_pipeline import apply_domain_heuristics  # noqa: F401  (re-exported)
+
+logger = logging.getLogger(__name__)
+
+# Startup phases in seconds, reported by /ready and /nlu/stats.
+startup_profile: Dict[str, Any] = {
+    "import_seconds": time.perf_counter() - _IMPORT_STARTED,
+    "ready": False,
+}
+
+# Pickled sklearn pipeline (.joblib) or the exported NumPy model (.npz),
+# both written by train_intent_model.py.
+MODEL_PATH = os.getenv("NLU_MODEL_PATH", "models/intent_model.joblib")
+
+# Hot model reload. The admin endpoints (/admin/model*) are disabled unless
+# NLU_ADMIN_TOKEN is set, and only load artifacts from NLU_MODEL_DIR.
+# NLU_MODEL_WATCH_SECONDS > 0 also reloads when the model file changes.
+ADMIN_TOKEN = os.getenv("NLU_ADMIN_TOKEN")
+MODEL_DIR = os.getenv("NLU_MODEL_DIR", os.path.dirname(MODEL_PATH) or ".")
+MODEL_WATCH_SECONDS = float(os.getenv("NLU_MODEL_WATCH_SECONDS", "0"))
+
+# Online learning from /nlu/feedback corrections (see nlu_feedback.py).
+# Every NLU_FEEDBACK_INTERVAL_SECONDS (0 = only on POST /admin/model/learn)
+# a copy of the model is fine-tuned on them, validated and published.
+# Corrections retrain the served model, so /nlu/feedback needs the admin
+# token and accepts NLU_FEEDBACK_RATE per second (bursts of
+# NLU_FEEDBACK_BURST; 0 = no limit).
+FEEDBACK_BUFFER_SIZE = int(os.getenv("NLU_FEEDBACK_BUFFER", "10000"))
+FEEDBACK_RATE = float(os.getenv("NLU_FEEDBACK_RATE", "5"))
+FEEDBACK_BURST = int(os.getenv("NLU_FEEDBACK_BURST", "50"))
+FEEDBACK_INTERVAL_SECONDS = float(os.getenv("NLU_FEEDBACK_INTERVAL_SECONDS", "0"))
+FEEDBACK_MIN_BATCH = int(os.getenv("NLU_FEEDBACK_MIN_BATCH", "20"))
+FEEDBACK_EPOCHS = int(os.getenv("NLU_FEEDBACK_EPOCHS", "5"))
+FEEDBACK_MAX_ACCURACY_DROP = float(os.getenv("NLU_FEEDBACK_MAX_ACCURACY_DROP", "0.01"))
+FEEDBACK_DATA = os.getenv("NLU_FEEDBACK_DATA")
+MAX_BATCH_SIZE = int(os.getenv("NLU_MAX_BATCH_SIZE", "256"))
+
+# Where the CPU-bound pipeline runs: "thread" (default), "process" or "inline".
+EXECUTOR_MODE = os.getenv("NLU_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.getenv("NLU_EXECUTOR_WORKERS", "0")) or None
+EXECUTOR_MAX_PENDING = int(os.getenv("NLU_EXECUTOR_MAX_PENDING", "256"))
+
+# Micro-batching of concurrent /nlu requests. A window of 0 disables it and
+# every request is processed on its own.
+BATCH_WINDOW_MS = float(os.getenv("NLU_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = int(os.getenv("NLU_BATCH_MAX_SIZE", "32"))
+BATCH_QUEUE_SIZE = int(os.getenv("NLU_BATCH_QUEUE_SIZE", "1024"))
+
+# Latency budget of requests waiting for the pipeline (see nlu_admission.py).
+# One that queued longer than NLU_DEGRADE_AFTER_MS runs the degraded pipeline
+# (no classifier cascade escalation, no dateparser; flagged `degraded` and not
+# cached). Past NLU_SHED_AFTER_MS it is answered 503 with Retry-After, as are
+# new requests whose backlog would make them wait that long. 0 disables either.
+# Neither applies before /ready is green. The backlog estimate starts from
+# NLU_SHED_INITIAL_JOB_MS per job until real jobs have been timed.
+DEGRADE_AFTER_MS = float(os.getenv("NLU_DEGRADE_AFTER_MS", "250"))
+SHED_AFTER_MS = float(os.getenv("NLU_SHED_AFTER_MS", "2000"))
+SHED_INITIAL_JOB_MS = float(os.getenv("NLU_SHED_INITIAL_JOB_MS", "10"))
+
+# /nlu response cache. A size of 0 disables it. NLU_CACHE_WARM_FILE may point
+# to a text file with one frequent message per line to precompute at startup.
+CACHE_SIZE = int(os.getenv("NLU_CACHE_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("NLU_CACHE_TTL_SECONDS", "3600"))
+CACHE_WARM_FILE = os.getenv("NLU_CACHE_WARM_FILE")
+
+# Server-side dialogue sessions (/nlu with "session": true, then
+# /nlu/continue with just the session_id). "memory" is per process;
+# "sqlite:///path/sessions.db" shares sessions between workers on one host.
+SESSION_STORE = os.getenv("NLU_SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = float(os.getenv("NLU_SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX = int(os.getenv("NLU_SESSION_MAX", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("NLU_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Prime the model, dateparser and regexes at startup (in the background;
+# /ready turns green once done). Set to 0 to skip.
+WARMUP = os.getenv("NLU_WARMUP", "1") != "0"
+
+executor = NLUExecutor(
+    mode=EXECUTOR_MODE,
+    max_workers=EXECUTOR_WORKERS,
+    max_pending=EXECUTOR_MAX_PENDING,
+    model_path=MODEL_PATH,
+)
+
+
+async def _run_batch(items: List[Tuple[str, List[str], Deadline]]) -> List[Any]:
+    # Each request keeps its own deadline: a stale one is shed or degraded
+    # without taking the fresh requests riding along with it down too.
+    texts = [text for text, _, _ in items]
+    include_slots = [include for _, include, _ in items]
+    deadlines = [deadline for _, _, deadline in items]
+    return await run_job(nlu_pipeline.run_nlu_batch, texts, include_slots, deadlines)
+
+
+batcher: Optional[MicroBatcher] = None
+if BATCH_WINDOW_MS > 0:
+    batcher = MicroBatcher(
+        _run_batch,
+        window_ms=BATCH_WINDOW_MS,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_queue_size=BATCH_QUEUE_SIZE,
+        max_concurrent_batches=executor.concurrency,
+    )
+
+
+metrics = NLUMetrics()
+
+admission = AdmissionController(
+    DEGRADE_AFTER_MS,
+    SHED_AFTER_MS,
+    executor.concurrency,
+    initial_job_ms=SHED_INITIAL_JOB_MS,
+)
+
+session_store = create_session_store(
+    SESSION_STORE,
+    maxsize=SESSION_MAX,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_bytes=SESSION_MAX_BYTES,
+)
+
+
+def _on_model_swap(info: ModelInfo) -> None:
+    # Cached responses came from the old model (their keys carry its version,
+    # so nothing stale is served even before this runs).
+    if response_cache is not None:
+        response_cache.clear()
+    metrics.set_model(info.version, info.path)
+
+
+model_manager = ModelManager(executor, MODEL_PATH, on_swap=_on_model_swap)
+
+feedback_buffer = FeedbackBuffer(
+    maxsize=FEEDBACK_BUFFER_SIZE, rate_per_second=FEEDBACK_RATE, burst=FEEDBACK_BURST
+)
+online_learner = OnlineLearner(
+    feedback_buffer,
+    model_manager,
+    output_dir=os.path.join(MODEL_DIR, "online"),
+    min_batch=FEEDBACK_MIN_BATCH,
+    epochs=FEEDBACK_EPOCHS,
+    max_accuracy_drop=FEEDBACK_MAX_ACCURACY_DROP,
+    data_path=FEEDBACK_DATA,
+)
+
+
+def cache_key(text: str, include_slots: List[str]) -> Tuple[Any, ...]:
+    return (model_manager.active.version, normalize_message(text), tuple(include_slots))
+
+response_cache: Optional[ResponseCache] = None
+if CACHE_SIZE > 0:
+    response_cache = ResponseCache(maxsize=CACHE_SIZE, ttl_seconds=CACHE_TTL_SECONDS)
+
+
+async def warm_response_cache(path: str) -> int:
+    """
+    Precompute responses for the messages in `path` (one per line, blank
+    lines and '#' comments ignored). Returns the number of cached messages.
+    """
+    with open(path, encoding="utf-8") as f:
+        messages = [
+            normalize_message(line)
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    messages = list(dict.fromkeys(messages))[: response_cache.maxsize]
+
+    for start in range(0, len(messages), MAX_BATCH_SIZE):
+        chunk = messages[start : start + MAX_BATCH_SIZE]
+        results = await executor.run(nlu_pipeline.run_nlu_batch, chunk)
+        for text, result in zip(chunk, results):
+            valid_until = result.pop("valid_until", None)
+            result.pop("timings", None)
+            response_cache.put(cache_key(text, []), result, valid_until)
+    return len(messages)
+
+
+async def warm_up() -> None:
+    """
+    Warm every executor worker (process workers load their model here), then
+    the response cache, and only then report ready.
+    """
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[executor.run(nlu_pipeline.warm_up) for _ in range(executor.concurrency)]
+        )
+        startup_profile["warm_up_seconds"] = time.perf_counter() - started
 
-MODEL_PATH = "models/intent_model.joblib"
+        if response_cache is not None and CACHE_WARM_FILE:
+            started = time.perf_counter()
+            startup_profile["cache_warmed_messages"] = await warm_response_cache(CACHE_WARM_FILE)
+            startup_profile["cache_warm_seconds"] = time.perf_counter() - started
+    except Exception:
+        logger.exception("NLU warm-up failed")
+        startup_profile["warm_up_error"] = True
+        return
 
-app = FastAPI(title="SecondSons NLU API")
+    startup_profile["ready"] = True
+    logger.info("NLU server ready: %s", startup_profile)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Process workers load their own copy of the model; the server process
+    # only loads one when the pipeline runs in it.
+    started = time.perf_counter()
+    info = model_manager.load_initial()
+    startup_profile["model_load_seconds"] = time.perf_counter() - started
+    metrics.set_model(info.version, info.path)
+
+    executor.start()
+
+    if batcher is not None:
+        await batcher.start()
+
+    warm_up_task = None
+    if WARMUP:
+        warm_up_task = asyncio.create_task(warm_up())
+    else:
+        startup_profile["ready"] = True
+
+    watch_task = None
+    if MODEL_WATCH_SECONDS > 0:
+        watch_task = asyncio.create_task(model_manager.watch(MODEL_WATCH_SECONDS))
+
+    learner_task = None
+    if FEEDBACK_INTERVAL_SECONDS > 0:
+        learner_task = asyncio.create_task(online_learner.run(FEEDBACK_INTERVAL_SECONDS))
+
+    yield
+
+    for task in (warm_up_task, watch_task, learner_task):
+        if task is not None:
+            task.cancel()
+    if batcher is not None:
+        await batcher.stop()
+    executor.shutdown()
+    session_store.close()
+
+
+app = FastAPI(title="SecondSons NLU API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,11 +277,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-intent_model = IntentModel.load(MODEL_PATH)
-
 
 class NLURequest(BaseModel):
     message: str
+    # Slots to extract even if the detected intent doesn't need them
+    # (by default only the intent's extraction plan runs).
+    include_slots: List[str] = []
+    # Return the classifier's k most likely intents in `top_intents`
+    # (at most nlu_pipeline.MAX_TOP_K; 0 leaves the field out).
+    top_k: int = 0
+    # Keep the intent and slots server-side and return a `session_id` to
+    # continue with.
+    session: bool = False
+
+
+class IntentScore(BaseModel):
+    intent: str
+    confidence: float
 
 
 class NLUResponse(BaseModel):
@@ -31,74 +301,267 @@ class NLUResponse(BaseModel):
     slots: Dict[str, Any]
     missing_slots: List[str]
     followup_question: Optional[str]
+    # Classifier probability of its best guess (None for /nlu/continue,
+    # where the intent is given).
+    confidence: Optional[float] = None
+    top_intents: Optional[List[IntentScore]] = None
+    session_id: Optional[str] = None
+    # Version (content fingerprint) of the model that classified the message.
+    model_version: Optional[str] = None
+    # [start, end) character offsets of extracted slot values in the message
+    # (with surrounding and repeated whitespace collapsed), for the slots
+    # whose value was read from it.
+    slot_spans: Optional[Dict[str, List[int]]] = None
+    # True if the server was overloaded and skipped expensive stages for
+    # this message (see NLU_DEGRADE_AFTER_MS).
+    degraded: bool = False
+
+
+class NLUBatchRequest(BaseModel):
+    messages: List[str]
+    include_slots: List[str] = []
+    top_k: int = 0
+
+
+class NLUBatchResponse(BaseModel):
+    results: List[NLUResponse]
 
 
 class NLUContinueRequest(BaseModel):
     message: str
-    intent: str
+    # Either the session_id returned by /nlu, or the intent and
+    # previous_slots of the conversation so far.
+    session_id: Optional[str] = None
+    intent: Optional[str] = None
     previous_slots: Dict[str, Any] = {}
+    include_slots: List[str] = []
+
+
+def to_response(
+    result: Dict[str, Any], top_k: int = 0, session_id: Optional[str] = None
+) -> NLUResponse:
+    """
+    Build the response from a (possibly cached, so not to be modified)
+    pipeline result, trimming `top_intents` to what the request asked for.
+    """
+    top_intents = result.get("top_intents")
+    if top_intents is not None:
+        top_intents = top_intents[:top_k] if top_k > 0 else None
+    return NLUResponse(**{**result, "top_intents": top_intents, "session_id": session_id})
+
+
+# Why a request was rejected with a 503, by exception type.
+SHED_REASONS = {
+    OverloadedError: "overload",
+    DeadlineExceededError: "deadline",
+    ExecutorBusyError: "queue_full",
+    QueueFullError: "queue_full",
+}
+SHED_ERRORS = tuple(SHED_REASONS)
+
+
+def shed_error(endpoint: str, exc: Exception) -> HTTPException:
+    """
+    The 503 for a request the server could not take on, with a Retry-After
+    so clients back off instead of piling up.
+    """
+    reason = SHED_REASONS[type(exc)]
+    admission.shed(reason)
+    metrics.observe_shed(endpoint, reason)
+    retry_after = admission.retry_after(backlog())
+    return HTTPException(
+        status_code=503, detail=str(exc), headers={"Retry-After": str(retry_after)}
+    )
+
+
+def backlog() -> int:
+    """
+    Pipeline jobs waiting for a worker (a micro-batch counts as one job).
+    """
+    queued = executor.backlog
+    if batcher is not None:
+        queued += -(-batcher.queue_depth // batcher.max_batch_size)
+    return queued
+
 
+def admit(endpoint: str) -> Deadline:
+    """
+    Admit a request to the pipeline, or shed it right away if the backlog
+    ahead of it is too long. During warm-up nothing is shed or degraded.
+    """
+    try:
+        return admission.admit(backlog(), enforce=startup_profile["ready"])
+    except OverloadedError as exc:
+        raise shed_error(endpoint, exc)
 
-def apply_domain_heuristics(text: str, intent: str) -> str:
-    """
-    Apply lightweight domain rules on top of the ML model to fix obvious cases.
-    For example, 'tap is leaking' and 'fan not working' => home_service.
-    """
-    lower = text.lower()
-
-    home_keywords = [
-        "tap",
-        "pipe",
-        "leak",
-        "fan",
-        "light",
-        "lights",
-        "bulb",
-        "switch",
-        "socket",
-        "electrician",
-        "water is leaking",
-    ]
-    grocery_keywords = [
-        "biscuit",
-        "biscuits",
-        "milk",
-        "bread",
-        "egg",
-        "eggs",
-        "rice",
-        "atta",
-        "oil",
-        "chocolate",
-        "fanta",
-        "cold drink",
-        "juice",
-    ]
-
-    if any(hk in lower for hk in home_keywords) and not any(
-        gk in lower for gk in grocery_keywords
-    ):
-        if intent in ("health_symptom", "order_grocery", "smalltalk_or_other"):
-            return "home_service"
-
-    return intent
+
+async def run_job(fn, *args: Any) -> Any:
+    """
+    Run a nlu_pipeline function on the configured executor and report how
+    long it took in the worker to admission control.
+    """
+    result, seconds = await executor.run(nlu_pipeline.run_timed, fn, *args)
+    results = result if isinstance(result, list) else [result]
+    admission.observe_job(seconds, sum(isinstance(r, dict) and r["degraded"] for r in results))
+    return result
+
+
+def observe_result(endpoint: str, result: Dict[str, Any]) -> None:
+    """
+    Record the stage timings (popped from the result) and degradation of a
+    fresh pipeline result.
+    """
+    if result["degraded"]:
+        metrics.observe_degraded(endpoint)
+    metrics.observe_stages(endpoint, result.pop("timings"))
+
+
+async def run_pipeline(endpoint: str, fn, *args: Any) -> Any:
+    """
+    Admit a request and run a nlu_pipeline function for it, with its
+    Deadline as the last argument.
+    """
+    deadline = admit(endpoint)
+    try:
+        return await run_job(fn, *args, deadline)
+    except SHED_ERRORS as exc:
+        raise shed_error(endpoint, exc)
+
+
+async def compute_nlu(
+    text: str, include_slots: List[str]
+) -> Tuple[Dict[str, Any], Optional[float]]:
+    """
+    Run the /nlu pipeline for one message (through the micro-batcher when it
+    is enabled) and record its stage timings. Returns the response fields and
+    their cache expiry.
+    """
+    if batcher is None:
+        result = await run_pipeline("/nlu", nlu_pipeline.run_nlu, text, include_slots)
+    else:
+        deadline = admit("/nlu")
+        try:
+            result = await batcher.submit((text, include_slots, deadline))
+        except SHED_ERRORS as exc:
+            raise shed_error("/nlu", exc)
+        if isinstance(result, DeadlineExceededError):
+            raise shed_error("/nlu", result)
+    valid_until = result.pop("valid_until", None)
+    observe_result("/nlu", result)
+    if result["degraded"]:
+        # Not cached: the next identical message gets the full pipeline.
+        valid_until = 0.0
+    return result, valid_until
+
+
+async def classify_message(text: str, include_slots: List[str]) -> Dict[str, Any]:
+    """
+    First turn of a conversation: /nlu's pipeline behind the response cache.
+    The result may be shared with other requests, so don't modify it.
+    The message is processed in its cache key form, so that slot values and
+    spans of a cached response are valid for every message sharing its key.
+    """
+    text = normalize_message(text)
+    if response_cache is None:
+        result, _ = await compute_nlu(text, include_slots)
+        return result
+    key = cache_key(text, include_slots)
+    return await response_cache.get_or_compute(key, lambda: compute_nlu(text, include_slots))
+
+
+async def continue_message(
+    text: str, intent: str, previous_slots: Dict[str, Any], include_slots: List[str]
+) -> Dict[str, Any]:
+    """
+    Follow-up turn for a known intent (see nlu_continue for the merge rules).
+    """
+    result = await run_pipeline(
+        "/nlu/continue",
+        nlu_pipeline.run_continue,
+        normalize_message(text),
+        intent,
+        previous_slots,
+        include_slots,
+    )
+    observe_result("/nlu/continue", result)
+    return result
+
+
+async def session_call(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call a session store method, in a thread if the store blocks on I/O.
+    An oversized state is the client's doing: 413, not a server error.
+    """
+    try:
+        if session_store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+    except SessionTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
 
 
 @app.post("/nlu", response_model=NLUResponse)
 async def nlu_endpoint(req: NLURequest) -> NLUResponse:
-    text = req.message.strip()
-    intent_raw = intent_model.predict_intent(text)
-    intent = apply_domain_heuristics(text, intent_raw)
+    started = time.perf_counter()
+    result = await classify_message(req.message.strip(), req.include_slots)
+    session_id = None
+    if req.session:
+        session_id = new_session_id()
+        await session_call(
+            session_store.put, session_id, {"intent": result["intent"], "slots": result["slots"]}
+        )
+    metrics.observe_request("/nlu", time.perf_counter() - started, (result["intent"],))
+    return to_response(result, req.top_k, session_id)
+
+
+@app.post("/nlu/batch", response_model=NLUBatchResponse)
+async def nlu_batch(req: NLUBatchRequest) -> NLUBatchResponse:
+    """
+    Same as /nlu for a list of messages (e.g. SMS / WhatsApp replays grouped
+    by the gateway). The classifier runs once over the whole batch; results
+    are returned in the same order as the input messages.
+    """
+    if len(req.messages) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.messages)} messages (max {MAX_BATCH_SIZE})",
+        )
+
+    started = time.perf_counter()
+    texts = [normalize_message(m) for m in req.messages]
+    keys = [cache_key(text, req.include_slots) for text in texts]
 
-    slots = extract_slots(text, intent)
-    missing_slots, followup_question = decide_followup(intent, slots)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    if response_cache is not None:
+        results = [response_cache.get(key) for key in keys]
 
-    return NLUResponse(
-        intent=intent,
-        slots=slots,
-        missing_slots=missing_slots,
-        followup_question=followup_question,
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        deadline = admit("/nlu/batch")
+        try:
+            computed = await run_job(
+                nlu_pipeline.run_nlu_batch,
+                [texts[i] for i in missing],
+                [req.include_slots] * len(missing),
+                [deadline] * len(missing),
+            )
+        except SHED_ERRORS as exc:
+            raise shed_error("/nlu/batch", exc)
+        # All messages share the request's deadline, so they expire together.
+        expired = next((r for r in computed if isinstance(r, DeadlineExceededError)), None)
+        if expired is not None:
+            raise shed_error("/nlu/batch", expired)
+        for i, result in zip(missing, computed):
+            valid_until = result.pop("valid_until", None)
+            observe_result("/nlu/batch", result)
+            if response_cache is not None and not result["degraded"]:
+                response_cache.put(keys[i], result, valid_until)
+            results[i] = result
+
+    metrics.observe_request(
+        "/nlu/batch", time.perf_counter() - started, [r["intent"] for r in results]
     )
+    return NLUBatchResponse(results=[to_response(r, req.top_k) for r in results])
 
 
 @app.post("/nlu/continue", response_model=NLUResponse)
@@ -112,32 +575,275 @@ async def nlu_continue(req: NLUContinueRequest) -> NLUResponse:
     - We do NOT overwrite service_category.
     This keeps the original symptom ("my head is paining") and original
     service category (e.g. Electrician for "fan not working").
+
+    With a `session_id` the intent and previous slots come from the session
+    store, and the merged slots are saved back to it.
+    """
+    started = time.perf_counter()
+    if req.session_id is not None:
+        state = await session_call(session_store.get, req.session_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session")
+        intent, previous_slots = state["intent"], state["slots"]
+    elif req.intent is not None:
+        # Client-supplied: only intents we serve, so that made-up ones can't
+        # run every extractor or add label values to the request metrics.
+        if req.intent not in EXTRACTION_PLAN:
+            raise HTTPException(status_code=422, detail=f"Unknown intent {req.intent!r}")
+        intent, previous_slots = req.intent, req.previous_slots or {}
+    else:
+        raise HTTPException(status_code=422, detail="Either session_id or intent is required")
+
+    result = await continue_message(
+        req.message.strip(), intent, previous_slots, req.include_slots
+    )
+    if req.session_id is not None:
+        await session_call(
+            session_store.put, req.session_id, {"intent": intent, "slots": result["slots"]}
+        )
+    metrics.observe_request("/nlu/continue", time.perf_counter() - started, (result["intent"],))
+    return to_response(result, session_id=req.session_id)
+
+
+class NLUFeedbackRequest(BaseModel):
+    message: str
+    # The intent the message should have been classified as.
+    intent: str
+
+
+# (model version, its intents) for validating feedback, see known_intents.
+_known_intents: Tuple[Optional[str], FrozenSet[str]] = (None, frozenset())
+
+
+async def known_intents() -> FrozenSet[str]:
+    """
+    Intents the active model can predict, asked from a worker once per
+    model version (process workers hold the only copy of the model).
+    """
+    global _known_intents
+    version = model_manager.active.version
+    if _known_intents[0] != version:
+        try:
+            classes = await executor.run(nlu_pipeline.model_classes)
+        except ExecutorBusyError as exc:
+            raise shed_error("/nlu/feedback", exc)
+        _known_intents = (version, frozenset(classes))
+    return _known_intents[1]
+
+
+@app.post("/nlu/feedback", status_code=202)
+async def nlu_feedback(
+    req: NLUFeedbackRequest, x_admin_token: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """
+    Record a corrected classification for online learning. Corrections are
+    buffered and applied by the next model update, not immediately.
     """
+    check_admin(x_admin_token)
     text = req.message.strip()
-    intent = req.intent
-    prev_slots = req.previous_slots or {}
+    if not text or not req.intent:
+        raise HTTPException(status_code=422, detail="message and intent are required")
+    if req.intent not in await known_intents():
+        raise HTTPException(status_code=422, detail=f"Unknown intent {req.intent!r}")
+    if not feedback_buffer.allow():
+        raise HTTPException(
+            status_code=429,
+            detail="Too many corrections",
+            headers={"Retry-After": str(feedback_buffer.retry_after())},
+        )
+    feedback_buffer.add(text, req.intent)
+    return {"buffered": len(feedback_buffer)}
 
-    new_slots = extract_slots(text, intent)
-    combined_slots = {**prev_slots}
-    for k, v in new_slots.items():
-        if v is None:
-            continue
 
-        # Don't overwrite previously captured symptom_text
-        if k == "symptom_text" and "symptom_text" in prev_slots:
-            continue
+def compact_frame(result: Dict[str, Any], turn: int, top_k: int) -> str:
+    """
+    WebSocket reply for one turn: the NLUResponse fields without empty
+    slots and null fields, as JSON without whitespace.
+    """
+    frame: Dict[str, Any] = {
+        "turn": turn,
+        "intent": result["intent"],
+        "slots": {k: v for k, v in result["slots"].items() if v is not None},
+        "missing_slots": result["missing_slots"],
+    }
+    if result.get("followup_question") is not None:
+        frame["followup_question"] = result["followup_question"]
+    if result.get("confidence") is not None:
+        frame["confidence"] = result["confidence"]
+    if top_k > 0 and result.get("top_intents"):
+        frame["top_intents"] = result["top_intents"][:top_k]
+    if result.get("model_version") is not None:
+        frame["model_version"] = result["model_version"]
+    if result.get("slot_spans"):
+        frame["slot_spans"] = result["slot_spans"]
+    if result.get("degraded"):
+        frame["degraded"] = True
+    return json.dumps(frame, separators=(",", ":"))
 
-        # Don't overwrite previously captured service_category
-        if k == "service_category" and "service_category" in prev_slots:
-            continue
 
-        combined_slots[k] = v
+def error_frame(status: int, detail: Any, retry_after: Optional[str] = None) -> str:
+    frame = {"error": detail, "status": status}
+    if retry_after is not None:
+        frame["retry_after"] = int(retry_after)
+    return json.dumps(frame, separators=(",", ":"))
 
-    missing_slots, followup_question = decide_followup(intent, combined_slots)
 
-    return NLUResponse(
-        intent=intent,
-        slots=combined_slots,
-        missing_slots=missing_slots,
-        followup_question=followup_question,
-    )
+@app.websocket("/nlu/ws")
+async def nlu_websocket(websocket: WebSocket) -> None:
+    """
+    A whole conversation over one connection. Each client frame is JSON:
+    {"message": ..., "include_slots": [...], "top_k": 0, "reset": false}.
+
+    The intent and slots stay on the server: while the previous reply still
+    had missing slots, a message is a follow-up turn (same merge rules as
+    /nlu/continue); otherwise, or with "reset": true, it is classified as a
+    new request like /nlu. Each turn gets one compact_frame() reply; errors
+    are reported as {"error": ..., "status": ...} and the connection stays
+    open.
+    """
+    await websocket.accept()
+    intent: Optional[str] = None
+    slots: Dict[str, Any] = {}
+    turn = 0
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            started = time.perf_counter()
+            try:
+                req = json.loads(raw)
+                text = str(req["message"]).strip()
+                include_slots = list(req.get("include_slots") or [])
+                top_k = int(req.get("top_k") or 0)
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_text(error_frame(422, "Expected a JSON object with a message"))
+                continue
+
+            if req.get("reset"):
+                intent = None
+            try:
+                if intent is None:
+                    result = await classify_message(text, include_slots)
+                else:
+                    result = await continue_message(text, intent, slots, include_slots)
+            except HTTPException as exc:
+                retry_after = (exc.headers or {}).get("Retry-After")
+                await websocket.send_text(error_frame(exc.status_code, exc.detail, retry_after))
+                continue
+
+            turn += 1
+            intent = result["intent"] if result["missing_slots"] else None
+            slots = result["slots"]
+            metrics.observe_request("/nlu/ws", time.perf_counter() - started, (result["intent"],))
+            await websocket.send_text(compact_frame(result, turn, top_k))
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    """
+    Liveness: the process is up and serving HTTP.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """
+    Readiness: 200 once startup warm-up has finished, 503 before.
+    """
+    status_code = 200 if startup_profile["ready"] else 503
+    return JSONResponse(status_code=status_code, content=startup_profile)
+
+
+@app.get("/nlu/stats")
+async def nlu_stats() -> Dict[str, Any]:
+    """
+    Runtime counters for tuning the serving path.
+    """
+    return {
+        "startup": startup_profile,
+        "executor": executor.stats(),
+        "batcher": batcher.stats() if batcher is not None else None,
+        "cache": response_cache.stats() if response_cache is not None else None,
+        "sessions": await session_call(session_store.stats),
+        "model": model_manager.stats(),
+        "feedback": online_learner.stats(),
+        "admission": admission.stats(),
+        "cascade": {
+            "enabled": CASCADE_ENABLED,
+            "training": read_cascade_meta(model_manager.active.path),
+            "runtime": metrics.cascade_stats(),
+        },
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """
+    Request latency, per-stage latency histograms and per-intent counters in
+    the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+class ModelReloadRequest(BaseModel):
+    # Artifact to load, inside NLU_MODEL_DIR (default: reload the active
+    # model's path, e.g. after retraining in place).
+    path: Optional[str] = None
+
+
+def check_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN or not secrets.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.get("/admin/model")
+async def admin_model(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    check_admin(x_admin_token)
+    return model_manager.stats()
+
+
+@app.post("/admin/model/reload")
+async def admin_model_reload(
+    req: ModelReloadRequest, x_admin_token: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """
+    Load, warm and atomically swap in a model artifact. Requests keep being
+    served by the current model meanwhile; on failure it stays active.
+    """
+    check_admin(x_admin_token)
+    path = req.path
+    if path is not None:
+        model_dir = os.path.realpath(MODEL_DIR)
+        if os.path.commonpath([os.path.realpath(path), model_dir]) != model_dir:
+            raise HTTPException(status_code=400, detail=f"Model path must be inside {MODEL_DIR}")
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"No model artifact at {path}")
+    try:
+        await model_manager.reload(path)
+    except ModelReloadError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return model_manager.stats()
+
+
+@app.post("/admin/model/rollback")
+async def admin_model_rollback(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Swap the previously active model back in.
+    """
+    check_admin(x_admin_token)
+    try:
+        await model_manager.rollback()
+    except ModelReloadError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return model_manager.stats()
+
+
+@app.post("/admin/model/learn")
+async def admin_model_learn(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Run an online learning update on the buffered feedback now.
+    """
+    check_admin(x_admin_token)
+    return await online_learner.update()
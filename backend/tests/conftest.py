@@ -0,0 +1,41 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The backend modules are flat top-level modules run from backend/.
+sys.path.insert(0, BACKEND)
+
+# Read at import time by server.py / nlu_datetime.py. Warm-up is off unless a
+# test turns it on.
+os.environ.setdefault("NLU_MODEL_PATH", os.path.join(BACKEND, "models", "intent_model.joblib"))
+os.environ.setdefault("NLU_DATEPARSER_LANGUAGES", "en")
+os.environ.setdefault("NLU_WARMUP", "0")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def serve():
+    """
+    serve() runs the app's lifespan (model load, executor, warm-up) and
+    yields an httpx client talking to it in-process.
+    """
+    import httpx
+
+    import server
+
+    @asynccontextmanager
+    async def serve():
+        async with server.lifespan(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://nlu") as client:
+                yield client
+
+    return serve
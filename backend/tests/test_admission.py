@@ -0,0 +1,138 @@
+import time
+
+import anyio
+import pytest
+
+import nlu_datetime
+import nlu_pipeline
+from nlu_admission import (
+    AdmissionController,
+    Deadline,
+    DeadlineExceededError,
+    OverloadedError,
+    check_deadline,
+    is_degraded,
+)
+
+
+def deadline_waited(seconds, degrade_after=0.25, shed_after=2.0):
+    return Deadline(time.monotonic() - seconds, degrade_after, shed_after)
+
+
+def test_deadline_checks():
+    assert check_deadline(None) is None
+    assert check_deadline(deadline_waited(0.1)) == pytest.approx(0.1, abs=0.05)
+    with pytest.raises(DeadlineExceededError) as exc:
+        check_deadline(deadline_waited(3.0))
+    assert exc.value.queue_seconds >= 3.0
+    # 0 disables shedding.
+    assert check_deadline(deadline_waited(3.0, shed_after=0)) >= 3.0
+
+
+def test_is_degraded():
+    assert not is_degraded(None, None)
+    assert not is_degraded(deadline_waited(0.1), 0.1)
+    assert is_degraded(deadline_waited(0.3), 0.3)
+    assert not is_degraded(deadline_waited(0.3, degrade_after=0), 0.3)
+
+
+def test_admission_sheds_on_estimated_backlog():
+    admission = AdmissionController(250, 1000, concurrency=2, initial_job_ms=10)
+    # 10 ms per job on 2 workers: 100 queued jobs are 500 ms of waiting.
+    assert admission.estimated_wait(100) == pytest.approx(0.5)
+    admission.admit(100)
+    with pytest.raises(OverloadedError):
+        admission.admit(200)
+    assert admission.retry_after(200) == 1
+    assert admission.admitted_total == 1
+
+
+def test_first_observed_job_replaces_the_seed():
+    admission = AdmissionController(250, 1000, initial_job_ms=10, smoothing=0.5)
+    admission.observe_job(0.1)
+    assert admission.job_seconds == pytest.approx(0.1)
+    admission.observe_job(0.3, degraded=2)
+    assert admission.job_seconds == pytest.approx(0.2)
+    assert admission.stats()["degraded_total"] == 2
+
+
+def test_nothing_is_shed_or_degraded_before_ready():
+    admission = AdmissionController(250, 1000, initial_job_ms=1000)
+    with pytest.raises(OverloadedError):
+        admission.admit(10)
+    deadline = admission.admit(10, enforce=False)
+    assert (deadline.degrade_after, deadline.shed_after) == (0, 0)
+
+
+class StubCascade:
+    """
+    Answers every text with one intent and records the escalate flag of
+    each classifier call.
+    """
+
+    classes = ["book_cab", "smalltalk_or_other"]
+
+    def __init__(self, intent="book_cab"):
+        self.intent = intent
+        self.calls = []
+
+    def predict_top_ks_staged(self, texts, k, escalate=True):
+        self.calls.append((len(texts), escalate))
+        stage = "full" if escalate else "linear"
+        return [[(self.intent, 0.9), ("smalltalk_or_other", 0.1)] for _ in texts], [stage] * len(texts)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    model = StubCascade()
+    monkeypatch.setattr(nlu_pipeline, "_active", (model, "stub"))
+    monkeypatch.setattr(nlu_datetime, "_cache", nlu_datetime._DatetimeCache(64))
+    return model
+
+
+def test_batch_with_mixed_deadlines_is_split_by_degraded_flag(stub_model):
+    texts = ["book a cab to btm", "cab to hsr", "cab to koramangala", "cab to indiranagar"]
+    deadlines = [None, deadline_waited(0.5), deadline_waited(3.0), deadline_waited(0.0)]
+    results = nlu_pipeline.run_nlu_batch(texts, None, deadlines)
+
+    assert sorted(stub_model.calls) == [(1, False), (2, True)]
+    assert [r["degraded"] for r in (results[0], results[1], results[3])] == [False, True, False]
+    assert isinstance(results[2], DeadlineExceededError)
+
+
+def test_degraded_pipeline_skips_dateparser(stub_model, monkeypatch):
+    calls = []
+
+    def dateparser_parse(text, now):
+        calls.append(text)
+        return nlu_datetime.DatetimeResult(None, None, now)
+
+    monkeypatch.setattr(nlu_datetime, "_dateparser_parse", dateparser_parse)
+    degraded = nlu_pipeline.run_nlu("cab on the 3rd", (), deadline_waited(0.5))
+    assert degraded["degraded"] and calls == []
+    full = nlu_pipeline.run_nlu("cab on the 3rd", (), deadline_waited(0.0))
+    assert not full["degraded"] and calls == ["cab on the 3rd"]
+
+
+@pytest.mark.anyio
+async def test_request_during_warm_up_is_not_shed(serve, monkeypatch):
+    import server
+
+    def slow_warm_up():
+        time.sleep(0.5)
+        return 0.5
+
+    # Every worker is busy warming up for longer than the shed deadline.
+    monkeypatch.setattr(server, "WARMUP", True)
+    monkeypatch.setattr(nlu_pipeline, "warm_up", slow_warm_up)
+    monkeypatch.setitem(server.startup_profile, "ready", False)
+    monkeypatch.setattr(
+        server, "admission", AdmissionController(50, 100, server.executor.concurrency)
+    )
+    async with serve() as client:
+        await anyio.sleep(0.05)
+        assert (await client.get("/ready")).status_code == 503
+        resp = await client.post("/nlu", json={"message": "book me a cab to the airport"})
+        assert resp.status_code == 200
+        assert resp.json()["intent"] == "book_cab"
+        assert server.admission.stats()["shed_total"] == {}
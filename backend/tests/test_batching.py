@@ -0,0 +1,112 @@
+import asyncio
+
+import anyio
+import pytest
+
+from nlu_batching import MicroBatcher, QueueFullError
+
+pytestmark = pytest.mark.anyio
+
+
+class Recorder:
+    """
+    batch_fn doubling every payload. It records the batch sizes and, while
+    `gate` is set, waits for it before answering.
+    """
+
+    def __init__(self, gate=None):
+        self.sizes = []
+        self.gate = gate
+
+    async def __call__(self, payloads):
+        self.sizes.append(len(payloads))
+        if self.gate is not None:
+            await self.gate.wait()
+        return [payload * 2 for payload in payloads]
+
+
+async def test_concurrent_submits_share_a_batch():
+    batch_fn = Recorder()
+    batcher = MicroBatcher(batch_fn, window_ms=50, max_batch_size=4)
+    await batcher.start()
+    try:
+        with anyio.fail_after(2):
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+    finally:
+        await batcher.stop()
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert batch_fn.sizes == [4, 2]
+    assert batcher.stats()["items_total"] == 6
+
+
+async def test_batch_fn_error_reaches_every_caller():
+    async def failing(payloads):
+        raise ValueError("model exploded")
+
+    batcher = MicroBatcher(failing, window_ms=20)
+    await batcher.start()
+    try:
+        with anyio.fail_after(2):
+            results = await asyncio.gather(
+                *[batcher.submit(i) for i in range(3)], return_exceptions=True
+            )
+    finally:
+        await batcher.stop()
+    assert [type(r) for r in results] == [ValueError] * 3
+
+
+async def fill(batcher):
+    """
+    With one batch of one running, the next item is held by the collector
+    waiting for a slot and the queue fills up behind it.
+    """
+    tasks = []
+    for i in range(4):
+        tasks.append(asyncio.create_task(batcher.submit(i)))
+        await asyncio.sleep(0.01)
+    assert batcher.queue_depth == 2
+    return tasks
+
+
+async def test_submit_beyond_queue_size_is_rejected():
+    gate = asyncio.Event()
+    batcher = MicroBatcher(Recorder(gate), window_ms=0, max_batch_size=1, max_queue_size=2)
+    await batcher.start()
+    tasks = await fill(batcher)
+    with pytest.raises(QueueFullError):
+        await batcher.submit(99)
+    assert batcher.stats()["rejected_total"] == 1
+    gate.set()
+    with anyio.fail_after(2):
+        assert await asyncio.gather(*tasks) == [0, 2, 4, 6]
+    await batcher.stop()
+
+
+async def test_stop_fails_every_undispatched_item():
+    gate = asyncio.Event()
+    batcher = MicroBatcher(Recorder(gate), window_ms=0, max_batch_size=1, max_queue_size=2)
+    await batcher.start()
+    tasks = await fill(batcher)
+    stopping = asyncio.create_task(batcher.stop())
+    await asyncio.sleep(0.01)
+    gate.set()
+    with anyio.fail_after(2):
+        await stopping
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    # The running batch finishes; the one waiting for a slot and the queued
+    # ones are failed.
+    assert results[0] == 0
+    assert all(isinstance(r, RuntimeError) for r in results[1:])
+    with pytest.raises(RuntimeError):
+        await batcher.submit(5)
+
+
+async def test_stop_while_collecting_fails_the_partial_batch():
+    batcher = MicroBatcher(Recorder(), window_ms=10_000, max_batch_size=10)
+    await batcher.start()
+    task = asyncio.create_task(batcher.submit(1))
+    await asyncio.sleep(0.01)
+    with anyio.fail_after(2):
+        await batcher.stop()
+        with pytest.raises(RuntimeError):
+            await task
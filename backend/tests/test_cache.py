@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import nlu_cache
+from nlu_cache import ResponseCache, normalize_message
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable stand-in for time.time() as seen by the cache."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(nlu_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_normalize_message():
+    assert normalize_message("  book   a cab \n") == "book a cab"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(maxsize=10, ttl_seconds=60)
+    cache.put("a", 1)
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+
+def test_valid_until_shortens_the_ttl(clock):
+    cache = ResponseCache(maxsize=10, ttl_seconds=60)
+    cache.put("relative", 1, valid_until=clock.now + 10)
+    cache.put("later", 2, valid_until=clock.now + 600)
+    cache.put("stale", 3, valid_until=clock.now)
+    assert cache.get("stale") is None
+    clock.now += 10
+    assert cache.get("relative") is None
+    assert cache.get("later") == 2
+    clock.now += 50
+    assert cache.get("later") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_callers_share_one_computation(clock):
+    cache = ResponseCache(maxsize=10, ttl_seconds=60)
+    calls = []
+    release = asyncio.Event()
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return {"intent": "book_cab"}, None
+
+    callers = [asyncio.ensure_future(cache.get_or_compute("k", compute)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers)
+    assert results == [{"intent": "book_cab"}] * 3
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 2
+    assert await cache.get_or_compute("k", compute) == {"intent": "book_cab"}
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_leader_error_reaches_every_waiter_and_clears_the_key(clock):
+    cache = ResponseCache(maxsize=10, ttl_seconds=60)
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("pipeline failed")
+
+    callers = [asyncio.ensure_future(cache.get_or_compute("k", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert [type(r) for r in results] == [ValueError] * 3
+    assert cache.stats()["inflight"] == 0 and len(cache) == 0
+
+    async def compute():
+        return "ok", None
+
+    # Nothing was cached and the key is free for a new computation.
+    assert await cache.get_or_compute("k", compute) == "ok"
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from intent_model import CascadeIntentModel, FastPathModel
+from utterance import Utterance
+
+CLASSES = ["book_cab", "order_grocery"]
+
+
+class RecordingModel:
+    """Full model stand-in: always 80% groceries, records what it classifies."""
+
+    classes = CLASSES
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba_batch(self, texts):
+        self.calls.append([getattr(t, "text", t) for t in texts])
+        return np.tile([0.2, 0.8], (len(texts), 1))
+
+
+@pytest.fixture
+def fast():
+    return FastPathModel(
+        utterances=["hi there"],
+        exact_proba=np.array([[0.9, 0.1]]),
+        terms=["cab", "milk"],
+        coef=np.array([[5.0, -5.0], [-5.0, 5.0]]),
+        intercept=np.zeros(2),
+        classes=CLASSES,
+        threshold=0.9,
+        meta={},
+    )
+
+
+@pytest.fixture
+def cascade(fast):
+    return CascadeIntentModel(fast, RecordingModel())
+
+
+def test_each_stage_answers_its_messages(cascade):
+    texts = ["Hi  there", "book cab", "hello world", "buy milk", "something else"]
+    top, stages = cascade.predict_top_ks_staged(texts, 1)
+    assert stages == ["exact", "linear", "full", "linear", "full"]
+    assert [ranked[0][0] for ranked in top] == [
+        "book_cab", "book_cab", "order_grocery", "order_grocery", "order_grocery",
+    ]
+    assert top[0][0][1] == pytest.approx(0.9)
+    # Only the undecided messages reach the full model, in one batch.
+    assert cascade.full.calls == [["hello world", "something else"]]
+
+
+def test_utterances_are_routed_like_strings(cascade):
+    texts = ["hi there", "book cab", "hello world"]
+    _, stages = cascade.predict_top_ks_staged([Utterance(t) for t in texts], 1)
+    assert stages == ["exact", "linear", "full"]
+
+
+def test_no_escalation_keeps_the_linear_guess(cascade):
+    proba, stages = cascade.predict_proba_staged(["hello world", "book cab"], escalate=False)
+    assert stages == ["linear", "linear"]
+    assert proba[0] == pytest.approx([0.5, 0.5])
+    assert cascade.full.calls == []
+
+
+def test_fast_path_round_trips(fast, tmp_path):
+    fast.save(tmp_path / "cascade.npz")
+    loaded = FastPathModel.load(tmp_path / "cascade.npz")
+    texts = ["hi there", "book cab", "hello world"]
+    expected, expected_stages = fast.predict_proba_batch(texts)
+    proba, stages = loaded.predict_proba_batch(texts)
+    assert stages == expected_stages
+    assert np.allclose(proba, expected)
+
+
+def test_classes_must_match(fast):
+    full = RecordingModel()
+    full.classes = list(reversed(CLASSES))
+    with pytest.raises(ValueError):
+        CascadeIntentModel(fast, full)
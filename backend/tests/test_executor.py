@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+import nlu_pipeline
+from nlu_executor import ExecutorBusyError, NLUExecutor
+from tests.conftest import BACKEND
+
+pytestmark = pytest.mark.anyio
+
+
+async def run(executor, fn, *args):
+    executor.start()
+    try:
+        return await executor.run(fn, *args)
+    finally:
+        executor.shutdown()
+
+
+async def test_inline_runs_on_the_event_loop_thread():
+    executor = NLUExecutor("inline")
+    assert await run(executor, threading.get_ident) == threading.get_ident()
+    assert executor.concurrency == 1 and executor.stats()["completed_total"] == 1
+
+
+async def test_thread_mode_runs_off_the_event_loop():
+    executor = NLUExecutor("thread", max_workers=2)
+    assert await run(executor, threading.get_ident) != threading.get_ident()
+    assert executor.concurrency == 2
+
+
+async def test_process_workers_load_the_model():
+    executor = NLUExecutor(
+        "process", max_workers=1, model_path=f"{BACKEND}/models/intent_model.npz", model_version="v1"
+    )
+    executor.start()
+    try:
+        assert await executor.run(os.getpid) != os.getpid()
+        result = await executor.run(nlu_pipeline.run_nlu, "book me a cab from btm to hsr")
+    finally:
+        executor.shutdown()
+    assert (result["intent"], result["model_version"]) == ("book_cab", "v1")
+
+
+async def test_pending_jobs_are_bounded():
+    executor = NLUExecutor("thread", max_workers=1, max_pending=2)
+    executor.start()
+    release = threading.Event()
+    try:
+        jobs = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert executor.pending == 2 and executor.backlog == 1
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(release.wait)
+        release.set()
+        assert await asyncio.gather(*jobs) == [True, True]
+    finally:
+        release.set()
+        executor.shutdown()
+    stats = executor.stats()
+    assert (stats["completed_total"], stats["rejected_total"], stats["pending"]) == (2, 1, 0)
+
+
+async def test_failures_are_counted_and_raised():
+    executor = NLUExecutor("thread")
+    with pytest.raises(ZeroDivisionError):
+        await run(executor, divmod, 1, 0)
+    assert executor.stats()["failed_total"] == 1 and executor.pending == 0
+
+
+def test_configuration_is_checked():
+    with pytest.raises(ValueError):
+        NLUExecutor("fibers")
+    with pytest.raises(ValueError):
+        NLUExecutor("process")
@@ -0,0 +1,53 @@
+import pytest
+
+import nlu_datetime
+import nlu_utils
+from nlu_utils import EXTRACTION_PLAN, EXTRACTOR_SLOTS, SLOT_NAMES, extract_slots
+
+
+@pytest.fixture
+def ran(monkeypatch):
+    """Names of the extractors run, in order; they still extract."""
+    ran = []
+    for name, extractor in list(nlu_utils._EXTRACTORS.items()):
+        def recording(utterance, name=name, extractor=extractor):
+            ran.append(name)
+            return extractor(utterance)
+
+        monkeypatch.setitem(nlu_utils._EXTRACTORS, name, recording)
+    monkeypatch.setattr(nlu_datetime, "_cache", nlu_datetime._DatetimeCache(64))
+    return ran
+
+
+@pytest.mark.parametrize("intent", sorted(EXTRACTION_PLAN))
+def test_only_the_intents_extractors_run(ran, intent):
+    slots = extract_slots("order 2 kg rice from btm to hsr tomorrow at 5 pm", intent)
+    assert ran == list(EXTRACTION_PLAN[intent])
+    assert list(slots) == list(SLOT_NAMES)
+    planned = {slot for name in EXTRACTION_PLAN[intent] for slot in EXTRACTOR_SLOTS[name]}
+    for slot in set(SLOT_NAMES) - planned - {"symptom_text"}:
+        assert slots[slot] is None, slot
+
+
+def test_plan_decides_what_is_extracted(ran):
+    text = "order 2 kg rice from btm to hsr tomorrow at 5 pm"
+    grocery = extract_slots(text, "order_grocery")
+    assert (grocery["quantity_value"], grocery["origin"], grocery["datetime_iso"]) == (2, None, None)
+    cab = extract_slots(text, "book_cab")
+    assert (cab["quantity_value"], cab["origin"]) == (None, "BTM Layout")
+    assert cab["datetime_text"] == "tomorrow at 5 pm"
+
+
+def test_include_slots_adds_extractors(ran):
+    timings = {}
+    slots = extract_slots(
+        "2 kg rice to hsr", "smalltalk_or_other", ["destination", "quantity_unit", "bogus"], timings
+    )
+    assert ran == ["from_to", "quantity"]
+    assert (slots["destination"], slots["quantity_unit"]) == ("HSR Layout", "kg")
+    assert set(timings) == {"keywords", "extract_from_to", "extract_quantity"}
+
+
+def test_unknown_intents_run_every_extractor(ran):
+    extract_slots("book a cab", "not_an_intent")
+    assert sorted(ran) == sorted(EXTRACTOR_SLOTS)
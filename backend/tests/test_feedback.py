@@ -0,0 +1,101 @@
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+import nlu_feedback
+import nlu_pipeline
+from nlu_executor import NLUExecutor
+from nlu_feedback import FeedbackBuffer, OnlineLearner
+from nlu_model_manager import ModelManager
+from tests.conftest import BACKEND
+
+HOLDOUT = [
+    ("book me a cab to the airport", "book_cab"),
+    ("i need a taxi from btm to hsr", "book_cab"),
+    ("order 2 packets of milk", "order_grocery"),
+    ("my tap is leaking", "home_service"),
+    ("i have fever and headache", "health_symptom"),
+    ("find me a room in sehore", "housing_search"),
+]
+
+
+def test_token_bucket_limits_the_rate(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(nlu_feedback, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    buffer = FeedbackBuffer(rate_per_second=2, burst=3)
+    assert [buffer.allow() for _ in range(4)] == [True, True, True, False]
+    assert buffer.retry_after() == 1
+    clock.now += 0.5
+    assert buffer.allow() and not buffer.allow()
+    clock.now += 60
+    assert sum(buffer.allow() for _ in range(10)) == 3
+    assert buffer.stats()["rate_limited_total"] == 1 + 1 + 7
+    assert all(FeedbackBuffer(rate_per_second=0).allow() for _ in range(100))
+
+
+def test_buffer_drops_the_oldest_corrections():
+    buffer = FeedbackBuffer(maxsize=2)
+    for i in range(3):
+        buffer.add(f"message {i}", "book_cab")
+    assert buffer.drain() == [("message 1", "book_cab"), ("message 2", "book_cab")]
+    assert buffer.stats()["dropped_total"] == 1
+
+
+@pytest.fixture
+def learner(tmp_path, monkeypatch):
+    shutil.copy(f"{BACKEND}/models/intent_model.joblib", tmp_path / "base.joblib")
+    monkeypatch.setattr(nlu_pipeline, "_active", None)
+    manager = ModelManager(NLUExecutor("inline"), str(tmp_path / "base.joblib"))
+    manager.load_initial()
+    learner = OnlineLearner(FeedbackBuffer(), manager, str(tmp_path / "online"), epochs=3)
+    learner._replay, learner._holdout = HOLDOUT * 5, HOLDOUT
+    return learner
+
+
+def test_update_that_hurts_the_holdout_is_rejected(learner):
+    learner.max_accuracy_drop, learner.replay_ratio, learner.epochs = 0.0, 0.0, 30
+    # Cab requests relabelled as groceries, without replay to hold them back.
+    for text, _ in HOLDOUT[:2] * 30:
+        learner.buffer.add(text, "order_grocery")
+    learner.buffer.add("hello", "no_such_intent")
+    report = learner._fine_tune(learner.model_manager.active.path, learner.buffer.drain())
+    assert report["outcome"] == "rejected", report
+    assert report["reason"] == "holdout accuracy dropped"
+    assert report["unknown_intents"] == 1
+    assert not os.path.exists(learner.output_dir)
+
+
+@pytest.mark.anyio
+async def test_accepted_update_is_published(learner):
+    base = learner.model_manager.active
+    for text, intent in HOLDOUT * 4:
+        learner.buffer.add(text, intent)
+    report = await learner.update()
+    assert report["outcome"] == "published", report
+    active = learner.model_manager.active
+    assert active.version == report["model_version"] != base.version
+    assert os.path.dirname(active.path) == learner.output_dir
+    assert nlu_pipeline.get_active()[1] == active.version
+    assert learner.stats()["published_total"] == 1 and len(learner.buffer) == 0
+
+
+@pytest.mark.anyio
+async def test_feedback_endpoint_rejects_unknown_intents(serve, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(server, "feedback_buffer", FeedbackBuffer())
+    headers = {"X-Admin-Token": "secret"}
+    async with serve() as client:
+        resp = await client.post(
+            "/nlu/feedback", json={"message": "book a cab", "intent": "order_pizza"}, headers=headers
+        )
+        assert resp.status_code == 422
+        resp = await client.post(
+            "/nlu/feedback", json={"message": "book a cab", "intent": "book_cab"}, headers=headers
+        )
+        assert resp.status_code == 202 and resp.json() == {"buffered": 1}
+        resp = await client.post("/nlu/feedback", json={"message": "book a cab", "intent": "book_cab"})
+        assert resp.status_code == 403
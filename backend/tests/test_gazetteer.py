@@ -0,0 +1,77 @@
+import pytest
+
+from gazetteer import Gazetteer, GazetteerMatch
+
+
+@pytest.fixture
+def gazetteer():
+    gazetteer = Gazetteer()
+    gazetteer.add("Indiranagar", ["Indira Nagar"])
+    gazetteer.add("Koramangala")
+    gazetteer.add("BTM Layout", ["btm"])
+    gazetteer.add("HSR Layout", ["hsr"])
+    gazetteer.add("Electronic City")
+    return gazetteer.build()
+
+
+def test_exact_and_alias_matches(gazetteer):
+    text = "cab from btm to indira nagar"
+    assert gazetteer.find(text) == [
+        GazetteerMatch(9, 12, "BTM Layout", 0),
+        GazetteerMatch(16, 28, "Indiranagar", 0),
+    ]
+
+
+def test_fuzzy_matches_within_budget(gazetteer):
+    # Long tokens allow two edits, mid-length ones one.
+    assert [(m.name, m.edits) for m in gazetteer.find("to koramangla please")] == [("Koramangala", 1)]
+    assert [(m.name, m.edits) for m in gazetteer.find("to indranagar")] == [("Indiranagar", 1)]
+    assert gazetteer.find("to kormngla") == []
+
+
+def test_short_tokens_must_match_exactly(gazetteer):
+    assert gazetteer.find("from hsr") == [GazetteerMatch(5, 8, "HSR Layout", 0)]
+    assert gazetteer.find("from hrs") == []
+
+
+def test_longest_name_wins(gazetteer):
+    assert [m.name for m in gazetteer.find("electronic city to hsr layout")] == [
+        "Electronic City",
+        "HSR Layout",
+    ]
+
+
+def test_from_file(tmp_path):
+    path = tmp_path / "localities.txt"
+    path.write_text("# places\nIndiranagar|Indira Nagar\n\nKoramangala\n", encoding="utf-8")
+    gazetteer = Gazetteer.from_file(str(path))
+    assert len(gazetteer) == 3  # surface forms, aliases included
+    assert [m.name for m in gazetteer.find("indira nagar")] == ["Indiranagar"]
+
+
+def test_requires_build():
+    gazetteer = Gazetteer()
+    gazetteer.add("Koramangala")
+    with pytest.raises(RuntimeError):
+        gazetteer.find("koramangala")
+
+
+def place_slots(text, intent):
+    import nlu_utils
+
+    slots = nlu_utils.extract_slots(text, intent, include_slots=["origin", "destination", "location"])
+    return slots["origin"], slots["destination"], slots["location"]
+
+
+def test_a_spot_in_a_known_place_is_kept_as_written():
+    assert place_slots("book a cab from sehore bus stand to bhopal", "book_cab")[:2] == (
+        "sehore bus stand",
+        "Bhopal",
+    )
+    assert place_slots("find me a room near Sehore bus stand", "housing_search")[2] == "Sehore bus stand"
+    assert place_slots("find me a room in sehore for 2 days", "housing_search")[2] == "Sehore"
+
+
+def test_short_words_are_not_fuzzy_matched_to_places():
+    assert place_slots("book a cab to the begum", "book_cab")[1] is None
+    assert place_slots("cab from btm to koramangla", "book_cab")[:2] == ("BTM Layout", "Koramangala")
@@ -0,0 +1,116 @@
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+
+from intent_model import HashedVocabulary, IntentModel, NumpyIntentModel
+from train_intent_model import PARITY_PROBES, build_training_data
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    df = build_training_data()
+    pipeline = Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(lowercase=True, ngram_range=(1, 2), min_df=1)),
+            ("mlp", MLPClassifier(hidden_layer_sizes=(32,), max_iter=400, random_state=42)),
+        ]
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        return pipeline.fit(df["text"].tolist(), df["intent"].tolist())
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return build_training_data()["text"].tolist() + PARITY_PROBES
+
+
+@pytest.fixture(scope="module", params=["npz", "mmap"])
+def numpy_model(request, pipeline, tmp_path_factory):
+    model = NumpyIntentModel.from_pipeline(pipeline)
+    path = tmp_path_factory.mktemp("model")
+    if request.param == "npz":
+        model.save(path / "intent_model.npz")
+        return NumpyIntentModel.load(str(path / "intent_model.npz"))
+    model.save_mmap(path / "intent_model_mmap")
+    return NumpyIntentModel.load_mmap(str(path / "intent_model_mmap"))
+
+
+def test_numpy_model_predicts_like_pipeline(pipeline, numpy_model, texts):
+    assert numpy_model.predict_intents(texts) == [str(p) for p in pipeline.predict(texts)]
+    assert list(numpy_model.classes) == [str(c) for c in pipeline.classes_]
+
+
+def test_numpy_model_probabilities_match_pipeline(pipeline, numpy_model, texts):
+    expected = pipeline.predict_proba(texts)
+    np.testing.assert_allclose(numpy_model.predict_proba_batch(texts), expected, atol=1e-9)
+
+
+def test_numpy_model_single_text_matches_batch(numpy_model, texts):
+    batch = numpy_model.predict_intents(texts)
+    assert [numpy_model.predict_intent(text) for text in texts] == batch
+
+
+@pytest.fixture(params=["joblib", "numpy"])
+def counted_model(request, pipeline, numpy_model, monkeypatch):
+    """
+    Both model kinds, counting calls to their batch probability pass.
+    """
+    model = IntentModel(pipeline) if request.param == "joblib" else numpy_model
+    calls = []
+    forward = model.predict_proba_batch
+
+    def counted(texts):
+        calls.append(len(texts))
+        return forward(texts)
+
+    monkeypatch.setattr(model, "predict_proba_batch", counted)
+    model.calls = calls
+    return model
+
+
+def test_top_k_comes_from_one_forward_pass(counted_model, texts):
+    top = counted_model.predict_top_ks(texts, 3)
+    assert counted_model.calls == [len(texts)]
+
+    for ranked in top:
+        assert len(ranked) == 3
+        assert [p for _, p in ranked] == sorted((p for _, p in ranked), reverse=True)
+    # The best guess is the classifier's prediction.
+    assert [ranked[0][0] for ranked in top] == counted_model.predict_intents(texts)
+    counted_model.calls.clear()
+    single = counted_model.predict_top_k(texts[0], 2)
+    assert [name for name, _ in single] == [name for name, _ in top[0][:2]]
+    assert [p for _, p in single] == pytest.approx([p for _, p in top[0][:2]])
+    assert counted_model.calls == [1]
+
+
+def test_hashed_vocabulary_round_trips_terms():
+    terms = ["order", "fanta", "cab", "book me", "café", ""]
+    arrays = HashedVocabulary.build(terms)
+    vocab = HashedVocabulary(
+        arrays["vocab_table"], arrays["vocab_hashes"], arrays["vocab_blob"], arrays["vocab_offsets"]
+    )
+    assert len(vocab) == len(terms)
+    assert list(vocab) == terms
+    for idx, term in enumerate(terms):
+        assert vocab.get(term) == idx
+        assert vocab.term(idx) == term
+    assert vocab.get("taxi") is None
+    assert vocab.get("Order") is None
+
+
+def test_hashed_vocabulary_handles_collisions():
+    # Enough terms that linear probing has to walk past occupied slots.
+    terms = [f"term{i}" for i in range(5000)]
+    arrays = HashedVocabulary.build(terms)
+    vocab = HashedVocabulary(
+        arrays["vocab_table"], arrays["vocab_hashes"], arrays["vocab_blob"], arrays["vocab_offsets"]
+    )
+    assert all(vocab.get(t) == i for i, t in enumerate(terms))
+    assert vocab.get("term5000") is None
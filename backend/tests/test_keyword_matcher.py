@@ -0,0 +1,49 @@
+import pytest
+
+from keyword_matcher import KeywordMatcher
+
+
+def make_matcher(keywords):
+    matcher = KeywordMatcher()
+    for keyword, tag in keywords:
+        matcher.add(keyword, tag)
+    return matcher.build()
+
+
+def test_find_has_substring_semantics():
+    keywords = [("cab", "cab"), ("taxi", "cab"), ("plumber", "service"), ("fever", "symptom")]
+    matcher = make_matcher(keywords)
+    for text in ["book a cab", "i need a taxi and a plumber", "scabs", "nothing here", ""]:
+        expected = {tag for kw, tag in keywords if kw in text}
+        assert matcher.find(text) == expected
+
+
+def test_overlapping_and_nested_keywords():
+    matcher = make_matcher([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert matcher.find("ushers") == {1, 2, 4}
+    assert sorted(matcher.finditer("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_is_case_sensitive():
+    matcher = make_matcher([("fanta", "drink")])
+    assert matcher.find("order FANTA") == frozenset()
+    assert matcher.find("order fanta") == {"drink"}
+
+
+def test_requires_build_and_rejects_late_adds():
+    matcher = KeywordMatcher()
+    matcher.add("cab", "cab")
+    with pytest.raises(RuntimeError):
+        matcher.find("cab")
+    matcher.build()
+    with pytest.raises(RuntimeError):
+        matcher.add("taxi", "cab")
+
+
+def test_memo_only_grows_with_the_keyword_alphabet():
+    matcher = make_matcher([("cab", "cab"), ("taxi", "cab")])
+    assert matcher.find("".join(chr(c) for c in range(0x4E00, 0x5E00))) == frozenset()
+    assert matcher.find("céab, ta’xi") == frozenset()
+    assert matcher.find("écab") == {"cab"}
+    memoized = {ch for edges in matcher._delta for ch in edges}
+    assert memoized <= set("cabtxi")
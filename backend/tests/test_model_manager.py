@@ -0,0 +1,79 @@
+import shutil
+
+import pytest
+
+import nlu_pipeline
+from nlu_executor import NLUExecutor
+from nlu_model_manager import ModelManager, ModelReloadError
+from tests.conftest import BACKEND
+
+pytestmark = pytest.mark.anyio
+
+MODELS = f"{BACKEND}/models"
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    """Two different models in a model directory, and a broken one."""
+    shutil.copy(f"{MODELS}/intent_model.joblib", tmp_path / "a.joblib")
+    shutil.copy(f"{MODELS}/intent_model.npz", tmp_path / "b.npz")
+    (tmp_path / "broken.joblib").write_bytes(b"not a model")
+    # The manager installs models globally: put the active one back afterwards.
+    monkeypatch.setattr(nlu_pipeline, "_active", None)
+    return tmp_path
+
+
+@pytest.fixture
+def manager(artifacts):
+    swaps = []
+    manager = ModelManager(NLUExecutor("inline"), str(artifacts / "a.joblib"), on_swap=swaps.append)
+    manager.swaps = swaps
+    manager.load_initial()
+    return manager
+
+
+def classify(text):
+    model, version = nlu_pipeline.get_active()
+    return model.predict_top_k(text, 1)[0][0], version
+
+
+async def test_reload_swaps_the_active_model(manager, artifacts):
+    first = manager.active
+    info = await manager.reload(str(artifacts / "b.npz"))
+    assert info.version != first.version
+    assert manager.previous == first
+    assert classify("book me a cab to the airport") == ("book_cab", info.version)
+    assert manager.swaps == [info]
+    # Reloading an unchanged artifact is a no-op.
+    assert await manager.reload() == info
+    assert manager.stats()["reloads_total"] == 1
+
+
+async def test_rollback_returns_to_the_previous_model(manager, artifacts):
+    first = manager.active
+    second = await manager.reload(str(artifacts / "b.npz"))
+    restored = await manager.rollback()
+    assert restored.version == first.version
+    assert nlu_pipeline.get_active()[1] == first.version
+    # Rolling back again returns to the newer one.
+    assert (await manager.rollback()).version == second.version
+    assert manager.stats()["rollbacks_total"] == 2
+
+
+async def test_failed_reload_keeps_the_old_model(manager, artifacts):
+    first = manager.active
+    with pytest.raises(ModelReloadError):
+        await manager.reload(str(artifacts / "broken.joblib"))
+    assert manager.active == first and manager.previous is None
+    assert classify("book me a cab to the airport") == ("book_cab", first.version)
+    assert manager.stats()["reload_failures_total"] == 1
+    assert manager.swaps == []
+    with pytest.raises(ModelReloadError):
+        await manager.rollback()
+
+
+def test_process_workers_warm_up_in_their_initializer(artifacts, monkeypatch):
+    warmed = []
+    monkeypatch.setattr(nlu_pipeline, "warm_up", lambda: warmed.append(1))
+    nlu_pipeline.init_worker(str(artifacts / "b.npz"), "v1", warm=True)
+    assert warmed == [1] and nlu_pipeline.get_active()[1] == "v1"
@@ -0,0 +1,50 @@
+import pytest
+
+import nlu_pipeline
+
+pytestmark = pytest.mark.anyio
+
+MESSAGES = nlu_pipeline.WARMUP_MESSAGES + [
+    "  book a cab from btm   to koramangala at 6 pm ",
+    "good morning",
+]
+
+
+def comparable(response):
+    """A response with its probabilities rounded: a batch is one forward
+    pass, which can differ from single passes in the last bits."""
+    response = dict(response)
+    if response["confidence"] is not None:
+        response["confidence"] = round(response["confidence"], 6)
+    response["top_intents"] = [
+        (t["intent"], round(t["confidence"], 6)) for t in response["top_intents"] or []
+    ]
+    return response
+
+
+async def test_batch_matches_single_calls(serve, monkeypatch):
+    import server
+
+    # Without the cache every single call runs the pipeline again.
+    monkeypatch.setattr(server, "response_cache", None)
+    async with serve() as client:
+        resp = await client.post("/nlu/batch", json={"messages": MESSAGES, "top_k": 3})
+        assert resp.status_code == 200
+        batch = resp.json()["results"]
+        singles = []
+        for message in MESSAGES:
+            resp = await client.post("/nlu", json={"message": message, "top_k": 3})
+            assert resp.status_code == 200
+            singles.append(resp.json())
+    assert [comparable(r) for r in batch] == [comparable(r) for r in singles]
+
+
+async def test_batch_size_is_limited(serve, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "MAX_BATCH_SIZE", 2)
+    async with serve() as client:
+        resp = await client.post("/nlu/batch", json={"messages": ["hi"] * 3})
+        assert resp.status_code == 413
+        resp = await client.post("/nlu/batch", json={"messages": []})
+        assert resp.status_code == 200 and resp.json() == {"results": []}
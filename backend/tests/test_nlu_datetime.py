@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+import nlu_datetime
+from nlu_datetime import parse_datetime
+
+# A Wednesday.
+NOW = datetime(2026, 10, 14, 9, 30)
+
+
+@pytest.fixture(autouse=True)
+def no_dateparser(monkeypatch):
+    """
+    Fail any test that falls through to dateparser: these messages are all
+    meant to be decided by the fast path.
+    """
+    def fail(text, now):
+        raise AssertionError(f"dateparser called for {text!r}")
+
+    monkeypatch.setattr(nlu_datetime, "_cache", nlu_datetime._DatetimeCache(64))
+    monkeypatch.setattr(nlu_datetime, "_dateparser_parse", fail)
+
+
+@pytest.mark.parametrize(
+    "text, iso, span",
+    [
+        ("book a cab tomorrow at 5 pm", "2026-10-15T17:00:00", "tomorrow at 5 pm"),
+        ("plumber on friday morning", "2026-10-16T09:00:00", "friday morning"),
+        ("next tuesday at 7pm", "2026-10-20T19:00:00", "next tuesday at 7pm"),
+        ("in 2 hours", "2026-10-14T11:30:00", "in 2 hours"),
+        ("call in three days", "2026-10-17T09:30:00", "in three days"),
+        ("deliver on 25/12", "2026-12-25T00:00:00", "25/12"),
+        ("12 march", "2027-03-12T00:00:00", "12 march"),
+        ("send a plumber in the evening", "2026-10-14T18:00:00", "evening"),
+        ("cab at night", "2026-10-14T21:00:00", "night"),
+    ],
+)
+def test_fast_path_resolves(text, iso, span):
+    result = parse_datetime(text, now=NOW)
+    assert (result.iso, result.text) == (iso, span)
+
+
+def test_messages_without_date_cues_have_no_datetime():
+    assert parse_datetime("order milk", now=NOW).iso is None
+
+
+@pytest.mark.parametrize("text", ["good morning", "good night, thanks", "hi, good evening!"])
+def test_greetings_are_not_times(text):
+    assert parse_datetime(text, now=NOW).iso is None
+
+
+def test_relative_times_are_cached_only_until_now():
+    # "in 2 hours" changes meaning a moment later; "tomorrow at 5 pm" not
+    # until midnight.
+    assert parse_datetime("in 2 hours", now=NOW).valid_until == NOW
+    assert parse_datetime("tomorrow at 5 pm", now=NOW).valid_until == datetime(2026, 10, 15)
+
+
+def test_fast_only_skips_dateparser():
+    assert parse_datetime("24/7 service", now=NOW, fast_only=True).iso is None
+
+
+def test_response_validity_comes_from_the_extraction(monkeypatch):
+    import nlu_pipeline
+    import nlu_utils
+
+    calls = []
+
+    def counting_parse(text, **kwargs):
+        calls.append(text)
+        return parse_datetime(text, **kwargs)
+
+    monkeypatch.setattr(nlu_utils, "parse_datetime", counting_parse)
+    result = nlu_pipeline.analyze("book a cab tomorrow at 5 pm", "book_cab")
+    assert result["slots"]["datetime_iso"] is not None
+    assert result["valid_until"] == parse_datetime("tomorrow at 5 pm").valid_until.timestamp()
+    assert calls == ["book a cab tomorrow at 5 pm"]
+
+    assert nlu_pipeline.analyze("order milk", "order_grocery")["valid_until"] is None
@@ -0,0 +1,138 @@
+import json
+import os
+
+import pytest
+
+import product_catalog
+from product_catalog import ProductIndex, append_updates, build_index, compact_index
+
+CATALOG = [
+    {"id": "sku-fanta", "name": "Fanta Orange 750ml", "category": "Cold Drinks"},
+    {"id": "sku-coke", "name": "Coca-Cola 750ml", "category": "Cold Drinks", "aliases": "coke"},
+    {"id": "sku-atta", "name": "Whole Wheat Atta 5kg", "category": "Staples", "brand": "Aashirvaad"},
+    {"id": "sku-oreo", "name": "Oreo Chocolate Biscuits", "category": "Biscuits"},
+    {"id": "sku-parle", "name": "Parle-G Glucose Biscuits", "category": "Biscuits"},
+    {"id": "sku-milk", "name": "Amul Taaza Toned Milk 1L", "category": "Dairy"},
+    {"id": "sku-curd", "name": "Amul Masti Dahi 400g", "category": "Dairy"},
+]
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    build_index(CATALOG, str(tmp_path))
+    return str(tmp_path)
+
+
+def matched_id(index, text):
+    match = index.match(text)
+    return match and match.product_id
+
+
+@pytest.mark.parametrize(
+    "text, product_id",
+    [
+        ("order fanta for me", "sku-fanta"),
+        ("order fanta orange", "sku-fanta"),
+        ("get me 2 packets of oreo biscuit", "sku-oreo"),
+        ("order 2 aashirvaad atta", "sku-atta"),
+        ("send a coca cola", "sku-coke"),
+        ("send a coke", "sku-coke"),
+        ("amul taaza milk", "sku-milk"),
+    ],
+)
+def test_matches_by_name_brand_and_alias(index_dir, text, product_id):
+    assert matched_id(ProductIndex(index_dir), text) == product_id
+
+
+def test_category_words_alone_do_not_match(index_dir):
+    index = ProductIndex(index_dir)
+    assert index.match("order some biscuits") is None
+    assert index.match("order orange") is None
+    assert index.match("book me a cab") is None
+
+
+def test_updates_are_applied_on_refresh(index_dir):
+    index = ProductIndex(index_dir, refresh_seconds=0)
+    append_updates(
+        index_dir,
+        upserts=[{"id": "sku-zingo", "name": "Zingo Mango Drink", "category": "Cold Drinks"}],
+        deletes=["sku-fanta"],
+    )
+    assert index.refresh() == 1
+    assert matched_id(index, "order zingo") == "sku-zingo"
+    assert index.match("order fanta for me") is None
+    assert len(index) == len(CATALOG)
+
+
+
+def test_compact_folds_in_updates(index_dir):
+    append_updates(index_dir, upserts=[{"id": "sku-zingo", "name": "Zingo Mango Drink", "category": "Cold Drinks"}])
+    assert compact_index(index_dir) == len(CATALOG) + 1
+    assert not os.path.exists(os.path.join(index_dir, product_catalog.UPDATES_FILE))
+    index = ProductIndex(index_dir)
+    assert matched_id(index, "order zingo") == "sku-zingo"
+    assert {p["id"] for p in index.products()} == {p["id"] for p in CATALOG} | {"sku-zingo"}
+
+
+def test_compact_keeps_updates_appended_while_it_runs(index_dir, monkeypatch):
+    reader = ProductIndex(index_dir, refresh_seconds=0)
+    build = product_catalog.build_index
+
+    def build_and_append(products, path, drop_updates=True):
+        # Lands in the fresh updates file while the rebuild is in progress.
+        append_updates(index_dir, upserts=[{"id": "sku-late", "name": "Lassi Late Drink", "category": "Dairy"}])
+        return build(products, path, drop_updates)
+
+    append_updates(index_dir, upserts=[{"id": "sku-zingo", "name": "Zingo Mango Drink", "category": "Cold Drinks"}])
+    monkeypatch.setattr(product_catalog, "build_index", build_and_append)
+    compact_index(index_dir)
+
+    for index in (reader, ProductIndex(index_dir)):
+        index.refresh()
+        assert matched_id(index, "order zingo") == "sku-zingo"
+        assert matched_id(index, "lassi late") == "sku-late"
+
+
+def test_rebuild_swaps_the_whole_index_at_once(index_dir):
+    reader = ProductIndex(index_dir, refresh_seconds=3600)
+    old_version = os.readlink(os.path.join(index_dir, product_catalog.CURRENT_LINK))
+    build_index(CATALOG[:2] + [{"id": "sku-zingo", "name": "Zingo Mango Drink", "category": "Cold Drinks"}], index_dir)
+
+    # The old version is still there for readers that have it open.
+    assert matched_id(reader, "order oreo") == "sku-oreo"
+    assert os.path.exists(os.path.join(index_dir, old_version, "meta.json"))
+    reader.refresh()
+    assert matched_id(reader, "order zingo") == "sku-zingo"
+    assert reader.match("order oreo") is None
+
+    for _ in range(3):
+        build_index(CATALOG, index_dir)
+    versions = [d for d in os.listdir(index_dir) if d.startswith("v")]
+    assert len(versions) == 1 + product_catalog.KEEP_VERSIONS
+    assert not [f for f in os.listdir(index_dir) if f.endswith(".npy")]
+
+
+def test_compact_applies_late_appends_before_newer_updates(index_dir, monkeypatch):
+    build = product_catalog.build_index
+    zingo = {"id": "sku-zingo", "name": "Zingo Mango Drink", "category": "Cold Drinks"}
+    rotated = os.path.join(index_dir, product_catalog.UPDATES_FILE + ".compacting")
+
+    def build_with_late_writer(products, path, drop_updates=True):
+        if os.path.exists(rotated) and not build_with_late_writer.done:
+            build_with_late_writer.done = True
+            # A writer that opened updates.jsonl before the rotation adds
+            # zingo; then the product is deleted through the new file.
+            with open(rotated, "a", encoding="utf-8") as f:
+                f.write('{"upsert": [%s], "delete": []}\n' % json.dumps(zingo))
+            append_updates(index_dir, deletes=["sku-zingo"])
+        return build(products, path, drop_updates)
+
+    build_with_late_writer.done = False
+    append_updates(index_dir, deletes=["sku-fanta"])
+    monkeypatch.setattr(product_catalog, "build_index", build_with_late_writer)
+    compact_index(index_dir)
+
+    index = ProductIndex(index_dir)
+    assert index.match("order zingo") is None
+    assert index.match("order fanta for me") is None
+    assert not os.path.exists(rotated)
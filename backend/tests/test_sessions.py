@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+
+import nlu_sessions
+from nlu_sessions import (
+    MemorySessionStore,
+    SessionTooLargeError,
+    SqliteSessionStore,
+    create_session_store,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(nlu_sessions, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def state(intent="book_cab", **slots):
+    return {"intent": intent, "slots": slots}
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemorySessionStore(maxsize=2)
+    store.put("a", state(origin="BTM Layout"))
+    store.put("b", state())
+    clock.now += 1
+    assert store.get("a") == state(origin="BTM Layout")  # "b" is now the oldest
+    store.put("c", state())
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_memory_store_caps_total_bytes(clock):
+    one = len('{"intent":"book_cab","slots":{"origin":"xxxxxxxxxx"}}')
+    store = MemorySessionStore(max_bytes=2 * one + 10)
+    for session_id in "abc":
+        store.put(session_id, state(origin="x" * 10))
+    assert len(store) == 2 and store.get("a") is None
+    assert store.stats()["bytes"] == 2 * one
+    # Replacing a session accounts for its old size.
+    store.put("c", state(origin="x" * 10))
+    assert store.stats()["bytes"] == 2 * one
+    with pytest.raises(SessionTooLargeError):
+        store.put("d", state(origin="x" * 100))
+
+
+def test_memory_store_expires_sessions(clock):
+    store = MemorySessionStore(ttl_seconds=60)
+    store.put("a", state())
+    clock.now += 60
+    assert store.get("a") is None
+    assert store.stats()["expirations"] == 1 and len(store) == 0
+
+
+def test_stored_state_is_a_copy(clock):
+    store = MemorySessionStore()
+    session = state(origin="BTM Layout")
+    store.put("a", session)
+    session["slots"]["origin"] = "changed"
+    store.get("a")["slots"]["origin"] = "changed too"
+    assert store.get("a") == state(origin="BTM Layout")
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, clock):
+    store = SqliteSessionStore(
+        str(tmp_path / "sessions.db"), maxsize=3, ttl_seconds=60, max_bytes=10_000, purge_every=1
+    )
+    yield store
+    store.close()
+
+
+def test_sqlite_store_round_trips_and_is_shared(sqlite_store, tmp_path):
+    sqlite_store.put("a", state(destination="Indiranagar"))
+    other = SqliteSessionStore(str(tmp_path / "sessions.db"))
+    try:
+        assert other.get("a") == state(destination="Indiranagar")
+        other.delete("a")
+    finally:
+        other.close()
+    assert sqlite_store.get("a") is None
+
+
+def test_sqlite_purge_drops_expired_and_least_recently_used(sqlite_store, clock):
+    sqlite_store.put("old", state())
+    clock.now += 61
+    assert sqlite_store.get("old") is None
+    for session_id in ("a", "b", "c"):
+        clock.now += 1
+        sqlite_store.put(session_id, state())
+    clock.now += 1
+    sqlite_store.get("a")  # touched: "b" is now the least recently used
+    clock.now += 1
+    sqlite_store.put("d", state())
+    assert sqlite_store.stats()["size"] == 3
+    assert sqlite_store.get("b") is None
+    assert all(sqlite_store.get(s) is not None for s in ("a", "c", "d"))
+
+
+def test_sqlite_purge_caps_total_bytes(sqlite_store, clock):
+    sqlite_store.max_bytes = 250
+    for session_id in ("a", "b", "c"):
+        clock.now += 1
+        sqlite_store.put(session_id, state(origin="x" * 50))
+    stats = sqlite_store.stats()
+    assert stats["size"] == 2 and stats["bytes"] <= 250
+    assert sqlite_store.get("a") is None
+    with pytest.raises(SessionTooLargeError):
+        sqlite_store.put("big", state(origin="x" * 300))
+
+
+def test_create_session_store(tmp_path):
+    assert isinstance(create_session_store("memory", 10, 60, 1000), MemorySessionStore)
+    store = create_session_store(f"sqlite:///{tmp_path}/s.db", 10, 60, 1000)
+    assert store.blocking and store.stats()["backend"] == "sqlite"
+    store.close()
+    with pytest.raises(ValueError):
+        create_session_store("redis://localhost", 10, 60, 1000)
@@ -0,0 +1,69 @@
+import pytest
+
+import nlu_datetime
+import nlu_pipeline
+import nlu_utils
+from utterance import Utterance, normalize_utterance
+
+
+def test_offsets_line_up_with_the_message():
+    utterance = Utterance("Cab to İstanbul Airport, please")
+    assert len(utterance.lower) == len(utterance.text)
+    for token, start, end in utterance.tokens:
+        assert utterance.lower[start:end] == token
+    plain = Utterance("Cab  to the Airport, please")
+    assert plain.normalized == normalize_utterance(plain.text) == "cab to the airport please"
+    assert {"cab to", "airport please"} <= plain.ngrams
+
+
+class RecordingModel:
+    """Classifies everything as a cab booking and keeps what it was given."""
+
+    classes = ["book_cab", "order_grocery"]
+
+    def __init__(self):
+        self.seen = []
+
+    def predict_top_ks(self, texts, k):
+        self.seen.extend(texts)
+        return [[("book_cab", 0.9), ("order_grocery", 0.1)] for _ in texts]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(nlu_pipeline, "_active", (model, "stub"))
+    monkeypatch.setattr(nlu_datetime, "_cache", nlu_datetime._DatetimeCache(64))
+    return model
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_every_stage_shares_one_utterance(model, monkeypatch, batched):
+    scans = []
+    scan = nlu_utils.scan_keywords
+    monkeypatch.setattr(nlu_utils, "scan_keywords", lambda lower: scans.append(lower) or scan(lower))
+
+    text = "Book a cab from BTM to Koramangala tomorrow at 5 PM"
+    if batched:
+        result = nlu_pipeline.run_nlu_batch([text])[0]
+    else:
+        result = nlu_pipeline.run_nlu(text)
+
+    assert [type(t) for t in model.seen] == [Utterance]
+    # Heuristics and every extractor reused one keyword scan.
+    assert len(scans) == 1
+    spans = {slot: text[start:end] for slot, (start, end) in result["slot_spans"].items()}
+    assert spans == {
+        "origin": "BTM",
+        "destination": "Koramangala",
+        "datetime_text": "tomorrow at 5 PM",
+    }
+    assert result["slots"]["origin"] == "BTM Layout"
+
+
+def test_spans_are_only_reported_for_filled_slots():
+    utterance = Utterance("from btm to hsr")
+    utterance.spans.update({"origin": (5, 8), "destination": (12, 15)})
+    assert nlu_utils.slot_spans(utterance, {"origin": "BTM Layout", "destination": None}) == {
+        "origin": [5, 8]
+    }
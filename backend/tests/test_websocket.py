@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+
+@pytest.fixture
+def ws():
+    import server
+
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/nlu/ws") as ws:
+            yield ws
+
+
+def turn(ws, **frame):
+    ws.send_text(json.dumps(frame))
+    return json.loads(ws.receive_text())
+
+
+def test_conversation_keeps_state_between_turns(ws):
+    first = turn(ws, message="book me a cab")
+    assert (first["turn"], first["intent"]) == (1, "book_cab")
+    assert first["missing_slots"] == ["origin", "destination"]
+    assert first["slots"] == {} and "followup_question" in first
+
+    # A follow-up: merged into the cab request, not classified again.
+    second = turn(ws, message="from btm to koramangala tomorrow 5 pm")
+    assert (second["turn"], second["intent"]) == (2, "book_cab")
+    assert (second["slots"]["origin"], second["slots"]["destination"]) == ("BTM Layout", "Koramangala")
+    assert second["slots"]["datetime_text"] == "tomorrow 5 pm"
+    assert second["missing_slots"] == [] and "confidence" not in second
+
+    # The request is complete: the next message starts a new one.
+    third = turn(ws, message="order fanta for me", top_k=2)
+    assert third["intent"] == "order_grocery"
+    assert [t["intent"] for t in third["top_intents"]][0] == "order_grocery"
+    assert len(third["top_intents"]) == 2
+
+
+def test_partial_follow_up_and_reset(ws):
+    assert turn(ws, message="book a cab to hsr")["missing_slots"] == ["origin"]
+    filled = turn(ws, message="from btm")
+    assert filled["slots"] == {"origin": "BTM Layout", "destination": "HSR Layout"}
+    assert filled["missing_slots"] == ["datetime"]
+    assert turn(ws, message="at 6 pm")["missing_slots"] == []
+
+    assert turn(ws, message="book a cab to hsr")["missing_slots"] == ["origin"]
+    reset = turn(ws, message="order fanta for me", reset=True)
+    assert reset["intent"] == "order_grocery"
+
+
+def test_bad_frame_gets_an_error_and_keeps_the_connection(ws):
+    ws.send_text("not json")
+    assert json.loads(ws.receive_text()) == {
+        "error": "Expected a JSON object with a message",
+        "status": 422,
+    }
+    assert turn(ws, message="book me a cab")["turn"] == 1
@@ -1,16 +1,30 @@
+import argparse
+import hashlib
+import importlib.util
+import itertools
+import json
 import os
-from typing import List, Tuple
+import tempfile
+import time
+import shutil
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import joblib
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics import classification_report, confusion_matrix
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
 from sklearn.model_selection import train_test_split
 from sklearn.neural_network import MLPClassifier
 from sklearn.pipeline import Pipeline
 
+from intent_model import CascadeIntentModel, FastPathModel, NumpyIntentModel, cascade_path
+from utterance import normalize_utterance
+
 
 INTENTS = [
     "order_grocery",
@@ -111,83 +125,806 @@ def build_training_data() -> pd.DataFrame:
     return df
 
 
-def main():
-    df = build_training_data()
-    X = df["text"].values
-    y = df["intent"].values
+# Extra inputs for the NumPy export parity check: edge cases that don't occur
+# in the training data (empty, unknown words, repeated tokens, casing).
+PARITY_PROBES = [
+    "",
+    "hi",
+    "!!!",
+    "xyzzy qwerty",
+    "fan fan fan not working not working",
+    "ORDER ME FANTA Please",
+    "book me a cab from koramangala to the airport tomorrow at 5 pm",
+]
 
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
 
+def check_parity(pipeline: Pipeline, numpy_model: NumpyIntentModel, texts: Sequence[str]) -> None:
+    """
+    Fail loudly if the NumPy model does not predict exactly like the sklearn
+    pipeline it was exported from.
+    """
+    texts = list(texts) + PARITY_PROBES
+    expected = [str(p) for p in pipeline.predict(texts)]
+    got = numpy_model.predict_intents(texts)
+    mismatches = [(t, e, g) for t, e, g in zip(texts, expected, got) if e != g]
+    if mismatches:
+        raise RuntimeError(f"NumPy model disagrees with the sklearn pipeline: {mismatches[:5]}")
+
+    max_diff = np.abs(pipeline.predict_proba(texts) - numpy_model.predict_proba_batch(texts)).max()
+    if max_diff > 1e-9:
+        raise RuntimeError(f"NumPy model probabilities differ by up to {max_diff:.3g}")
+
+
+def export_numpy_model(
+    pipeline: Pipeline, texts: Sequence[str], path: str, mmap_dir: str
+) -> None:
+    """
+    Write the NumPy inference artifacts used by NumpyIntentModel (.npz and the
+    memory-mappable directory) and verify both against the sklearn pipeline.
+    """
+    numpy_model = NumpyIntentModel.from_pipeline(pipeline)
+    numpy_model.save(path)
+    check_parity(pipeline, NumpyIntentModel.load(path), texts)
+    print(f"Saved NumPy inference model to {path} (parity check passed)")
+
+    numpy_model.save_mmap(mmap_dir)
+    check_parity(pipeline, NumpyIntentModel.load_mmap(mmap_dir), texts)
+    print(f"Saved memory-mappable model to {mmap_dir} (parity check passed)")
+
+
+def _serving_latency_us(models: Sequence[Any], texts: Sequence[str], repeat: int = 7) -> List[float]:
+    """
+    Mean per-message latency of each model's predict_top_k (one message per
+    call, as served), best of `repeat` passes. Passes over the models are
+    interleaved so they see the same machine load.
+    """
+    best = [float("inf")] * len(models)
+    for model in models:
+        model.predict_top_k(texts[0])
+    for _ in range(repeat):
+        for i, model in enumerate(models):
+            started = time.perf_counter()
+            for text in texts:
+                model.predict_top_k(text)
+            best[i] = min(best[i], time.perf_counter() - started)
+    return [seconds / len(texts) * 1e6 for seconds in best]
+
+
+def train_fast_path(
+    pipeline: Pipeline,
+    X_train: Sequence[str],
+    X_val: Sequence[str],
+    y_val: Sequence[str],
+    target_agreement: float = 0.99,
+    max_exact: int = 5000,
+) -> FastPathModel:
+    """
+    Build the cascade's fast path for `pipeline` (see FastPathModel):
+
+    - the exact table holds the `max_exact` most frequent training
+      utterances with the pipeline's own probabilities;
+    - the linear model is distilled from the pipeline: it is fit on the
+      pipeline's predictions for the training texts, not the labels, since
+      its job is to agree with the full model;
+    - the threshold is the lowest confidence (at least 0.5) above which the
+      linear model agrees with the pipeline on >= `target_agreement` of the
+      validation messages it would answer.
+
+    The calibration report (stage shares, agreement, accuracy and serving
+    latency with and without the cascade, on the validation set) is printed
+    and stored in the fast path's meta.
+    """
+    classes = [str(c) for c in pipeline.classes_]
+    counts = Counter(normalize_utterance(t) for t in X_train)
+    utterances = [u for u, _ in counts.most_common(max_exact) if u]
+    exact_proba = pipeline.predict_proba(utterances) if utterances else np.zeros((0, len(classes)))
+
+    # Same features as FastPathModel.linear_proba: binary unigrams and
+    # bigrams of normalize_utterance() tokens, L2-normalized.
     vectorizer = TfidfVectorizer(
-        lowercase=True,
-        ngram_range=(1, 2),
-        min_df=1,
+        token_pattern=r"(?u)\w+", ngram_range=(1, 2), binary=True, use_idf=False, norm="l2"
+    )
+    features = vectorizer.fit_transform([normalize_utterance(t) for t in X_train])
+    terms = vectorizer.get_feature_names_out().tolist()
+    targets = [str(p) for p in pipeline.predict(X_train)]
+    linear = LogisticRegression(C=100.0, max_iter=1000)
+    linear.fit(features, targets)
+    # (n_terms, n_classes) in the pipeline's class order; classes the
+    # pipeline never predicted get a large negative intercept.
+    coef = np.zeros((len(terms), len(classes)))
+    intercept = np.full(len(classes), -30.0)
+    columns = [classes.index(c) for c in linear.classes_]
+    if len(columns) == 2:
+        coef[:, columns[1]] = linear.coef_[0]
+        intercept[columns] = [0.0, linear.intercept_[0]]
+    else:
+        coef[:, columns] = linear.coef_.T
+        intercept[columns] = linear.intercept_
+
+    fast = FastPathModel(utterances, exact_proba, terms, coef, intercept, classes, 0.0, {})
+    X_val = list(X_val)
+    full_pred = np.array([str(p) for p in pipeline.predict(X_val)])
+    proba, stages = fast.predict_proba_batch(X_val)
+    linear_rows = np.array([s != "exact" for s in stages], dtype=bool)
+    confidence = proba.max(axis=1)[linear_rows]
+    agrees = (np.array(classes)[proba.argmax(axis=1)] == full_pred)[linear_rows]
+
+    threshold = 1.01  # nothing answered by the linear model
+    for candidate in np.unique(np.concatenate([confidence, [0.5]])):
+        if candidate < 0.5:
+            continue
+        accepted = confidence >= candidate
+        if accepted.any() and agrees[accepted].mean() >= target_agreement:
+            threshold = float(candidate)
+            break
+    fast.threshold = threshold
+
+    cascade = CascadeIntentModel(fast, NumpyIntentModel.from_pipeline(pipeline))
+    proba, stages = cascade.predict_proba_staged(X_val)
+    cascade_pred = np.array(classes)[proba.argmax(axis=1)]
+    numpy_model = cascade.full
+    probe = X_val[:500] or PARITY_PROBES
+    full_us, cascade_us = _serving_latency_us([numpy_model, cascade], probe)
+    shares = Counter(stages)
+    fast.meta = {
+        "report": {
+            "validation_size": len(X_val),
+            "target_agreement": target_agreement,
+            "exact_share": shares["exact"] / len(X_val),
+            "linear_share": shares["linear"] / len(X_val),
+            "escalated_share": shares["full"] / len(X_val),
+            "agreement_with_full": float(np.mean(cascade_pred == full_pred)),
+            "full_accuracy": float(np.mean(full_pred == np.asarray(y_val))),
+            "cascade_accuracy": float(np.mean(cascade_pred == np.asarray(y_val))),
+            "full_latency_us": full_us,
+            "cascade_latency_us": cascade_us,
+            "latency_saved_percent": 100 * (1 - cascade_us / full_us),
+        },
+        "exact_utterances": len(utterances),
+        "linear_terms": len(terms),
+    }
+    return fast
+
+
+def export_fast_path(fast: FastPathModel, model_path: str, mmap_dir: str) -> None:
+    """
+    Print the fast path's calibration report and write it next to the
+    exported models (the .joblib and .npz share one file; the mmap directory
+    gets its own copy), unless the cascade turned out slower than the full
+    model alone: escalated messages pay for both stages.
+    """
+    report = fast.meta["report"]
+    print(f"\nCascade fast path (threshold {fast.threshold:.3f}):")
+    print(
+        f"  answered by: exact {report['exact_share']:.1%}, linear {report['linear_share']:.1%}, "
+        f"escalated {report['escalated_share']:.1%}"
+    )
+    print(
+        f"  agreement with full model {report['agreement_with_full']:.2%}; accuracy "
+        f"{report['cascade_accuracy']:.2%} (full model {report['full_accuracy']:.2%})"
     )
-    classifier = MLPClassifier(
-        hidden_layer_sizes=(64,),
+    print(
+        f"  latency {report['cascade_latency_us']:.0f} us/message "
+        f"(full model {report['full_latency_us']:.0f} us, "
+        f"{report['latency_saved_percent']:.0f}% saved)"
+    )
+    if report["latency_saved_percent"] <= 0:
+        remove_fast_path(model_path, mmap_dir)
+        print("Not exported: the cascade is not faster than the full model")
+        return
+    path = cascade_path(model_path)
+    fast.save(path)
+    shutil.copyfile(path, cascade_path(mmap_dir))
+    print(f"Saved cascade fast path to {path}")
+
+
+def remove_fast_path(model_path: str, mmap_dir: str) -> None:
+    """
+    Drop a stale fast path left by a previous training run.
+    """
+    for path in (cascade_path(model_path), cascade_path(mmap_dir)):
+        if path.exists():
+            path.unlink()
+
+
+def remove_numpy_model(npz_path: str, mmap_dir: str) -> None:
+    """
+    Drop NumPy exports left by a previous training run, so they can't be
+    served as if they were the model just trained.
+    """
+    if os.path.exists(npz_path):
+        os.remove(npz_path)
+    if os.path.isdir(mmap_dir):
+        shutil.rmtree(mmap_dir)
+
+
+def require_pyarrow(path: str) -> None:
+    """
+    Fail before training, not after the first pass, when a Parquet corpus
+    can't be read.
+    """
+    if path.endswith(".parquet") and importlib.util.find_spec("pyarrow") is None:
+        raise SystemExit(f"pyarrow is needed to read {path} (pip install pyarrow)")
+
+
+def load_training_data(path: str) -> pd.DataFrame:
+    """
+    Labelled utterances from a file with `text` and `intent` columns:
+    .csv, .jsonl (one JSON object per line) or .parquet.
+    """
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+    elif path.endswith(".jsonl"):
+        df = pd.read_json(path, lines=True)
+    elif path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported training data format: {path}")
+    missing = {"text", "intent"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    return df[["text", "intent"]].dropna().astype(str)
+
+
+# The configuration trained without --search, and the values --search
+# combines by default.
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "ngram_range": (1, 2),
+    "min_df": 1,
+    "hidden_layer_sizes": (64,),
+    "max_iter": 80,
+}
+SEARCH_GRID: Dict[str, List[Any]] = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "min_df": [1, 2],
+    "hidden_layer_sizes": [(32,), (64,), (128,), (64, 64)],
+    "max_iter": [80, 200],
+}
+
+
+def make_vectorizer(ngram_range: Tuple[int, int], min_df: int) -> TfidfVectorizer:
+    return TfidfVectorizer(lowercase=True, ngram_range=ngram_range, min_df=min_df)
+
+
+def make_classifier(hidden_layer_sizes: Tuple[int, ...], max_iter: int) -> MLPClassifier:
+    return MLPClassifier(
+        hidden_layer_sizes=hidden_layer_sizes,
         activation="relu",
         solver="adam",
-        max_iter=80,
+        max_iter=max_iter,
         random_state=42,
         verbose=False,
     )
 
-    pipeline = Pipeline(
-        [
-            ("tfidf", vectorizer),
-            ("mlp", classifier),
+
+def _features_key(texts: Sequence[str], labels: Sequence[str], **params: Any) -> str:
+    digest = hashlib.sha256()
+    for text, label in zip(texts, labels):
+        digest.update(f"{label}\t{text}\n".encode("utf-8"))
+    digest.update(repr(sorted(params.items())).encode("utf-8"))
+    digest.update(sklearn.__version__.encode("utf-8"))
+    return digest.hexdigest()[:20]
+
+
+def load_features(
+    X_train: Sequence[str],
+    y_train: Sequence[str],
+    X_val: Sequence[str],
+    ngram_range: Tuple[int, int],
+    min_df: int,
+    cache_dir: Optional[str] = None,
+) -> Tuple[TfidfVectorizer, Any, Any]:
+    """
+    Fit the vectorizer on the training split and transform both splits.
+    With `cache_dir`, the result is stored on disk keyed by the data and the
+    vectorizer parameters, and reused by later candidates and runs.
+    """
+    path = None
+    if cache_dir:
+        key = _features_key(
+            list(X_train) + ["\0"] + list(X_val),
+            list(y_train) + [""] * (len(X_val) + 1),
+            ngram_range=tuple(ngram_range),
+            min_df=min_df,
+        )
+        path = os.path.join(cache_dir, f"features_{key}.joblib")
+        if os.path.exists(path):
+            return joblib.load(path)
+
+    vectorizer = make_vectorizer(ngram_range, min_df)
+    F_train = vectorizer.fit_transform(X_train)
+    F_val = vectorizer.transform(X_val)
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump((vectorizer, F_train, F_val), tmp_path)
+        os.replace(tmp_path, path)
+    return vectorizer, F_train, F_val
+
+
+def fit_candidate(
+    params: Dict[str, Any],
+    X_train: Sequence[str],
+    y_train: Sequence[str],
+    X_val: Sequence[str],
+    y_val: Sequence[str],
+    cache_dir: Optional[str] = None,
+) -> Tuple[Dict[str, Any], Pipeline]:
+    """
+    Train one configuration on (possibly cached) features and score it on
+    the validation split. Returns the scores and the fitted pipeline.
+    """
+    vectorizer, F_train, F_val = load_features(
+        X_train, y_train, X_val, params["ngram_range"], params["min_df"], cache_dir
+    )
+    started = time.perf_counter()
+    classifier = make_classifier(params["hidden_layer_sizes"], params["max_iter"])
+    classifier.fit(F_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    y_pred = classifier.predict(F_val)
+    scores = {
+        "params": params,
+        "accuracy": float(accuracy_score(y_val, y_pred)),
+        "macro_f1": float(f1_score(y_val, y_pred, average="macro", zero_division=0)),
+        "fit_seconds": fit_seconds,
+        "vocabulary_size": len(vectorizer.vocabulary_),
+    }
+    return scores, Pipeline([("tfidf", vectorizer), ("mlp", classifier)])
+
+
+def measure_serving_cost(pipeline: Pipeline, texts: Sequence[str]) -> Dict[str, Any]:
+    """
+    Per-message latency and artifact size of the NumPy model that would be
+    served for this pipeline.
+    """
+    numpy_model = NumpyIntentModel.from_pipeline(pipeline)
+    texts = list(texts)[:500] or PARITY_PROBES
+    numpy_model.predict_intent(texts[0])
+    started = time.perf_counter()
+    for text in texts:
+        numpy_model.predict_intent(text)
+    latency_us = (time.perf_counter() - started) / len(texts) * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.npz")
+        numpy_model.save(path)
+        model_bytes = os.path.getsize(path)
+    return {"latency_us": latency_us, "model_bytes": model_bytes}
+
+
+def parse_grid(args: argparse.Namespace) -> Dict[str, List[Any]]:
+    grid = dict(SEARCH_GRID)
+    if args.ngram_ranges:
+        grid["ngram_range"] = [
+            tuple(int(n) for n in item.split("-")) for item in args.ngram_ranges.split(",")
+        ]
+    if args.min_dfs:
+        grid["min_df"] = [int(v) for v in args.min_dfs.split(",")]
+    if args.hidden_sizes:
+        grid["hidden_layer_sizes"] = [
+            tuple(int(n) for n in item.split("x")) for item in args.hidden_sizes.split(",")
         ]
+    if args.max_iters:
+        grid["max_iter"] = [int(v) for v in args.max_iters.split(",")]
+    return grid
+
+
+def hyperparameter_search(
+    grid: Dict[str, List[Any]],
+    X_train: Sequence[str],
+    y_train: Sequence[str],
+    X_val: Sequence[str],
+    y_val: Sequence[str],
+    n_jobs: int = -1,
+    cache_dir: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Pipeline]:
+    """
+    Fit every combination in `grid` across `n_jobs` processes. Features are
+    computed once per (ngram_range, min_df) before the classifiers train.
+    Latency and size are measured afterwards, one candidate at a time, so
+    they are comparable. Returns all scores (best first: accuracy, then
+    latency) and the best pipeline.
+    """
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    print(f"Searching {len(candidates)} configurations (n_jobs={n_jobs})...")
+
+    if cache_dir:
+        feature_params = sorted({(c["ngram_range"], c["min_df"]) for c in candidates})
+        joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(_warm_features)(X_train, y_train, X_val, ngram, min_df, cache_dir)
+            for ngram, min_df in feature_params
+        )
+
+    fitted = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(fit_candidate)(params, X_train, y_train, X_val, y_val, cache_dir)
+        for params in candidates
     )
 
-    print("Training intent classifier...")
-    pipeline.fit(X_train, y_train)
+    for scores, pipeline in fitted:
+        scores.update(measure_serving_cost(pipeline, X_val))
 
-    # Evaluate
-    y_pred = pipeline.predict(X_val)
-    print("\nValidation classification report:")
-    print(classification_report(y_val, y_pred, labels=INTENTS))
+    fitted.sort(key=lambda item: (-item[0]["accuracy"], item[0]["latency_us"]))
+    return [scores for scores, _ in fitted], fitted[0][1]
 
-    cm = confusion_matrix(y_val, y_pred, labels=INTENTS)
-    print("Confusion matrix:")
-    print(cm)
 
-    os.makedirs("models", exist_ok=True)
+def _warm_features(*args: Any) -> None:
+    load_features(*args)
+
+
+def print_search_report(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'ngram':>6} {'min_df':>6} {'hidden':>10} {'iter':>5} "
+          f"{'acc':>6} {'f1':>6} {'µs/msg':>8} {'KB':>8} {'fit s':>6}")
+    for r in results:
+        p = r["params"]
+        print(
+            f"{'%d-%d' % tuple(p['ngram_range']):>6} {p['min_df']:>6} "
+            f"{'x'.join(map(str, p['hidden_layer_sizes'])):>10} {p['max_iter']:>5} "
+            f"{r['accuracy']:>6.3f} {r['macro_f1']:>6.3f} {r['latency_us']:>8.1f} "
+            f"{r['model_bytes'] / 1024:>8.1f} {r['fit_seconds']:>6.2f}"
+        )
+
+
+def save_plots(
+    cm: np.ndarray,
+    labels: Sequence[str],
+    classifier: Any,
+    out_dir: str,
+    search_results: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """
+    Confusion matrix, loss curve and (after a search) accuracy vs latency
+    plots. matplotlib is only needed here.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
     # Confusion matrix plot
     fig_cm, ax_cm = plt.subplots(figsize=(8, 6))
     im = ax_cm.imshow(cm, interpolation="nearest", cmap="Blues")
     ax_cm.figure.colorbar(im, ax=ax_cm)
     ax_cm.set(
-        xticks=np.arange(len(INTENTS)),
-        yticks=np.arange(len(INTENTS)),
-        xticklabels=INTENTS,
-        yticklabels=INTENTS,
+        xticks=np.arange(len(labels)),
+        yticks=np.arange(len(labels)),
+        xticklabels=labels,
+        yticklabels=labels,
         ylabel="True label",
         xlabel="Predicted label",
         title="Intent Confusion Matrix",
     )
     plt.setp(ax_cm.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
     fig_cm.tight_layout()
-    fig_cm.savefig(os.path.join("models", "confusion_matrix.png"))
+    fig_cm.savefig(os.path.join(out_dir, "confusion_matrix.png"))
     plt.close(fig_cm)
 
     # Loss curve
-    mlp = pipeline.named_steps["mlp"]
-    if hasattr(mlp, "loss_curve_"):
+    if hasattr(classifier, "loss_curve_"):
         fig_loss, ax_loss = plt.subplots()
-        ax_loss.plot(mlp.loss_curve_, marker="o")
+        ax_loss.plot(classifier.loss_curve_, marker="o")
         ax_loss.set_xlabel("Iteration")
         ax_loss.set_ylabel("Loss")
         ax_loss.set_title("MLP Training Loss Curve")
         fig_loss.tight_layout()
-        fig_loss.savefig(os.path.join("models", "loss_curve.png"))
+        fig_loss.savefig(os.path.join(out_dir, "loss_curve.png"))
         plt.close(fig_loss)
 
+    # Search trade-off: accuracy vs latency, marker size ~ model size
+    if search_results:
+        fig_s, ax_s = plt.subplots()
+        sizes = np.array([r["model_bytes"] for r in search_results], dtype=float)
+        ax_s.scatter(
+            [r["latency_us"] for r in search_results],
+            [r["accuracy"] for r in search_results],
+            s=20 + 200 * sizes / sizes.max(),
+            alpha=0.6,
+        )
+        ax_s.set_xlabel("Inference latency (µs / message)")
+        ax_s.set_ylabel("Validation accuracy")
+        ax_s.set_title("Hyperparameter search")
+        fig_s.tight_layout()
+        fig_s.savefig(os.path.join(out_dir, "search_tradeoff.png"))
+        plt.close(fig_s)
+
+
+def iter_chunks(
+    path: str, chunksize: int, columns: Sequence[str] = ("text", "intent")
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a .csv / .jsonl / .parquet corpus as DataFrames of at most
+    `chunksize` rows, holding only one chunk in memory at a time.
+    """
+    columns = list(columns)
+    if path.endswith(".csv"):
+        chunks = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    elif path.endswith(".jsonl"):
+        chunks = (c[columns] for c in pd.read_json(path, lines=True, chunksize=chunksize))
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        chunks = (
+            batch.to_pandas()
+            for batch in parquet.iter_batches(batch_size=chunksize, columns=columns)
+        )
+    else:
+        raise ValueError(f"Unsupported training data format: {path}")
+    for chunk in chunks:
+        yield chunk.dropna().astype(str)
+
+
+def is_validation(texts: Sequence[str], val_percent: int) -> np.ndarray:
+    """
+    Deterministic holdout by text hash: the same utterance always lands in
+    the same split, on every pass and every run, without keeping an index.
+    """
+    return np.array(
+        [zlib.crc32(t.encode("utf-8")) % 100 < val_percent for t in texts], dtype=bool
+    )
+
+
+def make_streaming_pipeline(
+    ngram_range: Tuple[int, int], n_features: int
+) -> Tuple[HashingVectorizer, SGDClassifier]:
+    """
+    Fixed-size feature hashing (no vocabulary to fit or hold) and a linear
+    classifier trained with partial_fit. log_loss keeps predict_proba, so
+    confidence and top-k work as with the MLP.
+    """
+    vectorizer = HashingVectorizer(
+        lowercase=True,
+        ngram_range=ngram_range,
+        n_features=n_features,
+        alternate_sign=False,
+        norm="l2",
+    )
+    classifier = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+    return vectorizer, classifier
+
+
+def train_streaming(
+    path: str,
+    chunksize: int,
+    epochs: int,
+    val_percent: int,
+    ngram_range: Tuple[int, int],
+    n_features: int,
+) -> Tuple[Pipeline, List[str]]:
+    """
+    Out-of-core training: one pass to collect the label set, then `epochs`
+    passes of partial_fit over the training rows, chunk by chunk (rows are
+    shuffled within each chunk; the corpus should not be sorted by intent).
+    """
+    seen = set()
+    for chunk in iter_chunks(path, chunksize, columns=["intent"]):
+        seen.update(chunk["intent"].unique())
+    labels = [i for i in INTENTS if i in seen] + sorted(seen - set(INTENTS))
+
+    vectorizer, classifier = make_streaming_pipeline(ngram_range, n_features)
+    rng = np.random.default_rng(42)
+    for epoch in range(epochs):
+        rows = 0
+        started = time.perf_counter()
+        for chunk in iter_chunks(path, chunksize):
+            texts = chunk["text"].values
+            train = ~is_validation(texts, val_percent)
+            if not train.any():
+                continue
+            order = rng.permutation(int(train.sum()))
+            classifier.partial_fit(
+                vectorizer.transform(texts[train][order]),
+                chunk["intent"].values[train][order],
+                classes=labels,
+            )
+            rows += int(train.sum())
+        print(f"Epoch {epoch + 1}/{epochs}: {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    return Pipeline([("hashing", vectorizer), ("sgd", classifier)]), labels
+
+
+def evaluate_streaming(
+    pipeline: Pipeline, path: str, chunksize: int, val_percent: int, labels: List[str]
+) -> np.ndarray:
+    """
+    Confusion matrix over the validation rows, accumulated chunk by chunk.
+    """
+    index = {label: i for i, label in enumerate(labels)}
+    cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    for chunk in iter_chunks(path, chunksize):
+        texts = chunk["text"].values
+        val = is_validation(texts, val_percent)
+        if not val.any():
+            continue
+        y_true = [index[label] for label in chunk["intent"].values[val]]
+        y_pred = [index[label] for label in pipeline.predict(texts[val])]
+        np.add.at(cm, (y_true, y_pred), 1)
+    return cm
+
+
+def report_from_confusion(cm: np.ndarray, labels: Sequence[str]) -> str:
+    """
+    classification_report computed from a confusion matrix (one weighted
+    sample per cell instead of one per validation row), in the same layout.
+    """
+    true_idx, pred_idx = np.nonzero(cm)
+    report = classification_report(
+        [labels[i] for i in true_idx],
+        [labels[j] for j in pred_idx],
+        labels=list(labels),
+        sample_weight=cm[true_idx, pred_idx],
+        zero_division=0,
+        output_dict=True,
+    )
+    total = int(cm.sum())
+    width = max(len(name) for name in list(labels) + ["weighted avg"])
+    lines = [f"{'':>{width}}  {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+    for name in list(labels) + ["", "accuracy", "macro avg", "weighted avg"]:
+        if not name:
+            lines.append("")
+        elif name == "accuracy":
+            lines.append(f"{name:>{width}}  {'':>9} {'':>9} {report[name]:>9.2f} {total:>9}")
+        else:
+            row = report[name]
+            lines.append(
+                f"{name:>{width}}  {row['precision']:>9.2f} {row['recall']:>9.2f} "
+                f"{row['f1-score']:>9.2f} {int(round(row['support'])):>9}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the intent classifier.")
+    parser.add_argument(
+        "--export-only",
+        action="store_true",
+        help="Don't train; re-export inference artifacts from models/intent_model.joblib.",
+    )
+    parser.add_argument(
+        "--data",
+        help="Train on labelled utterances (.csv / .jsonl / .parquet with text and intent "
+        "columns) instead of the built-in examples.",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Run a parallel hyperparameter search and keep the best configuration.",
+    )
+    parser.add_argument("--ngram-ranges", help="Search values, e.g. 1-1,1-2")
+    parser.add_argument("--min-dfs", help="Search values, e.g. 1,2")
+    parser.add_argument("--hidden-sizes", help="Search values, e.g. 64,128,64x64")
+    parser.add_argument("--max-iters", help="Search values, e.g. 80,200")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel search workers (-1: all cores)")
+    parser.add_argument(
+        "--feature-cache",
+        default=os.path.join("models", "feature_cache"),
+        help="Directory for cached vectorized features ('' disables caching).",
+    )
+    parser.add_argument("--no-plots", action="store_true", help="Skip the matplotlib plots.")
+    parser.add_argument(
+        "--no-cascade",
+        action="store_true",
+        help="Don't export the fast path (exact-match table + linear model) that answers "
+        "confident messages before the MLP.",
+    )
+    parser.add_argument(
+        "--cascade-agreement",
+        type=float,
+        default=0.99,
+        help="Agreement with the MLP the fast path's threshold is calibrated for",
+    )
+    parser.add_argument(
+        "--stream",
+        metavar="PATH",
+        help="Out-of-core training on a large .csv / .jsonl / .parquet corpus read in chunks "
+        "(feature hashing + SGDClassifier.partial_fit).",
+    )
+    parser.add_argument("--chunksize", type=int, default=50000, help="Rows per chunk with --stream")
+    parser.add_argument("--epochs", type=int, default=3, help="Passes over the corpus with --stream")
+    parser.add_argument(
+        "--val-percent", type=int, default=10, help="Share of rows held out with --stream"
+    )
+    parser.add_argument("--ngram-range", default="1-2", help="N-gram range with --stream")
+    parser.add_argument(
+        "--hash-features", type=int, default=2**20, help="Hashed feature dimensions with --stream"
+    )
+    args = parser.parse_args()
+
+    for path in (args.stream, args.data):
+        if path:
+            require_pyarrow(path)
+    if args.stream:
+        main_streaming(args)
+        return
+
+    df = load_training_data(args.data) if args.data else build_training_data()
+    X = df["text"].values
+    y = df["intent"].values
+    labels = [i for i in INTENTS if i in set(y)] + sorted(set(y) - set(INTENTS))
+
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    model_path = os.path.join("models", "intent_model.joblib")
+    mmap_dir = os.path.join("models", "intent_model_mmap")
+
+    def export(pipeline: Pipeline) -> None:
+        export_numpy_model(pipeline, X, os.path.join("models", "intent_model.npz"), mmap_dir)
+        if args.no_cascade:
+            remove_fast_path(model_path, mmap_dir)
+        else:
+            fast = train_fast_path(pipeline, X_train, X_val, y_val, args.cascade_agreement)
+            export_fast_path(fast, model_path, mmap_dir)
+
+    if args.export_only:
+        export(joblib.load(model_path))
+        return
+
+    os.makedirs("models", exist_ok=True)
+    cache_dir = args.feature_cache or None
+
+    search_results = None
+    if args.search:
+        search_results, pipeline = hyperparameter_search(
+            parse_grid(args), X_train, y_train, X_val, y_val, args.jobs, cache_dir
+        )
+        print_search_report(search_results)
+        report_path = os.path.join("models", "search_report.json")
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(search_results, f, indent=2)
+        print(f"\nBest configuration: {search_results[0]['params']} (report: {report_path})")
+    else:
+        print("Training intent classifier...")
+        _, pipeline = fit_candidate(DEFAULT_PARAMS, X_train, y_train, X_val, y_val, cache_dir)
+
+    # Evaluate
+    y_pred = pipeline.predict(X_val)
+    print("\nValidation classification report:")
+    print(classification_report(y_val, y_pred, labels=labels))
+
+    cm = confusion_matrix(y_val, y_pred, labels=labels)
+    print("Confusion matrix:")
+    print(cm)
+
+    if not args.no_plots:
+        save_plots(cm, labels, pipeline.named_steps["mlp"], "models", search_results)
+
+    joblib.dump(pipeline, model_path)
+    print(f"Saved trained model to {model_path}")
+    export(pipeline)
+
+
+def main_streaming(args: argparse.Namespace) -> None:
+    ngram_range = tuple(int(n) for n in args.ngram_range.split("-"))
+    print(f"Streaming training on {args.stream}...")
+    pipeline, labels = train_streaming(
+        args.stream, args.chunksize, args.epochs, args.val_percent, ngram_range, args.hash_features
+    )
+
+    cm = evaluate_streaming(pipeline, args.stream, args.chunksize, args.val_percent, labels)
+    print("\nValidation classification report:")
+    print(report_from_confusion(cm, labels))
+    print("Confusion matrix:")
+    print(cm)
+
+    os.makedirs("models", exist_ok=True)
+    if not args.no_plots:
+        save_plots(cm, labels, pipeline.named_steps["sgd"], "models")
+
     model_path = os.path.join("models", "intent_model.joblib")
     joblib.dump(pipeline, model_path)
     print(f"Saved trained model to {model_path}")
+    mmap_dir = os.path.join("models", "intent_model_mmap")
+    # The fast path is calibrated against an in-memory validation split;
+    # drop one left by a previous in-memory run, it belongs to another model.
+    remove_fast_path(model_path, mmap_dir)
+    # The NumPy / mmap formats hold a TF-IDF vocabulary and MLP weights, so a
+    # hashed linear model can't be exported to them and is served from the
+    # .joblib file; exports of the previous model would still load.
+    remove_numpy_model(os.path.join("models", "intent_model.npz"), mmap_dir)
+    print("Removed the NumPy exports (not a TF-IDF + MLP pipeline): serve the .joblib file")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+"""
+Per-message text analysis shared by the classifier and the slot extractors.
+
+An Utterance lowercases and tokenizes a message once; the NLU pipeline
+builds one per message and hands it to every stage instead of the raw
+string, so no stage re-lowercases or re-tokenizes it. Results that other
+modules compute from it (keyword hits, gazetteer matches) are memoized in
+`cache`, and extractors record where their slot values came from in `spans`.
+"""
+import re
+from functools import cached_property
+from typing import Any, Dict, List, Set, Tuple, Union
+
+_WORD = re.compile(r"\w+")
+
+# (lowercased token, start, end): a word and its character span in the
+# message. Plain tuples, they are built for every token.
+Token = Tuple[str, int, int]
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Lowercased word tokens joined by single spaces. Texts with the same
+    normalized form get the same TF-IDF features, hence the same prediction.
+    """
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def utterance_ngrams(words: List[str]) -> Set[str]:
+    """
+    Distinct unigrams and bigrams of a list of word tokens.
+    """
+    return {*words, *(f"{a} {b}" for a, b in zip(words, words[1:]))}
+
+
+class Utterance:
+    """
+    One message, analyzed once:
+
+    - `text`: the message as given;
+    - `lower`: lowercased, with the same length as `text`, so character
+      offsets into either are interchangeable;
+    - `words`: the `\\w+` runs of `lower`. They are the TF-IDF vectorizer's
+      tokens too (its `\\w\\w+` pattern keeps those with two or more
+      characters);
+    - `tokens` (the words with their offsets), `normalized` and `ngrams`,
+      computed on first use: most messages never need offsets.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        lower = text.lower()
+        if len(lower) != len(text):
+            # A few characters lowercase to several ("İ"); keep those as they
+            # are so that offsets still line up with the message.
+            lower = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+        self.lower = lower
+        self.words: List[str] = _WORD.findall(lower)
+        # Memoized results of other modules' analyses of this message.
+        self.cache: Dict[str, Any] = {}
+        # Slot name -> (start, end) of the text its value was taken from.
+        self.spans: Dict[str, Tuple[int, int]] = {}
+
+    def __repr__(self) -> str:
+        return f"Utterance({self.text!r})"
+
+    @cached_property
+    def tokens(self) -> List[Token]:
+        return [(m.group(), m.start(), m.end()) for m in _WORD.finditer(self.lower)]
+
+    @cached_property
+    def normalized(self) -> str:
+        """
+        Same as normalize_utterance(text).
+        """
+        return " ".join(self.words)
+
+    @cached_property
+    def ngrams(self) -> Set[str]:
+        return utterance_ngrams(self.words)
+
+
+def as_utterance(message: Union[str, Utterance]) -> Utterance:
+    return message if isinstance(message, Utterance) else Utterance(message)